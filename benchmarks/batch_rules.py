@@ -0,0 +1,165 @@
+from typing import Dict, List, Mapping, Optional, Sequence
+
+import numpy as np
+
+from schemas.session import TriggerRule
+
+from engine.strategies import OPERATORS, operator_value, priority_order
+
+
+class BatchRuleEvaluator(object):
+    """
+    Evaluate the rules of many sessions in one vectorized pass.
+
+    The rules of every registered session are packed into flat NumPy arrays
+    (metric column, operator, threshold) laid out session by session from the
+    weakest to the strongest rule. Latest metrics live in a sessions x metrics
+    matrix (NaN = not received, which never triggers), so a tick is a gather,
+    five comparisons and one maximum.reduceat over the session segments.
+
+    Reference for bench_batch_rules.py, not used by the engine: it returns only
+    the winning genre, while the transition path needs the rule index, dwell
+    and hysteresis of every payload (CompiledRuleSet + TransitionMachine).
+    Wiring it into Orchestrator.process_batch is deferred: it would need the
+    rule index per payload and per-payload metrics instead of merged latest
+    values. The benchmark checks it against the scalar path on every run.
+    """
+
+    def __init__(self):
+
+        self._rules: Dict[str, List[TriggerRule]] = {}
+        self._latest: Dict[str, Dict[str, float]] = {}
+
+        self._dirty = True
+
+        # packed layout, rebuilt only when sessions or configs change
+        self._session_ids: List[str] = []
+        self._row_of: Dict[str, int] = {}
+        self._col_of: Dict[str, int] = {}
+        self._values = np.empty((0, 0))
+        self._rule_genres: List[str] = []
+        self._segment_starts = np.empty(0, dtype=np.intp)
+        self._segment_rows = np.empty(0, dtype=np.intp)
+        self._gather_rows = np.empty(0, dtype=np.intp)
+        self._gather_cols = np.empty(0, dtype=np.intp)
+        self._thresholds = np.empty(0)
+        self._op_masks: Dict[str, np.ndarray] = {}
+        self._positions = np.empty(0, dtype=np.intp)
+
+
+    def __len__(self) -> int:
+        return len(self._rules)
+
+
+    def set_session(self, session_id: str, rules: Sequence[TriggerRule]) -> None:
+        """Register (or replace) the rules of a session"""
+        self._rules[session_id] = list(rules)
+        self._latest.setdefault(session_id, {})
+        self._dirty = True
+
+
+    def remove_session(self, session_id: str) -> None:
+        if self._rules.pop(session_id, None) is not None:
+            self._latest.pop(session_id, None)
+            self._dirty = True
+
+
+    def update_metrics(self, session_id: str, metrics: Mapping[str, float]) -> None:
+        """Store the latest metrics of a registered session"""
+
+        latest = self._latest.get(session_id)
+        if latest is None:
+            return
+
+        latest.update(metrics)
+
+        # write through into the packed matrix, repack will rebuild it anyway
+        if not self._dirty:
+            row = self._row_of[session_id]
+            col_of = self._col_of
+            for name, value in metrics.items():
+                col = col_of.get(name)
+                if col is not None:
+                    self._values[row, col] = value
+
+
+    def _pack(self) -> None:
+
+        self._session_ids = list(self._rules)
+        self._row_of = {sid: row for row, sid in enumerate(self._session_ids)}
+
+        col_of: Dict[str, int] = {}
+        rows, cols, ops, thresholds, genres, starts, segment_rows = [], [], [], [], [], [], []
+
+        for row, session_id in enumerate(self._session_ids):
+
+            rules = [r for r in self._rules[session_id] if operator_value(r) in OPERATORS]
+            if not rules:
+                continue
+
+            starts.append(len(rows))
+            segment_rows.append(row)
+
+            # weakest first: position in the segment == rank in the session
+            for idx in priority_order(rules):
+                rule = rules[idx]
+                rows.append(row)
+                cols.append(col_of.setdefault(rule.metric_name, len(col_of)))
+                ops.append(operator_value(rule))
+                thresholds.append(rule.threshold)
+                genres.append(rule.target_genre)
+
+        self._col_of = col_of
+        self._rule_genres = genres
+        self._segment_starts = np.asarray(starts, dtype=np.intp)
+        self._segment_rows = np.asarray(segment_rows, dtype=np.intp)
+        self._gather_rows = np.asarray(rows, dtype=np.intp)
+        self._gather_cols = np.asarray(cols, dtype=np.intp)
+        self._thresholds = np.asarray(thresholds, dtype=np.float64)
+        self._positions = np.arange(len(rows), dtype=np.intp)
+
+        ops_array = np.asarray(ops, dtype=object)
+        self._op_masks = {op: ops_array == op for op in OPERATORS if np.any(ops_array == op)}
+
+        values = np.full((len(self._session_ids), len(col_of)), np.nan)
+        for row, session_id in enumerate(self._session_ids):
+            for name, value in self._latest[session_id].items():
+                col = col_of.get(name)
+                if col is not None:
+                    values[row, col] = value
+        self._values = values
+
+        self._dirty = False
+
+
+    def evaluate(self) -> Dict[str, Optional[str]]:
+        """
+        Return the target genre of the winning rule of every session (None if no rule is triggered)
+        """
+
+        if self._dirty:
+            self._pack()
+
+        winners: Dict[str, Optional[str]] = dict.fromkeys(self._session_ids)
+        if not len(self._positions):
+            return winners
+
+        current = self._values[self._gather_rows, self._gather_cols]
+        thresholds = self._thresholds
+
+        triggered = np.zeros(len(current), dtype=bool)
+        with np.errstate(invalid="ignore"):
+            for op, mask in self._op_masks.items():
+                triggered |= mask & OPERATORS[op](current, thresholds)
+
+        # rules are sorted weakest first inside each segment: max position = winner
+        scores = np.where(triggered, self._positions, -1)
+        best = np.maximum.reduceat(scores, self._segment_starts)
+
+        genres = self._rule_genres
+        session_ids = self._session_ids
+        for row, position in zip(self._segment_rows.tolist(), best.tolist()):
+            if position >= 0:
+                winners[session_ids[row]] = genres[position]
+
+        return winners
@@ -0,0 +1,122 @@
+"""
+Benchmark: rule evaluation of many sessions per tick.
+
+Compares the scalar path (RuleEvaluator per rule + get_highest_priority_rule),
+the per-session CompiledRuleSet and the vectorized BatchRuleEvaluator.
+
+    python benchmarks/bench_batch_rules.py --sessions 2000 --rules 200
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+sys.path.insert(0, ROOT)
+
+from schemas.session import SessionConfig, TriggerRule
+from engine.strategies import RuleEvaluator, CompiledRuleSet
+from benchmarks.batch_rules import BatchRuleEvaluator
+
+
+METRICS = ["hp", "sanity", "stress", "hope", "fear", "armor"]
+OPERATORS = ["lt", "gt", "eq"]
+GENRES = ["metal", "horror", "battle", "calm", "tavern", "funeral"]
+
+
+def build_sessions(n_sessions, n_rules, rng):
+
+    sessions = {}
+    for i in range(n_sessions):
+        rules = [
+            TriggerRule(
+                metric_name=rng.choice(METRICS),
+                operator=rng.choice(OPERATORS),
+                threshold=float(rng.randint(0, 100)),
+                target_genre=rng.choice(GENRES),
+                priority=rng.randint(0, 10)
+            )
+            for _ in range(n_rules)
+        ]
+        sessions[f"session_{i}"] = SessionConfig(session_id=f"session_{i}", rules=rules)
+    return sessions
+
+
+def build_tick(sessions, rng):
+    return {sid: {m: float(rng.randint(0, 100)) for m in METRICS} for sid in sessions}
+
+
+def scalar_tick(sessions, tick):
+
+    result = {}
+    for sid, config in sessions.items():
+        metrics = tick[sid]
+        triggered = [
+            r for r in config.rules
+            if r.metric_name in metrics and RuleEvaluator.is_triggered(metrics[r.metric_name], r.operator, r.threshold)
+        ]
+        rule = config.get_highest_priority_rule(triggered)
+        result[sid] = rule.target_genre if rule else None
+    return result
+
+
+def compiled_tick(compiled, tick):
+
+    result = {}
+    for sid, rule_set in compiled.items():
+        rule = rule_set.resolve(tick[sid])
+        result[sid] = rule.target_genre if rule else None
+    return result
+
+
+def batch_tick(batch, tick):
+
+    for sid, metrics in tick.items():
+        batch.update_metrics(sid, metrics)
+    return batch.evaluate()
+
+
+def timeit(label, fn, repeat):
+
+    fn() # warm up
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    elapsed = (time.perf_counter() - start) / repeat
+    print(f"{label:<22} {elapsed * 1000:>10.2f} ms/tick")
+    return result
+
+
+def main():
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sessions", type=int, default=1000)
+    parser.add_argument("--rules", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    sessions = build_sessions(args.sessions, args.rules, rng)
+    tick = build_tick(sessions, rng)
+
+    compiled = {sid: CompiledRuleSet(cfg.rules) for sid, cfg in sessions.items()}
+
+    batch = BatchRuleEvaluator()
+    for sid, cfg in sessions.items():
+        batch.set_session(sid, cfg.rules)
+
+    print(f"{args.sessions} sessions x {args.rules} rules")
+
+    expected = timeit("scalar RuleEvaluator", lambda: scalar_tick(sessions, tick), args.repeat)
+    compiled_result = timeit("CompiledRuleSet", lambda: compiled_tick(compiled, tick), args.repeat)
+    batch_result = timeit("BatchRuleEvaluator", lambda: batch_tick(batch, tick), args.repeat)
+
+    assert compiled_result == expected, "CompiledRuleSet disagrees with the scalar path"
+    assert batch_result == expected, "BatchRuleEvaluator disagrees with the scalar path"
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Benchmark: concurrent reads/writes on the in-memory session store.
+
+Compares the old single-lock layout (one dict, one threading.Lock, reads
+locked too) with the StripedStore behind MemoryService, for growing thread counts.
+
+    python benchmarks/bench_memory_store.py --sessions 10000 --ops 200000 --threads 1 2 4 8
+
+On a GIL build the striped store removes lock contention but pure-Python work
+still runs one thread at a time; on a free-threaded build (3.13t) it scales with cores.
+"""
+import argparse
+import os
+import random
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from database.memory import StripedStore
+
+
+class GlobalLockStore:
+    """Il vecchio MemoryService: un dict e un lock per tutto"""
+
+    def __init__(self):
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            return self._data.get(key)
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = value
+
+
+def worker(store, keys, n_ops, write_ratio, seed):
+    rng = random.Random(seed)
+    for _ in range(n_ops):
+        key = rng.choice(keys)
+        if rng.random() < write_ratio:
+            store.set(key, key)
+        else:
+            store.get(key)
+
+
+def run(store, keys, n_threads, total_ops, write_ratio):
+
+    per_thread = total_ops // n_threads
+    threads = [
+        threading.Thread(target=worker, args=(store, keys, per_thread, write_ratio, i))
+        for i in range(n_threads)
+    ]
+
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+
+    return per_thread * n_threads / elapsed
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=10000)
+    parser.add_argument("--ops", type=int, default=200000)
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--write-ratio", type=float, default=0.1)
+    parser.add_argument("--stripes", type=int, default=64)
+    args = parser.parse_args()
+
+    keys = [f"session_{i}" for i in range(args.sessions)]
+
+    print(f"{args.sessions} sessions, {args.ops} ops, {args.write_ratio:.0%} writes")
+    print(f"{'threads':>8} {'global lock':>14} {'striped':>14}")
+
+    for n_threads in args.threads:
+        results = []
+        for store in (GlobalLockStore(), StripedStore(stripes=args.stripes)):
+            for key in keys:
+                store.set(key, key)
+            results.append(run(store, keys, n_threads, args.ops, args.write_ratio))
+        print(f"{n_threads:>8} {results[0]:>12.0f}/s {results[1]:>12.0f}/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Benchmark: Spotify HTTP layer against the fake API (in process, no sockets).
+
+A burst of device refreshes, searches and playback changes hits a rate-limited
+fake Spotify. Compares firing everything on a bare httpx.AsyncClient with the
+SpotifyHttpClient (token bucket, Retry-After, priorities).
+
+    python benchmarks/bench_spotify_http.py --requests 200 --rate-limit 50
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+sys.path.insert(0, ROOT)
+
+import httpx
+
+from benchmarks.fake_spotify import create_app
+from music.http import RequestPriority, SpotifyHttpClient
+
+
+CALLS = [
+    (RequestPriority.PLAYBACK, "PUT", "/me/player/play", {}),
+    (RequestPriority.SEARCH, "GET", "/search", {"params": {"q": 'genre:"metal"'}}),
+    (RequestPriority.DEVICES, "GET", "/me/player/devices", {}),
+]
+
+
+async def bearer():
+    return "Bearer bench"
+
+
+def workload(n, rng):
+    return [rng.choice(CALLS) for _ in range(n)]
+
+
+def report(name, latencies, statuses, elapsed):
+
+    ok = sum(1 for s in statuses if s < 400)
+    print(f"{name}: {ok}/{len(statuses)} ok, {statuses.count(429)} x 429, {elapsed:.2f}s")
+    for priority in RequestPriority:
+        values = sorted(latencies.get(priority, []))
+        if values:
+            print(f"    {priority.name:<9} p50 {1000 * values[len(values) // 2]:7.1f}ms  max {1000 * values[-1]:7.1f}ms")
+
+
+async def run_naive(calls, rate_limit, latency):
+
+    app = create_app(rate_limit=rate_limit, latency=latency)
+    latencies, statuses = {}, []
+
+    async with httpx.AsyncClient(base_url="http://fake/v1", transport=httpx.ASGITransport(app=app)) as client:
+
+        async def call(priority, method, path, kwargs):
+            start = time.perf_counter()
+            response = await client.request(method, path, headers={"Authorization": "Bearer bench"}, **kwargs)
+            latencies.setdefault(priority, []).append(time.perf_counter() - start)
+            statuses.append(response.status_code)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(call(*c) for c in calls))
+        report("bare httpx", latencies, statuses, time.perf_counter() - start)
+
+
+async def run_scheduled(calls, rate_limit, latency, rate):
+
+    app = create_app(rate_limit=rate_limit, latency=latency)
+    client = SpotifyHttpClient(
+        "http://fake/v1", bearer, rate=rate, burst=rate, max_retries=10, transport=httpx.ASGITransport(app=app)
+    )
+    await client.start()
+    latencies, statuses = {}, []
+
+    async def call(priority, method, path, kwargs):
+        start = time.perf_counter()
+        response = await client.request(method, path, priority=priority, **kwargs)
+        latencies.setdefault(priority, []).append(time.perf_counter() - start)
+        statuses.append(response.status_code)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(call(*c) for c in calls))
+    report("SpotifyHttpClient", latencies, statuses, time.perf_counter() - start)
+    print(f"    client saw {client.throttled} x 429 (retried)")
+    await client.close()
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--rate-limit", type=int, default=50, help="fake API requests per second")
+    parser.add_argument("--rate", type=float, default=45.0, help="client token bucket rate")
+    parser.add_argument("--latency", type=float, default=0.01, help="fake API latency, seconds")
+    args = parser.parse_args()
+
+    calls = workload(args.requests, random.Random(0))
+    asyncio.run(run_naive(calls, args.rate_limit, args.latency))
+    asyncio.run(run_scheduled(calls, args.rate_limit, args.latency, args.rate))
+
+
+if __name__ == "__main__":
+    main()
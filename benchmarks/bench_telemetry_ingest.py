@@ -0,0 +1,166 @@
+"""
+Benchmark: telemetry ingestion paths.
+
+Every session sends frames metric updates:
+- POST /telemetry sends the full TelemetryPayload each time;
+- POST /telemetry/batch sends one columnar batch of all the sessions per tick (gateway);
+- the WebSocket stream binds the session once and sends only the changed metric.
+In process (httpx.ASGITransport / ASGIWebSocket), so the numbers compare
+routing, validation and engine work, not the network.
+
+    python benchmarks/bench_telemetry_ingest.py --sessions 50 --frames 200
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+sys.path.insert(0, ROOT)
+
+import httpx
+from fastapi import FastAPI
+
+from shared import logger
+import src.shared.logger as src_logger
+
+# the logger needs a folder before any module creates one
+logger._Logger._folder = src_logger._Logger._folder = tempfile.mkdtemp()
+
+from cache.interface import IAsyncCache
+from database.adapter import AsyncDatabaseAdapter
+from database.memory import MemoryService
+from engine.orchestrator import Orchestrator
+from schemas.session import SessionConfig, SessionState, TriggerRule
+from src.api import routes
+from benchmarks.ws_client import ASGIWebSocket
+
+
+METRICS = ["hp", "sanity", "stress", "fear"]
+
+
+class MemoryCache(IAsyncCache):
+
+    def __init__(self):
+        self.telemetry = {}
+        self.sessions = {}
+
+    async def connect(self): pass
+
+    async def close(self): pass
+
+    async def set_telemetry(self, payload):
+        self.telemetry[payload.session_id] = payload
+
+    async def get_telemetry(self, session_id):
+        return self.telemetry.get(session_id)
+
+    async def set_session(self, payload):
+        self.sessions[payload.config.session_id] = payload
+
+    async def get_session(self, session_id):
+        return self.sessions.get(session_id)
+
+
+class NullDispatcher:
+
+    def submit(self, session_id, genre, priority=0):
+        pass
+
+
+def workload(n_frames, rng):
+    """(metric, value) updates of one session"""
+    return [(rng.choice(METRICS), rng.uniform(0, 100)) for _ in range(n_frames)]
+
+
+async def setup(n_sessions):
+
+    orchestrator = Orchestrator(cache=MemoryCache(), db=AsyncDatabaseAdapter(MemoryService()))
+    routes.state.orchestrator = orchestrator
+    routes.state.music_dispatcher = NullDispatcher()
+
+    rules = [TriggerRule(metric_name=m, operator="lt", threshold=10, target_genre=f"{m}-low", priority=i) for i, m in enumerate(METRICS)]
+    for i in range(n_sessions):
+        await orchestrator.process_session(SessionState(config=SessionConfig(session_id=f"table_{i}", default_genre="calm", rules=rules)))
+
+    app = FastAPI()
+    app.include_router(routes.router)
+    return app
+
+
+async def run_post(app, sessions):
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+
+        async def session(session_id, updates):
+            metrics = {m: 50.0 for m in METRICS}
+            for metric, value in updates:
+                metrics[metric] = value
+                await client.post("/v0.1/telemetry", json={"session_id": session_id, "metrics": metrics})
+
+        await asyncio.gather(*(session(session_id, updates) for session_id, updates in sessions.items()))
+
+
+async def run_batch(app, sessions):
+
+    session_ids = list(sessions)
+    rows = {session_id: {m: 50.0 for m in METRICS} for session_id in session_ids}
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        for tick in range(len(sessions[session_ids[0]])):
+            for session_id in session_ids:
+                metric, value = sessions[session_id][tick]
+                rows[session_id][metric] = value
+            await client.post("/v0.1/telemetry/batch", json={
+                "session_ids": session_ids,
+                "metric_names": METRICS,
+                "values": [[rows[session_id][m] for m in METRICS] for session_id in session_ids]
+            })
+
+
+async def run_stream(app, sessions):
+
+    async def session(session_id, updates):
+        async with ASGIWebSocket(app, "/v0.1/telemetry/stream") as ws:
+            await ws.send_json({"session_id": session_id})
+            await ws.receive_json()
+            await ws.send_json({"m": {m: 50.0 for m in METRICS}})
+            for metric, value in updates:
+                await ws.send_json({"m": {metric: value}})
+        # leaving the block waits for the server to process every frame
+
+    await asyncio.gather(*(session(session_id, updates) for session_id, updates in sessions.items()))
+
+
+def main():
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sessions", type=int, default=50)
+    parser.add_argument("--frames", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    sessions = {f"table_{i}": workload(args.frames, rng) for i in range(args.sessions)}
+    total = args.sessions * args.frames
+
+    print(f"{args.sessions} sessions x {args.frames} frames")
+    runners = (("POST /telemetry", run_post), ("POST /telemetry/batch", run_batch), ("WS /telemetry/stream", run_stream))
+    for name, runner in runners:
+
+        async def scenario():
+            app = await setup(args.sessions)
+            start = time.perf_counter()
+            await runner(app, sessions)
+            return time.perf_counter() - start
+
+        elapsed = asyncio.run(scenario())
+        print(f"{name:<22} {elapsed:7.2f}s  {total / elapsed:9.0f} frames/s  {1e6 * elapsed / total:7.1f} us/frame")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Benchmark: per-payload validation cost of TelemetryPayload.
+
+For growing metric maps compares the finiteness check alone (the old
+per-metric math.isfinite loop against non_finite_metric) and a whole payload:
+full validation with the old validator, full validation now, and the trusted
+model_construct path used inside the engine.
+
+    python benchmarks/bench_validation.py --sizes 4 16 64 256 1024
+"""
+import argparse
+import math
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from pydantic import field_validator
+
+from schemas.metrics import TelemetryPayload, non_finite_metric
+
+
+def legacy_check(metrics):
+    for key, value in metrics.items():
+        if not math.isfinite(value):
+            return key
+    return None
+
+
+class LegacyTelemetryPayload(TelemetryPayload):
+    """TelemetryPayload with the validator before the fast path"""
+
+    @field_validator("metrics")
+    @classmethod
+    def check_metrics_integrity(cls, v):
+        if not v:
+            raise ValueError("Il payload delle metriche non può essere vuoto")
+        for key, value in v.items():
+            if not math.isfinite(value):
+                raise ValueError(f"La metrica {key} ha un valore infinito non valido: {value}.")
+        return v
+
+
+def per_call_us(fn, number):
+    return 1e6 * min(timeit.repeat(fn, number=number, repeat=5)) / number
+
+
+def main():
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[4, 16, 64, 256, 1024])
+    parser.add_argument("--number", type=int, default=2000)
+    args = parser.parse_args()
+
+    print(f"{'metrics':>8} | {'check old':>10} {'check new':>10} | {'full old':>10} {'full new':>10} {'trusted':>10}  (us per payload)")
+
+    for size in args.sizes:
+        metrics = {f"metric_{i}": float(i) for i in range(size)}
+        data = {"session_id": "table_1", "timestamp": 1.0, "metrics": metrics}
+
+        row = [
+            per_call_us(lambda: legacy_check(metrics), args.number),
+            per_call_us(lambda: non_finite_metric(metrics), args.number),
+            per_call_us(lambda: LegacyTelemetryPayload.model_validate(data), args.number),
+            per_call_us(lambda: TelemetryPayload.model_validate(data), args.number),
+            per_call_us(lambda: TelemetryPayload.model_construct(**data), args.number),
+        ]
+        print(f"{size:>8} | {row[0]:>10.2f} {row[1]:>10.2f} | {row[2]:>10.2f} {row[3]:>10.2f} {row[4]:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
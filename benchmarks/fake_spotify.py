@@ -0,0 +1,96 @@
+"""
+Fake Spotify Web API for tests and benchmarks: the endpoints used by the
+provider, optional per-second rate limit (429 + Retry-After) and latency.
+
+In process (no sockets), as in the tests:
+
+    httpx.ASGITransport(app=create_app(rate_limit=5))
+
+As a server, pointing SPOTIFY_API_URL at it:
+
+    uvicorn benchmarks.fake_spotify:app --port 8090
+"""
+import asyncio
+import time
+from collections import deque
+from typing import Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response
+
+
+DEVICES = [
+    {"id": "device_pc", "name": "PC", "is_active": True, "type": "Computer", "volume_percent": 50},
+    {"id": "device_phone", "name": "Phone", "is_active": False, "type": "Smartphone", "volume_percent": 80},
+]
+
+
+def tracks(genre: str, n: int = 20) -> list:
+    return [{"uri": f"spotify:track:{genre}{i:02d}", "name": f"{genre} {i}"} for i in range(n)]
+
+
+def create_app(rate_limit: Optional[int] = None, latency: float = 0.0) -> FastAPI:
+    """rate_limit: requests per second before answering 429; latency: seconds per request"""
+
+    app = FastAPI(title="Fake Spotify")
+    app.state.calls = []      # (method, path) in arrival order
+    app.state.throttled = 0
+    app.state.devices = [dict(device) for device in DEVICES]
+    window = deque()
+
+    @app.middleware("http")
+    async def limit(request: Request, call_next):
+
+        if not request.headers.get("Authorization", "").startswith("Bearer "):
+            return JSONResponse({"error": {"status": 401, "message": "No token provided"}}, status_code=401)
+
+        now = time.monotonic()
+        while window and now - window[0] >= 1.0:
+            window.popleft()
+
+        if rate_limit is not None and len(window) >= rate_limit:
+            app.state.throttled += 1
+            # seconds until the oldest request leaves the 1 second window
+            retry_after = 1.0 - (now - window[0])
+            return JSONResponse(
+                {"error": {"status": 429, "message": "API rate limit exceeded"}},
+                status_code=429, headers={"Retry-After": f"{retry_after:.3f}"}
+            )
+
+        window.append(now)
+        app.state.calls.append((request.method, request.url.path))
+
+        if latency:
+            await asyncio.sleep(latency)
+
+        return await call_next(request)
+
+    @app.get("/v1/me/player/devices")
+    async def devices():
+        return {"devices": app.state.devices}
+
+    @app.get("/v1/search")
+    async def search(q: str, type: str = "track", limit: int = 20):
+        genre = q.split(":", 1)[-1].strip('"')
+        return {"tracks": {"items": tracks(genre, limit)}}
+
+    @app.get("/v1/recommendations")
+    async def recommendations(seed_genres: str, limit: int = 20, target_energy: float = 0.5, target_valence: float = 0.5):
+        return {"tracks": tracks(f"{seed_genres}-{target_energy:.2f}-{target_valence:.2f}", limit)}
+
+    @app.put("/v1/me/player/play")
+    async def play(device_id: Optional[str] = None):
+        return Response(status_code=204)
+
+    @app.put("/v1/me/player/volume")
+    async def volume(volume_percent: int, device_id: Optional[str] = None):
+        return Response(status_code=204)
+
+    @app.put("/v1/me/player/pause")
+    async def pause(device_id: Optional[str] = None):
+        return Response(status_code=204)
+
+    return app
+
+
+app = create_app()
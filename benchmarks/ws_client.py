@@ -0,0 +1,96 @@
+"""
+In-process WebSocket client over an ASGI app, the WebSocket counterpart of
+httpx.ASGITransport: no sockets and no websockets package, for the tests
+and the streaming benchmark.
+
+    async with ASGIWebSocket(app, "/v0.1/telemetry/stream") as ws:
+        await ws.send_json({"session_id": "table_1"})
+        print(await ws.receive_json())
+"""
+import asyncio
+import json
+from typing import Optional
+
+
+class WebSocketClosed(Exception):
+
+    def __init__(self, code: int, reason: str = ""):
+        super().__init__(f"WebSocket closed ({code}) {reason}")
+        self.code = code
+        self.reason = reason
+
+
+class ASGIWebSocket(object):
+
+    def __init__(self, app, path: str):
+        self._app = app
+        self._path = path
+        self._incoming: Optional[asyncio.Queue] = None
+        self._outgoing: Optional[asyncio.Queue] = None
+        self._accepted: Optional[asyncio.Future] = None
+        self._task: Optional[asyncio.Task] = None
+
+
+    async def __aenter__(self) -> "ASGIWebSocket":
+
+        self._incoming = asyncio.Queue()
+        self._outgoing = asyncio.Queue()
+        self._accepted = asyncio.get_running_loop().create_future()
+
+        scope = {
+            "type": "websocket",
+            "asgi": {"version": "3.0"},
+            "scheme": "ws",
+            "http_version": "1.1",
+            "path": self._path,
+            "raw_path": self._path.encode(),
+            "root_path": "",
+            "query_string": b"",
+            "headers": [(b"host", b"testserver")],
+            "client": ("testclient", 50000),
+            "server": ("testserver", 80),
+            "subprotocols": []
+        }
+        self._incoming.put_nowait({"type": "websocket.connect"})
+        self._task = asyncio.create_task(self._app(scope, self._incoming.get, self._send))
+
+        await self._accepted
+        return self
+
+
+    async def __aexit__(self, *exc) -> None:
+        self._incoming.put_nowait({"type": "websocket.disconnect", "code": 1000})
+        await self._task
+
+
+    async def _send(self, message: dict) -> None:
+
+        if message["type"] == "websocket.accept":
+            self._accepted.set_result(True)
+
+        elif message["type"] == "websocket.send":
+            self._outgoing.put_nowait(message.get("text") or message.get("bytes"))
+
+        elif message["type"] == "websocket.close":
+            closed = WebSocketClosed(message.get("code", 1000), message.get("reason") or "")
+            if not self._accepted.done():
+                self._accepted.set_exception(closed)
+            self._outgoing.put_nowait(closed)
+
+
+    async def send_json(self, data) -> None:
+        self._incoming.put_nowait({"type": "websocket.receive", "text": json.dumps(data)})
+
+
+    async def send_text(self, text: str) -> None:
+        self._incoming.put_nowait({"type": "websocket.receive", "text": text})
+
+
+    async def receive_json(self, timeout: float = 1.0):
+
+        message = await asyncio.wait_for(self._outgoing.get(), timeout)
+        if isinstance(message, WebSocketClosed):
+            raise message
+
+        return json.loads(message)
+
@@ -5,9 +5,16 @@ from fastapi import FastAPI
 
 # internal imports
 from src.cache.factory import CacheFactory
+from src.cache.tiered import TieredCache
+from src.cache.shared_table import SharedSessionTable, SharedTableCache
 from src.database.factory import DatabaseFactory
+from src.database.write_behind import AsyncWriteBehindDatabase
+from src.database.history import HistoryDatabase, TelemetryHistory
 from src.music.factory import MusicFactory
+from src.music.dispatcher import MusicDispatcher
+from src.music.ramps import RampScheduler, TimerWheel
 from src.engine.orchestrator import Orchestrator
+from src.engine.events import SessionBroadcaster
 from src.shared.logger import get_logger
 from src.shared.config import settings
 from src.api.routes import router, state
@@ -27,14 +34,72 @@ async def lifespan(app: FastAPI):
 
     log.info("🚀 Server Starting...")
 
-    try:
+    cache = db = music = dispatcher = None
 
-        cache = CacheFactory.get_cache(settings.CHACHE_TYPE)
-        db = DatabaseFactory.get_database(settings.DB_TYPE)
-        music = MusicFactory.get_music_provider(settings.MUSIC_PROVIDER)
+    try:
 
-        state.orchestrator = Orchestrator(cache=cache, database=db)
-        state.music_provider = music
+        # asyncio backends: the event loop is never blocked by I/O
+        cache = await CacheFactory.get_async_cache(settings.CHACHE_TYPE)
+        db = await DatabaseFactory.get_async_database(settings.DB_TYPE)
+        music = await MusicFactory.get_async_music_provider(settings.MUSIC_PROVIDER)
+
+        if settings.L1_CACHE:
+            # validated objects kept in process, Redis stays the shared tier
+            cache = TieredCache(
+                cache,
+                max_entries=settings.L1_MAX_ENTRIES,
+                session_ttl=settings.L1_SESSION_TTL,
+                telemetry_ttl=settings.L1_TELEMETRY_TTL,
+                channel=settings.L1_INVALIDATION_CHANNEL
+            )
+            await cache.connect()
+
+        if settings.SHARED_TABLE:
+            # every uvicorn worker attaches to the same table, the first one creates it
+            table = SharedSessionTable.attach(
+                settings.SHARED_TABLE_NAME,
+                slots=settings.SHARED_TABLE_SLOTS,
+                max_metrics=settings.SHARED_TABLE_METRICS
+            )
+            cache = SharedTableCache(cache, table)
+            await cache.connect()
+
+        if settings.WRITE_BEHIND:
+            # DB writes leave the request path, the cache write stays on it
+            db = AsyncWriteBehindDatabase(
+                db,
+                flush_interval=settings.WRITE_BEHIND_INTERVAL,
+                batch_size=settings.WRITE_BEHIND_BATCH_SIZE,
+                max_pending=settings.WRITE_BEHIND_MAX_PENDING,
+                max_attempts=settings.WRITE_BEHIND_MAX_ATTEMPTS
+            )
+            await db.connect()
+
+        if settings.HISTORY:
+            # outside write-behind: every point is recorded, not only the coalesced ones
+            db = HistoryDatabase(db, TelemetryHistory(
+                raw_capacity=settings.HISTORY_RAW_POINTS,
+                rollup_interval=settings.HISTORY_ROLLUP_INTERVAL,
+                rollup_capacity=settings.HISTORY_ROLLUPS,
+                max_sessions=settings.HISTORY_MAX_SESSIONS,
+                max_metrics=settings.HISTORY_MAX_METRICS
+            ))
+            await db.connect()
+
+        # state changes fanned out to the dashboards subscribed on this worker
+        events = SessionBroadcaster(queue_size=settings.EVENTS_QUEUE_SIZE, keepalive=settings.EVENTS_KEEPALIVE)
+        state.orchestrator = Orchestrator(cache=cache, db=db, events=events)
+        # Spotify calls leave the request path, one per settled transition
+        ramps = None
+        if settings.MUSIC_CROSSFADE > 0:
+            # one timer wheel for the volume ramps of every session
+            ramps = RampScheduler(music, TimerWheel(tick=settings.MUSIC_RAMP_TICK), step=settings.MUSIC_RAMP_STEP)
+        dispatcher = MusicDispatcher(
+            music, debounce=settings.MUSIC_DEBOUNCE, workers=settings.MUSIC_WORKERS,
+            ramps=ramps, crossfade=settings.MUSIC_CROSSFADE, max_sessions=settings.MUSIC_MAX_SESSIONS
+        )
+        await dispatcher.start()
+        state.music_dispatcher = dispatcher
 
         log.info("✅ All systems go.")
         yield # Server starting accepting requests
@@ -44,6 +109,10 @@ async def lifespan(app: FastAPI):
         raise e
     
     finally:
+        # flush pending telemetry and release connections
+        for component in (dispatcher, db, cache, music):
+            if component is not None:
+                await component.close()
         log.info("🛑 Server shutting down.")
 
 
@@ -1,10 +1,21 @@
-from fastapi import APIRouter, Depends, BackgroundTasks, HTTPException
+import asyncio
+import json
+import math
+import time
+from typing import List, Optional, Union
 
-from src.schemas.metrics import TelemetryPayload
+from fastapi import APIRouter, Depends, BackgroundTasks, HTTPException, WebSocket
+from fastapi.responses import StreamingResponse
+
+from src.schemas.metrics import TelemetryBatch, TelemetryPayload, non_finite_metric
 from src.schemas.session import SessionConfig, SessionState
 from src.engine.interface import IOrchestrator
-from src.music.interface import IMusicProvider
+from src.engine.transitions import Transition
+from src.engine.events import encode_event, state_event
+from src.music.dispatcher import MusicDispatcher
 from src.shared.logger import get_logger
+# stesso modulo dei backend (shared.decorator): src.shared.decorator avrebbe un registro di breaker separato
+from shared.decorator import breakers
 
 log = get_logger("ROUTES")
 
@@ -16,7 +27,7 @@ router = APIRouter(prefix='/v0.1')
 # --- GLOBAL STATE CONTAINER ---
 class AppState:
     orchestrator: IOrchestrator = None
-    music_provider = None
+    music_dispatcher: MusicDispatcher = None
 
 state = AppState()
 
@@ -29,17 +40,43 @@ def get_orchestrator():
     return state.orchestrator
 
 def get_music():
-    if not state.music_provider:
+    if not state.music_dispatcher:
         raise HTTPException(status_code=503, detail="Music system offline")
-    return state.music_provider
+    return state.music_dispatcher
+
+
+def to_json_list(values) -> list:
+    """numpy column -> JSON list, NaN (metric assente) -> None"""
+    return [None if math.isnan(v) else v for v in values.tolist()]
+
 
+def transition_priority(transition: Transition) -> int:
+    """Priorità della regola attivata (0 per il ritorno a NOMINAL)"""
+    idx = transition.state.active_rule_index
+    return transition.state.config.rules[idx].priority if idx is not None else 0
 
-# --- BACKGROUND WORKERS ---
 
-def process_music_change(genre: str, provider):
-    """Questa funzione gira in un thread separato"""
-    if genre:
-        provider.play_genre(genre)
+def as_float(value) -> Optional[float]:
+    """Numero JSON -> float, None se non è un numero o non sta in un float (int enorme)"""
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return None
+    try:
+        return float(value)
+    except OverflowError:
+        return None
+
+
+def check_delta(delta) -> Optional[str]:
+    """Errore del frame di metriche, None se valido (stesse regole di TelemetryPayload)"""
+    if not isinstance(delta, dict) or not delta:
+        return "'m' must be a non empty object of metrics"
+    for key, value in delta.items():
+        if as_float(value) is None:
+            return f"Metric {key} is not a valid float"
+    key = non_finite_metric(delta)
+    if key is not None:
+        return f"Metric {key} is not finite: {delta[key]}"
+    return None
 
 
 # --- ENDPOINTS ---
@@ -50,16 +87,48 @@ async def health_check():
     return {"status": "active", "version": "0.1.0"}
 
 
+@router.get("/stats")
+async def get_stats(orchestrator: IOrchestrator = Depends(get_orchestrator)):
+    """Contatori interni (write-behind, cache...) dei componenti che li espongono"""
+    stats = {}
+    for name, component in (("cache", orchestrator.cache), ("database", orchestrator.db)):
+        component_stats = getattr(component, "stats", None)
+        if component_stats:
+            stats[name] = component_stats()
+    if state.music_dispatcher:
+        stats["music"] = state.music_dispatcher.stats()
+        provider_stats = getattr(state.music_dispatcher.provider, "stats", None)
+        if provider_stats:
+            stats["music_http"] = provider_stats()
+        resolver = getattr(state.music_dispatcher.provider, "resolver", None)
+        if resolver:
+            stats["tracks"] = resolver.stats()
+        if state.music_dispatcher.ramps:
+            stats["music_ramps"] = state.music_dispatcher.ramps.stats()
+    events = getattr(orchestrator, "events", None)
+    if events:
+        stats["events"] = events.stats()
+    stats["circuit_breakers"] = {name: breaker.stats() for name, breaker in breakers().items()}
+    return stats
+
+
 @router.post("/session/setup")
-async def setup_session(config: SessionConfig, orchestrator: IOrchestrator = Depends(get_orchestrator)):
+async def setup_session(
+    config: SessionConfig,
+    background_tasks: BackgroundTasks,
+    orchestrator: IOrchestrator = Depends(get_orchestrator)
+):
     try:
-        # Salviamo la config su DB e Cache
-        orchestrator.db.save_config(config)
-        orchestrator.cache.set_session_state(
-            # Costruiamo uno stato iniziale pulito
-            # (Nota: importare SessionState se serve ricostruirlo qui)
-            pass 
-        )
+        # Salviamo la config su DB e Cache con uno stato iniziale pulito.
+        # process_session invalida anche le regole compilate della sessione.
+        if not await orchestrator.process_session(SessionState(config=config)):
+            raise RuntimeError(f"Unable to store session {config.session_id}")
+        if state.music_dispatcher:
+            # sessione ricreata: il primo genere va sempre suonato
+            state.music_dispatcher.forget(config.session_id)
+            # i brani dei generi della sessione sono risolti prima della prima transizione
+            genres = {rule.target_genre for rule in config.rules} | {config.default_genre}
+            background_tasks.add_task(state.music_dispatcher.provider.prefetch, genres)
         return {"message": f"Session {config.session_id} initialized"}
     except Exception as e:
         log.error(f"Setup error: {e}")
@@ -69,20 +138,245 @@ async def setup_session(config: SessionConfig, orchestrator: IOrchestrator = Dep
 @router.post("/telemetry")
 async def ingest_telemetry(
     payload: TelemetryPayload, 
-    background_tasks: BackgroundTasks,
     orchestrator: IOrchestrator = Depends(get_orchestrator),
-    music: IMusicProvider = Depends(get_music)
+    music: MusicDispatcher = Depends(get_music)
 ):
     """
     Endpoint ad alta frequenza (riceve dati ogni secondo).
     Deve essere velocissimo.
     """
     # 1. Process Logic (Veloce: Redis + CPU Rules)
-    target_genre = orchestrator.process_telemetry(payload)
+    transition = await orchestrator.process_transition(payload)
+    target_genre = transition.genre if transition else None
     
-    # 2. Action (Lenta: Chiamata API Spotify) -> Background
+    # 2. Action (Lenta: Chiamata API Spotify) -> Dispatcher
+    # target_genre è valorizzato solo su una vera transizione di stato
     if target_genre:
-        # Non aspettiamo Spotify qui! Lo mandiamo in coda.
-        background_tasks.add_task(process_music_change, target_genre, music)
+        # Non aspettiamo Spotify qui! Il dispatcher tiene solo l'ultimo genere per sessione.
+        music.submit(payload.session_id, target_genre, priority=transition_priority(transition))
     
     return {"status": "processed", "triggered_genre": target_genre}
+
+
+@router.post("/telemetry/batch")
+async def ingest_telemetry_batch(
+    batch: Union[List[TelemetryPayload], TelemetryBatch],
+    orchestrator: IOrchestrator = Depends(get_orchestrator),
+    music: MusicDispatcher = Depends(get_music)
+):
+    """
+    Telemetria di molte sessioni in una richiesta (gateway multi-tavolo):
+    lista di TelemetryPayload o forma colonnare (session_ids, metric_names, values).
+    Scritture bulk su cache e DB, una sola valutazione delle regole, un risultato per payload.
+    """
+    payloads = batch.to_payloads() if isinstance(batch, TelemetryBatch) else batch
+    if not payloads:
+        raise HTTPException(status_code=422, detail="Empty telemetry batch")
+
+    transitions = await orchestrator.process_batch(payloads)
+
+    # un solo submit per sessione: l'ultimo genere in ordine di timestamp, come li ha valutati l'engine
+    latest = {}
+    for i in sorted(range(len(payloads)), key=lambda i: payloads[i].timestamp):
+        if transitions[i] and transitions[i].genre:
+            latest[payloads[i].session_id] = transitions[i]
+    for session_id, transition in latest.items():
+        music.submit(session_id, transition.genre, priority=transition_priority(transition))
+
+    results = []
+    for payload, transition in zip(payloads, transitions):
+        target_genre = transition.genre if transition else None
+        results.append({
+            "session_id": payload.session_id,
+            "triggered_genre": target_genre,
+            "session_status": transition.state.current_status if transition else None
+        })
+
+    return {"status": "processed", "count": len(payloads), "results": results}
+
+
+@router.websocket("/telemetry/stream")
+async def stream_telemetry(websocket: WebSocket):
+    """
+    Telemetria su connessione persistente.
+    Primo frame {"session_id": ...}: la sessione è legata una volta sola.
+    Poi frame {"m": {metrica: valore}, "t": timestamp opzionale} con le sole metriche cambiate;
+    il server risponde solo sulle transizioni: {"seq", "status", "rule", "genre"}.
+    """
+    await websocket.accept()
+
+    orchestrator = state.orchestrator
+    if not orchestrator:
+        await websocket.close(code=1013, reason="System not initialized")
+        return
+
+    # 1) bind della sessione: validata qui, non a ogni frame
+    try:
+        hello = json.loads(await websocket.receive_text())
+        session_id = hello["session_id"]
+    except Exception:
+        await websocket.close(code=1008, reason="First frame must be {\"session_id\": ...}")
+        return
+
+    if not isinstance(session_id, str) or len(session_id) < 3 or not await orchestrator.get_session(session_id):
+        await websocket.close(code=1008, reason=f"Unknown session {session_id}")
+        return
+
+    await websocket.send_json({"session_id": session_id, "status": "bound"})
+
+    # 2) delta: le metriche non inviate restano all'ultimo valore ricevuto
+    metrics = {}
+    seq = 0
+
+    while True:
+        message = await websocket.receive()
+        if message["type"] == "websocket.disconnect":
+            break
+
+        seq += 1
+        try:
+            frame = json.loads(message.get("text") or message.get("bytes") or "")
+            delta = frame.get("m")
+            timestamp = frame.get("t", time.time())
+        except (ValueError, AttributeError):
+            await websocket.send_json({"seq": seq, "error": "Frame must be a JSON object"})
+            continue
+
+        error = check_delta(delta)
+        timestamp = as_float(timestamp)
+        if error is None and (timestamp is None or not math.isfinite(timestamp)):
+            error = "'t' must be a finite timestamp"
+        if error:
+            await websocket.send_json({"seq": seq, "error": error})
+            continue
+
+        metrics.update({key: float(value) for key, value in delta.items()})
+        # già validato: nessun passaggio per Pydantic; copia perché le cache tengono il dict
+        payload = TelemetryPayload.model_construct(session_id=session_id, timestamp=timestamp, metrics=dict(metrics))
+
+        try:
+            transition = await orchestrator.process_transition(payload)
+            if transition is not None and transition.genre and state.music_dispatcher:
+                state.music_dispatcher.submit(session_id, transition.genre, priority=transition_priority(transition))
+        except Exception as e:
+            # backend giù o stato salvato non valido (ValidationError): errore sul frame, lo stream resta aperto
+            log.error(f"Stream error on session {session_id}, frame {seq}: {e}")
+            await websocket.send_json({"seq": seq, "error": "Frame not processed, retry later"})
+            continue
+
+        if transition is None:
+            continue
+
+        await websocket.send_json({
+            "seq": seq,
+            "status": transition.state.current_status,
+            "rule": transition.state.active_rule_metric,
+            "genre": transition.genre
+        })
+
+
+@router.get("/session/{session_id}/history")
+async def get_history(
+    session_id: str,
+    start: float = 0.0,
+    end: Optional[float] = None,
+    resolution: str = "raw",
+    orchestrator: IOrchestrator = Depends(get_orchestrator)
+):
+    """
+    Storico della telemetria tra start ed end (epoch seconds).
+    resolution=raw: punti originali (solo i più recenti), resolution=rollup: min/max/mean per bucket.
+    """
+    end = math.inf if end is None else end
+
+    history = getattr(orchestrator.db, "history", None)
+    if history is None:
+        raise HTTPException(status_code=404, detail="Telemetry history disabled")
+
+    if resolution == "raw":
+        points = history.points(session_id, start, end)
+        if points is None:
+            raise HTTPException(status_code=404, detail=f"No history for session {session_id}")
+        timestamps, metrics = points
+        return {
+            "session_id": session_id,
+            "timestamps": timestamps.tolist(),
+            "metrics": {name: to_json_list(column) for name, column in metrics.items()}
+        }
+
+    if resolution == "rollup":
+        frame = history.rollups(session_id, start, end)
+        if frame is None:
+            raise HTTPException(status_code=404, detail=f"No history for session {session_id}")
+        return {
+            "session_id": session_id,
+            "interval": frame.interval,
+            "start": frame.start.tolist(),
+            "metrics": {
+                name: {
+                    "min": to_json_list(frame.min[name]),
+                    "max": to_json_list(frame.max[name]),
+                    "mean": to_json_list(frame.mean[name]),
+                    "count": frame.count[name].tolist()
+                }
+                for name in frame.min
+            }
+        }
+
+    raise HTTPException(status_code=422, detail=f"Resolution '{resolution}' not supported. Valid values are [raw, rollup]")
+
+
+@router.get("/session/{session_id}/live")
+async def get_live_state(session_id: str, orchestrator: IOrchestrator = Depends(get_orchestrator)):
+    """Ultime metriche e regola attiva dalla tabella condivisa fra i worker (SHARED_TABLE)"""
+    table = getattr(orchestrator.cache, "table", None)
+    if table is None:
+        raise HTTPException(status_code=404, detail="Shared session table disabled")
+
+    live = table.get(session_id)
+    if live is None:
+        raise HTTPException(status_code=404, detail=f"No live state for session {session_id}")
+
+    return {"session_id": session_id, **live._asdict()}
+
+
+@router.get("/session/{session_id}/events")
+async def session_events(session_id: str, orchestrator: IOrchestrator = Depends(get_orchestrator)):
+    """
+    Server-sent events dei cambi di stato della sessione, al posto del polling delle dashboard.
+    Il primo evento è lo stato corrente, poi uno per transizione; un client lento salta
+    gli stati intermedi (coda limitata, scarta i più vecchi).
+    """
+    events = getattr(orchestrator, "events", None)
+    if events is None:
+        raise HTTPException(status_code=404, detail="Session events disabled")
+
+    # iscrizione prima della lettura: nessuna transizione persa fra snapshot e stream
+    subscription = events.subscribe(session_id)
+
+    try:
+        current = await orchestrator.get_session(session_id)
+    except BaseException:
+        # lettura fallita o richiesta annullata: lo stream che la rilascerebbe non parte mai
+        events.unsubscribe(subscription)
+        raise
+
+    if current is None:
+        events.unsubscribe(subscription)
+        raise HTTPException(status_code=404, detail=f"Session {session_id} not found")
+
+    async def stream():
+        try:
+            yield encode_event(state_event(current))
+            while True:
+                try:
+                    yield await subscription.get(timeout=events.keepalive)
+                except asyncio.TimeoutError:
+                    # commento SSE: tiene aperti proxy e load balancer
+                    yield b": keepalive\n\n"
+        finally:
+            events.unsubscribe(subscription)
+
+    return StreamingResponse(
+        stream(), media_type="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -1,10 +1,13 @@
 from .redis import RedisCache
-from .interface import ICache
+from .redis_async import AsyncRedisCache
+from .redis_hash import RedisHashCache, AsyncRedisHashCache
+from .interface import ICache, IAsyncCache
 from enum import Enum
 
 class CacheEnum(str, Enum):
 
     REDIS = "REDIS"
+    REDIS_HASH = "REDIS_HASH" # telemetry as a Redis hash, field-level updates
 
 
 class CacheFactory(object):
@@ -14,9 +17,26 @@ class CacheFactory(object):
 
         if cache_type == CacheEnum.REDIS:
             instance =  RedisCache()
+        elif cache_type == CacheEnum.REDIS_HASH:
+            instance = RedisHashCache()
         else:
-            raise ValueError(f"Cache type '{cache_type}' not supported. Valid values are [REDIS]")
+            raise ValueError(f"Cache type '{cache_type}' not supported. Valid values are [REDIS, REDIS_HASH]")
         
         instance.connect()
 
         return instance
+
+
+    @staticmethod
+    async def get_async_cache(cache_type: CacheEnum) -> IAsyncCache:
+
+        if cache_type == CacheEnum.REDIS:
+            instance = AsyncRedisCache()
+        elif cache_type == CacheEnum.REDIS_HASH:
+            instance = AsyncRedisHashCache()
+        else:
+            raise ValueError(f"Cache type '{cache_type}' not supported. Valid values are [REDIS, REDIS_HASH]")
+
+        await instance.connect()
+
+        return instance
@@ -1,32 +1,92 @@
 from abc import ABC, abstractmethod
-from pydantic import validate_call
-from typing import Optional
+from typing import Dict, List, Optional, Tuple
 from schemas.session import SessionConfig, SessionState
 from schemas.metrics import TelemetryPayload 
 
 
 class ICache(ABC):
+    """
+    Operazioni della cache. I payload arrivano già validati dal bordo dell'API:
+    le implementazioni non li rivalidano.
+    """
 
     @abstractmethod
     def connect(self) -> None:
         pass
 
     @abstractmethod
-    @validate_call
     def set_telemetry(self, payload: TelemetryPayload) -> None:
         pass
 
     @abstractmethod
-    @validate_call
     def get_telemetry(self, session_id: str) -> Optional[TelemetryPayload]:
         pass
 
     @abstractmethod
-    @validate_call
     def set_session(self, payload: SessionState) -> None:
         pass
 
     @abstractmethod
-    @validate_call
     def get_session(self, session_id: str) -> Optional[SessionState]:
         pass
+
+    # --- bulk operations: defaults loop, backends with pipelines override them ---
+
+    def set_telemetry_many(self, payloads: List[TelemetryPayload]) -> None:
+        for payload in payloads:
+            self.set_telemetry(payload)
+
+    def get_telemetry_many(self, session_ids: List[str]) -> Dict[str, Optional[TelemetryPayload]]:
+        return {session_id: self.get_telemetry(session_id) for session_id in session_ids}
+
+    def get_sessions_many(self, session_ids: List[str]) -> Dict[str, Optional[SessionState]]:
+        return {session_id: self.get_session(session_id) for session_id in session_ids}
+
+    def get_state_and_telemetry(self, session_id: str) -> Tuple[Optional[SessionState], Optional[TelemetryPayload]]:
+        return self.get_session(session_id), self.get_telemetry(session_id)
+
+
+class IAsyncCache(ABC):
+    """
+    asyncio counterpart of ICache: every I/O method is a coroutine,
+    so the event loop is never blocked by the cache backend.
+    """
+
+    @abstractmethod
+    async def connect(self) -> None:
+        pass
+
+    @abstractmethod
+    async def close(self) -> None:
+        pass
+
+    @abstractmethod
+    async def set_telemetry(self, payload: TelemetryPayload) -> None:
+        pass
+
+    @abstractmethod
+    async def get_telemetry(self, session_id: str) -> Optional[TelemetryPayload]:
+        pass
+
+    @abstractmethod
+    async def set_session(self, payload: SessionState) -> None:
+        pass
+
+    @abstractmethod
+    async def get_session(self, session_id: str) -> Optional[SessionState]:
+        pass
+
+    # --- bulk operations: defaults loop, backends with pipelines override them ---
+
+    async def set_telemetry_many(self, payloads: List[TelemetryPayload]) -> None:
+        for payload in payloads:
+            await self.set_telemetry(payload)
+
+    async def get_telemetry_many(self, session_ids: List[str]) -> Dict[str, Optional[TelemetryPayload]]:
+        return {session_id: await self.get_telemetry(session_id) for session_id in session_ids}
+
+    async def get_sessions_many(self, session_ids: List[str]) -> Dict[str, Optional[SessionState]]:
+        return {session_id: await self.get_session(session_id) for session_id in session_ids}
+
+    async def get_state_and_telemetry(self, session_id: str) -> Tuple[Optional[SessionState], Optional[TelemetryPayload]]:
+        return await self.get_session(session_id), await self.get_telemetry(session_id)
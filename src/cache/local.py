@@ -0,0 +1,72 @@
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+
+class LRUTTLStore(object):
+    """
+    Bounded in-process store with per-entry TTL and LRU eviction.
+    Meant to be used from a single event loop: no locking.
+    Values are shared, callers must treat them as read-only.
+    """
+
+    def __init__(self, max_entries: int = 10000, clock: Callable[[], float] = time.monotonic):
+        self._max_entries = max_entries
+        self._clock = clock
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+    def get(self, key: Hashable) -> Optional[Any]:
+
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        expires_at, value = entry
+        if expires_at <= self._clock():
+            del self._entries[key]
+            self.expirations += 1
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+
+    def set(self, key: Hashable, value: Any, ttl: float) -> None:
+
+        self._entries[key] = (self._clock() + ttl, value)
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self._max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+
+    def delete(self, key: Hashable) -> bool:
+        return self._entries.pop(key, None) is not None
+
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations
+        }
@@ -1,10 +1,11 @@
 import os
-from typing import Optional
+from typing import Dict, List, Optional, Tuple
 from pydantic import ValidationError
 
 from .interface import ICache
 from schemas.metrics import TelemetryPayload
 from schemas.session import SessionState
+from schemas.codec import CodecError, get_codec, decode_session, decode_telemetry
 
 from shared.logger import get_logger
 from shared.decorator import retry_on_failure
@@ -13,7 +14,49 @@ from shared.config import settings
 import redis
 
 
-class RedisCache(ICache):
+class RedisCodec(object):
+    """
+    Key layout and serialization shared by the sync and asyncio Redis caches.
+    Values are binary blobs of the configured codec (settings.CACHE_CODEC); blobs
+    written by the engine with the current schema version are decoded on the
+    trusted path, without re-validation. Expects self._logger.
+    """
+
+    def _setup_keys(self) -> None:
+        # key templates resolved once: 'sessions/{0}/{1}' -> 'sessions/{0}/telemetry'.format
+        template = os.environ.get("REDIS_COLLECTION", 'sessions/{0}/{1}')
+        self._telemetry_key = template.format("{0}", "telemetry").format
+        self._state_key = template.format("{0}", "state").format
+        self._codec = get_codec(settings.CACHE_CODEC)
+
+
+    def _decode_telemetry(self, session_id: str, data: Optional[bytes]) -> Optional[TelemetryPayload]:
+
+        if not data:
+            self._logger.warning(f"⚠️ Telemetry data not present for session id {session_id}")
+            return None
+
+        try:
+            return decode_telemetry(data, trusted=True)
+        except (ValidationError, CodecError, ValueError) as e:
+            self._logger.warning(f"⚠️ Telemetry data corrupted for session id {session_id}: {e}")
+            return None
+
+
+    def _decode_session(self, session_id: str, data: Optional[bytes]) -> Optional[SessionState]:
+
+        if not data:
+            self._logger.warning(f"⚠️ Session state data not present for session id {session_id}")
+            return None
+
+        try:
+            return decode_session(data, trusted=True)
+        except (ValidationError, CodecError, ValueError) as e:
+            self._logger.warning(f"⚠️ Session state data corrupted for session id {session_id}: {e}")
+            return None
+
+
+class RedisCache(RedisCodec, ICache):
 
     _instance = None
 
@@ -23,6 +66,7 @@ class RedisCache(ICache):
         self._ttl = 3600 # 1 hour
         self._logger = get_logger("REDIS_CACHE")
         self._initialized = False
+        self._setup_keys()
 
 
     def __new__(cls):
@@ -30,7 +74,7 @@ class RedisCache(ICache):
             cls._instance = super(RedisCache, cls).__new__(cls)
 
         return cls._instance
-    
+
 
     @retry_on_failure(max_retries=5, base_delay=2.0)
     def connect(self):
@@ -40,78 +84,87 @@ class RedisCache(ICache):
         host = settings.REDIS_HOST or 'localhost'
         port = int(settings.REDIS_PORT) or 6379
 
-        self.log.info(f"⚪ Connecting Redis to {host}:{port}...")
+        self._logger.info(f"⚪ Connecting Redis to {host}:{port}...")
 
         self._client = redis.Redis(
-            host=host, 
-            port=port, 
-            decode_responses=True,
+            host=host,
+            port=port,
+            decode_responses=False, # binary codec blobs
             socket_timeout=5
         )
 
         # Ping test
-        self.client.ping()
+        self._client.ping()
         self._initialized = True
 
-        self.log.info("🟢 Redis Connected & Ready.")
+        self._logger.info("🟢 Redis Connected & Ready.")
+
 
-    @retry_on_failure(max_retries=3, base_delay=0.5)
+    @retry_on_failure(max_retries=3, base_delay=0.5, breaker="redis")
     def set_telemetry(self, payload: TelemetryPayload) -> None:
-        
-        key = os.environ.get("REDIS_COLLECTION", 'sessions/{0}/{1}').format(payload.session_id, "telemetry")
-        json_data = payload.model_dump_json()
-        self._client.set(key, json_data, ex=self._ttl)
+
+        self._client.set(self._telemetry_key(payload.session_id), self._codec.encode_telemetry(payload), ex=self._ttl)
 
         self._logger.debug(f"🟢 Saved telemetry data for {payload.session_id}")
 
 
-    @retry_on_failure(max_retries=3, base_delay=0.5)
+    @retry_on_failure(max_retries=3, base_delay=0.5, breaker="redis")
     def get_telemetry(self, session_id: str) -> Optional[TelemetryPayload]:
-        
-        key = os.environ.get("REDIS_COLLECTION", 'sessions/{0}/{1}').format(session_id, "telemetry")
 
-        data = self.client.get(key)
-        if not data:
-            self._logger.warning(f"⚠️ Telemetry data not present for session id {session_id}")
-            return None
-        
-        try:
-            telemetry_data = TelemetryPayload.model_validate_json(data)
-        except ValidationError as e:
-            self._logger.warning(f"⚠️ Telemetry data not present for session id {session_id}")
-            return None
-        
-        self._logger.debug(f"🟢 Telemetry data validated for {session_id}")
-        
-        return telemetry_data
+        data = self._client.get(self._telemetry_key(session_id))
+        return self._decode_telemetry(session_id, data)
 
 
-    @retry_on_failure(max_retries=3, base_delay=0.5)
+    @retry_on_failure(max_retries=3, base_delay=0.5, breaker="redis")
     def set_session(self, payload: SessionState) -> None:
-        
-        key = os.environ.get("REDIS_COLLECTION", 'sessions/{0}/{1}').format(payload.config.session_id, "state")
-        json_data = payload.model_dump_json()
-        self._client.set(key, json_data, ex=self._ttl)
+
+        self._client.set(self._state_key(payload.config.session_id), self._codec.encode_session(payload), ex=self._ttl)
 
         self._logger.debug(f"🟢 Saved session state data for {payload.config.session_id}")
 
 
-    @retry_on_failure(max_retries=3, base_delay=0.5)
+    @retry_on_failure(max_retries=3, base_delay=0.5, breaker="redis")
     def get_session(self, session_id: str) -> Optional[SessionState]:
-        
-        key = os.environ.get("REDIS_COLLECTION", 'sessions/{0}/{1}').format(session_id, "state")
 
-        data = self.client.get(key)
-        if not data:
-            self._logger.warning(f"⚠️ Session state data corrupted for session id {session_id}")
-            return None
-        
-        try:
-            session_state_data = SessionState.model_validate_json(data)
-        except ValidationError as e:
-            self._logger.warning(f"⚠️ Session state data corrupted for session id {session_id}: {e}")
-            return None
-        
-        self._logger.debug(f"🟢 Session state data validated for {session_id}")
-        
-        return session_state_data
+        data = self._client.get(self._state_key(session_id))
+        return self._decode_session(session_id, data)
+
+
+    # --- bulk operations: one round-trip whatever the number of sessions ---
+
+    @retry_on_failure(max_retries=3, base_delay=0.5, breaker="redis")
+    def set_telemetry_many(self, payloads: List[TelemetryPayload]) -> None:
+
+        if not payloads: return
+
+        pipe = self._client.pipeline(transaction=False)
+        for payload in payloads:
+            pipe.set(self._telemetry_key(payload.session_id), self._codec.encode_telemetry(payload), ex=self._ttl)
+        pipe.execute()
+
+        self._logger.debug(f"🟢 Saved telemetry data for {len(payloads)} sessions")
+
+
+    @retry_on_failure(max_retries=3, base_delay=0.5, breaker="redis")
+    def get_telemetry_many(self, session_ids: List[str]) -> Dict[str, Optional[TelemetryPayload]]:
+
+        if not session_ids: return {}
+
+        values = self._client.mget([self._telemetry_key(sid) for sid in session_ids])
+        return {sid: self._decode_telemetry(sid, data) for sid, data in zip(session_ids, values)}
+
+
+    @retry_on_failure(max_retries=3, base_delay=0.5, breaker="redis")
+    def get_sessions_many(self, session_ids: List[str]) -> Dict[str, Optional[SessionState]]:
+
+        if not session_ids: return {}
+
+        values = self._client.mget([self._state_key(sid) for sid in session_ids])
+        return {sid: self._decode_session(sid, data) for sid, data in zip(session_ids, values)}
+
+
+    @retry_on_failure(max_retries=3, base_delay=0.5, breaker="redis")
+    def get_state_and_telemetry(self, session_id: str) -> Tuple[Optional[SessionState], Optional[TelemetryPayload]]:
+
+        state, telemetry = self._client.mget([self._state_key(session_id), self._telemetry_key(session_id)])
+        return self._decode_session(session_id, state), self._decode_telemetry(session_id, telemetry)
@@ -0,0 +1,142 @@
+from typing import Dict, List, Optional, Tuple
+
+from .interface import IAsyncCache
+from .redis import RedisCodec
+from schemas.metrics import TelemetryPayload
+from schemas.session import SessionState
+
+from shared.logger import get_logger
+from shared.decorator import retry_on_failure
+from shared.config import settings
+
+import redis.asyncio as aioredis
+
+
+class AsyncRedisCache(RedisCodec, IAsyncCache):
+    """
+    RedisCache on top of redis.asyncio: same keys and format, no blocking calls.
+    """
+
+    _instance = None
+
+    def __init__(self):
+        self._client = None
+        # define TTL i.e. life of data
+        self._ttl = 3600 # 1 hour
+        self._logger = get_logger("REDIS_CACHE")
+        self._initialized = False
+        self._setup_keys()
+
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(AsyncRedisCache, cls).__new__(cls)
+
+        return cls._instance
+
+
+    @property
+    def client(self) -> aioredis.Redis:
+        return self._client
+
+
+    @retry_on_failure(max_retries=5, base_delay=2.0)
+    async def connect(self) -> None:
+
+        if self._initialized: return
+
+        host = settings.REDIS_HOST or 'localhost'
+        port = int(settings.REDIS_PORT) or 6379
+
+        self._logger.info(f"⚪ Connecting async Redis to {host}:{port}...")
+
+        self._client = aioredis.Redis(
+            host=host,
+            port=port,
+            decode_responses=False, # binary codec blobs
+            socket_timeout=5
+        )
+
+        # Ping test
+        await self._client.ping()
+        self._initialized = True
+
+        self._logger.info("🟢 Async Redis Connected & Ready.")
+
+
+    async def close(self) -> None:
+
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+            self._initialized = False
+
+
+    @retry_on_failure(max_retries=3, base_delay=0.5, breaker="redis")
+    async def set_telemetry(self, payload: TelemetryPayload) -> None:
+
+        await self._client.set(self._telemetry_key(payload.session_id), self._codec.encode_telemetry(payload), ex=self._ttl)
+
+        self._logger.debug(f"🟢 Saved telemetry data for {payload.session_id}")
+
+
+    @retry_on_failure(max_retries=3, base_delay=0.5, breaker="redis")
+    async def get_telemetry(self, session_id: str) -> Optional[TelemetryPayload]:
+
+        data = await self._client.get(self._telemetry_key(session_id))
+        return self._decode_telemetry(session_id, data)
+
+
+    @retry_on_failure(max_retries=3, base_delay=0.5, breaker="redis")
+    async def set_session(self, payload: SessionState) -> None:
+
+        await self._client.set(self._state_key(payload.config.session_id), self._codec.encode_session(payload), ex=self._ttl)
+
+        self._logger.debug(f"🟢 Saved session state data for {payload.config.session_id}")
+
+
+    @retry_on_failure(max_retries=3, base_delay=0.5, breaker="redis")
+    async def get_session(self, session_id: str) -> Optional[SessionState]:
+
+        data = await self._client.get(self._state_key(session_id))
+        return self._decode_session(session_id, data)
+
+
+    # --- bulk operations: one round-trip whatever the number of sessions ---
+
+    @retry_on_failure(max_retries=3, base_delay=0.5, breaker="redis")
+    async def set_telemetry_many(self, payloads: List[TelemetryPayload]) -> None:
+
+        if not payloads: return
+
+        async with self._client.pipeline(transaction=False) as pipe:
+            for payload in payloads:
+                pipe.set(self._telemetry_key(payload.session_id), self._codec.encode_telemetry(payload), ex=self._ttl)
+            await pipe.execute()
+
+        self._logger.debug(f"🟢 Saved telemetry data for {len(payloads)} sessions")
+
+
+    @retry_on_failure(max_retries=3, base_delay=0.5, breaker="redis")
+    async def get_telemetry_many(self, session_ids: List[str]) -> Dict[str, Optional[TelemetryPayload]]:
+
+        if not session_ids: return {}
+
+        values = await self._client.mget([self._telemetry_key(sid) for sid in session_ids])
+        return {sid: self._decode_telemetry(sid, data) for sid, data in zip(session_ids, values)}
+
+
+    @retry_on_failure(max_retries=3, base_delay=0.5, breaker="redis")
+    async def get_sessions_many(self, session_ids: List[str]) -> Dict[str, Optional[SessionState]]:
+
+        if not session_ids: return {}
+
+        values = await self._client.mget([self._state_key(sid) for sid in session_ids])
+        return {sid: self._decode_session(sid, data) for sid, data in zip(session_ids, values)}
+
+
+    @retry_on_failure(max_retries=3, base_delay=0.5, breaker="redis")
+    async def get_state_and_telemetry(self, session_id: str) -> Tuple[Optional[SessionState], Optional[TelemetryPayload]]:
+
+        state, telemetry = await self._client.mget([self._state_key(session_id), self._telemetry_key(session_id)])
+        return self._decode_session(session_id, state), self._decode_telemetry(session_id, telemetry)
@@ -0,0 +1,291 @@
+import os
+import uuid
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from .local import LRUTTLStore
+from .redis import RedisCache
+from .redis_async import AsyncRedisCache
+from schemas.metrics import TelemetryPayload
+from schemas.session import SessionState
+
+from shared.decorator import retry_on_failure
+from shared.config import settings
+
+
+class RedisHashCodec(object):
+    """
+    Telemetry stored as one Redis hash per session: one field per metric plus
+    TIMESTAMP_FIELD. A write sends only the metrics that changed since the last
+    write of this worker (HSET + EXPIRE in one pipeline); metrics missing from a
+    payload keep their last value.
+
+    The diff is computed against the worker's own last write, kept for
+    HASH_DIFF_TTL seconds. Each write also stamps WRITER_FIELD and reads back the
+    previous writer in the same pipeline: when the hash was last written by
+    another worker (or had expired) the skipped fields may not hold this worker's
+    values, so the payload is written again in full right away.
+
+    MERGES_TELEMETRY tells TieredCache that a read returns the merged hash, not
+    the last payload written.
+    """
+
+    MERGES_TELEMETRY = True
+    TIMESTAMP_FIELD = "__ts"
+    WRITER_FIELD = "__w"
+
+    def _setup_hash(self) -> None:
+        template = os.environ.get("REDIS_COLLECTION", 'sessions/{0}/{1}')
+        self._metrics_key = template.format("{0}", "metrics").format
+        self._written = LRUTTLStore(max_entries=settings.L1_MAX_ENTRIES)
+        self._written_lock = threading.Lock()
+        self._diff_ttl = settings.REDIS_HASH_DIFF_TTL
+        self._writer_id = uuid.uuid4().hex
+
+        self._fields_written = 0
+        self._fields_skipped = 0
+        self._resyncs = 0
+
+
+    def _full_fields(self, payload: TelemetryPayload) -> Dict[str, object]:
+        fields = dict(payload.metrics)
+        fields[self.TIMESTAMP_FIELD] = payload.timestamp
+        fields[self.WRITER_FIELD] = self._writer_id
+        return fields
+
+
+    def _changed_fields(self, payload: TelemetryPayload) -> Tuple[Dict[str, object], bool]:
+        """Fields to HSET for payload (timestamp and writer included), True if it is a diff"""
+
+        with self._written_lock:
+            last = self._written.get(payload.session_id)
+
+        if last is None:
+            changed = dict(payload.metrics)
+        else:
+            changed = {name: value for name, value in payload.metrics.items() if last.get(name) != value}
+
+        self._fields_written += len(changed)
+        self._fields_skipped += len(payload.metrics) - len(changed)
+
+        changed[self.TIMESTAMP_FIELD] = payload.timestamp
+        changed[self.WRITER_FIELD] = self._writer_id
+        return changed, last is not None
+
+
+    def _to_resync(self, payloads: List[TelemetryPayload], diffs: List[bool], writers: list) -> List[TelemetryPayload]:
+        """Payloads written as a diff over a hash this worker was not the last to write"""
+
+        stale = []
+        for payload, diff, writer in zip(payloads, diffs, writers):
+            if isinstance(writer, bytes):
+                writer = writer.decode()
+            if diff and writer != self._writer_id:
+                stale.append(payload)
+
+        self._resyncs += len(stale)
+        return stale
+
+
+    def _remember(self, payload: TelemetryPayload) -> None:
+
+        with self._written_lock:
+            last = self._written.get(payload.session_id) or {}
+            self._written.set(payload.session_id, {**last, **payload.metrics}, self._diff_ttl)
+
+
+    def _forget(self, session_id: str) -> None:
+        # after a failed write the next one must be a full write
+        with self._written_lock:
+            self._written.delete(session_id)
+
+
+    def _decode_hash(self, session_id: str, raw: Dict[bytes, bytes]) -> Optional[TelemetryPayload]:
+
+        if not raw:
+            self._logger.warning(f"⚠️ Telemetry data not present for session id {session_id}")
+            return None
+
+        writer = self.WRITER_FIELD.encode()
+        metrics = {name.decode(): float(value) for name, value in raw.items() if name != writer}
+        timestamp = metrics.pop(self.TIMESTAMP_FIELD, 0.0)
+
+        if not metrics:
+            return None
+
+        # written by the engine from validated payloads: trusted path
+        return TelemetryPayload.model_construct(session_id=session_id, timestamp=timestamp, metrics=metrics)
+
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "hash_fields_written": self._fields_written,
+            "hash_fields_skipped": self._fields_skipped,
+            "hash_resyncs": self._resyncs
+        }
+
+
+class RedisHashCache(RedisHashCodec, RedisCache):
+    """RedisCache with telemetry kept as a Redis hash (CacheEnum.REDIS_HASH)."""
+
+    _instance = None
+
+    def __init__(self):
+        super(RedisHashCache, self).__init__()
+        self._setup_hash()
+
+
+    def set_telemetry(self, payload: TelemetryPayload) -> None:
+        self.set_telemetry_many([payload])
+
+
+    @retry_on_failure(max_retries=3, base_delay=0.5, breaker="redis")
+    def set_telemetry_many(self, payloads: List[TelemetryPayload]) -> None:
+
+        if not payloads: return
+
+        diffs = []
+        pipe = self._client.pipeline(transaction=False)
+        for payload in payloads:
+            key = self._metrics_key(payload.session_id)
+            fields, diff = self._changed_fields(payload)
+            diffs.append(diff)
+            pipe.hget(key, self.WRITER_FIELD)
+            pipe.hset(key, mapping=fields)
+            pipe.expire(key, self._ttl)
+
+        try:
+            results = pipe.execute()
+
+            # another worker wrote in between (or the hash expired): the diff is not enough
+            stale = self._to_resync(payloads, diffs, results[0::3])
+            if stale:
+                pipe = self._client.pipeline(transaction=False)
+                for payload in stale:
+                    pipe.hset(self._metrics_key(payload.session_id), mapping=self._full_fields(payload))
+                pipe.execute()
+        except Exception:
+            for payload in payloads:
+                self._forget(payload.session_id)
+            raise
+
+        for payload in payloads:
+            self._remember(payload)
+
+
+    @retry_on_failure(max_retries=3, base_delay=0.5, breaker="redis")
+    def get_telemetry(self, session_id: str) -> Optional[TelemetryPayload]:
+        return self._decode_hash(session_id, self._client.hgetall(self._metrics_key(session_id)))
+
+
+    @retry_on_failure(max_retries=3, base_delay=0.5, breaker="redis")
+    def get_metrics(self, session_id: str, names: List[str]) -> Dict[str, Optional[float]]:
+        """Only the requested metrics (HMGET), None for the missing ones"""
+        values = self._client.hmget(self._metrics_key(session_id), names)
+        return {name: float(value) if value is not None else None for name, value in zip(names, values)}
+
+
+    @retry_on_failure(max_retries=3, base_delay=0.5, breaker="redis")
+    def get_telemetry_many(self, session_ids: List[str]) -> Dict[str, Optional[TelemetryPayload]]:
+
+        if not session_ids: return {}
+
+        pipe = self._client.pipeline(transaction=False)
+        for session_id in session_ids:
+            pipe.hgetall(self._metrics_key(session_id))
+
+        return {sid: self._decode_hash(sid, raw) for sid, raw in zip(session_ids, pipe.execute())}
+
+
+    @retry_on_failure(max_retries=3, base_delay=0.5, breaker="redis")
+    def get_state_and_telemetry(self, session_id: str) -> Tuple[Optional[SessionState], Optional[TelemetryPayload]]:
+
+        pipe = self._client.pipeline(transaction=False)
+        pipe.get(self._state_key(session_id))
+        pipe.hgetall(self._metrics_key(session_id))
+        state, raw = pipe.execute()
+
+        return self._decode_session(session_id, state), self._decode_hash(session_id, raw)
+
+
+class AsyncRedisHashCache(RedisHashCodec, AsyncRedisCache):
+    """AsyncRedisCache with telemetry kept as a Redis hash (CacheEnum.REDIS_HASH)."""
+
+    _instance = None
+
+    def __init__(self):
+        super(AsyncRedisHashCache, self).__init__()
+        self._setup_hash()
+
+
+    async def set_telemetry(self, payload: TelemetryPayload) -> None:
+        await self.set_telemetry_many([payload])
+
+
+    @retry_on_failure(max_retries=3, base_delay=0.5, breaker="redis")
+    async def set_telemetry_many(self, payloads: List[TelemetryPayload]) -> None:
+
+        if not payloads: return
+
+        diffs = []
+        try:
+            async with self._client.pipeline(transaction=False) as pipe:
+                for payload in payloads:
+                    key = self._metrics_key(payload.session_id)
+                    fields, diff = self._changed_fields(payload)
+                    diffs.append(diff)
+                    pipe.hget(key, self.WRITER_FIELD)
+                    pipe.hset(key, mapping=fields)
+                    pipe.expire(key, self._ttl)
+                results = await pipe.execute()
+
+            # another worker wrote in between (or the hash expired): the diff is not enough
+            stale = self._to_resync(payloads, diffs, results[0::3])
+            if stale:
+                async with self._client.pipeline(transaction=False) as pipe:
+                    for payload in stale:
+                        pipe.hset(self._metrics_key(payload.session_id), mapping=self._full_fields(payload))
+                    await pipe.execute()
+        except Exception:
+            for payload in payloads:
+                self._forget(payload.session_id)
+            raise
+
+        for payload in payloads:
+            self._remember(payload)
+
+
+    @retry_on_failure(max_retries=3, base_delay=0.5, breaker="redis")
+    async def get_telemetry(self, session_id: str) -> Optional[TelemetryPayload]:
+        return self._decode_hash(session_id, await self._client.hgetall(self._metrics_key(session_id)))
+
+
+    @retry_on_failure(max_retries=3, base_delay=0.5, breaker="redis")
+    async def get_metrics(self, session_id: str, names: List[str]) -> Dict[str, Optional[float]]:
+        """Only the requested metrics (HMGET), None for the missing ones"""
+        values = await self._client.hmget(self._metrics_key(session_id), names)
+        return {name: float(value) if value is not None else None for name, value in zip(names, values)}
+
+
+    @retry_on_failure(max_retries=3, base_delay=0.5, breaker="redis")
+    async def get_telemetry_many(self, session_ids: List[str]) -> Dict[str, Optional[TelemetryPayload]]:
+
+        if not session_ids: return {}
+
+        async with self._client.pipeline(transaction=False) as pipe:
+            for session_id in session_ids:
+                pipe.hgetall(self._metrics_key(session_id))
+            results = await pipe.execute()
+
+        return {sid: self._decode_hash(sid, raw) for sid, raw in zip(session_ids, results)}
+
+
+    @retry_on_failure(max_retries=3, base_delay=0.5, breaker="redis")
+    async def get_state_and_telemetry(self, session_id: str) -> Tuple[Optional[SessionState], Optional[TelemetryPayload]]:
+
+        async with self._client.pipeline(transaction=False) as pipe:
+            pipe.get(self._state_key(session_id))
+            pipe.hgetall(self._metrics_key(session_id))
+            state, raw = await pipe.execute()
+
+        return self._decode_session(session_id, state), self._decode_hash(session_id, raw)
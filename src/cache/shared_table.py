@@ -0,0 +1,454 @@
+import os
+import time
+import zlib
+import fcntl
+import struct
+import tempfile
+from collections import OrderedDict
+from multiprocessing import resource_tracker, shared_memory
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from .interface import IAsyncCache
+from schemas.metrics import TelemetryPayload
+from schemas.session import SessionState
+from shared.logger import get_logger
+
+
+# Header: magic (4) | version u32 | slots u32 | max_metrics u32, padded to HEADER_SIZE
+TABLE_MAGIC = b"RESH"
+TABLE_VERSION = 2
+HEADER_SIZE = 64
+_HEADER = struct.Struct("<4sIII")
+
+MAX_PROBES = 16
+READ_RETRIES = 64
+NAME_SIZE = 32
+SESSION_ID_SIZE = 64
+
+_STATUS = {"NOMINAL": 1, "CRITICAL": 2}
+_STATUS_NAMES = {code: name for name, code in _STATUS.items()}
+
+
+def _slot_dtype(max_metrics: int) -> np.dtype:
+    return np.dtype([
+        ("seq", "<u8"),             # seqlock: dispari = scrittura in corso
+        ("timestamp", "<f8"),
+        ("active_since", "<f8"),
+        ("active_rule", "<i4"),     # -1 = nessuna regola attiva
+        ("state_crc", "<u4"),       # crc32 dello SessionState scritto, 0 = sconosciuto
+        ("status", "u1"),           # 0 = stato mai scritto
+        ("n_metrics", "u1"),
+        ("session_id", f"S{SESSION_ID_SIZE}"),
+        ("names", f"S{NAME_SIZE}", (max_metrics,)),
+        ("values", "<f8", (max_metrics,)),
+    ], align=True)
+
+
+class LiveState(NamedTuple):
+    timestamp: float
+    metrics: Dict[str, float]
+    status: Optional[str]
+    active_rule_index: Optional[int]
+    active_since: Optional[float]
+    state_crc: int
+
+
+def state_crc(state: SessionState) -> int:
+    """Fingerprint of the whole state (config included), never 0"""
+    return zlib.crc32(state.model_dump_json().encode()) or 1
+
+
+class SharedSessionTable(object):
+    """
+    Fixed-slot session table in multiprocessing.shared_memory, shared by every
+    worker process on the host: latest metrics, status and active rule per session.
+
+    A session lives in one of MAX_PROBES slots after crc32(session_id) % slots
+    (linear probing; a full window recycles its least recently written slot).
+    Each slot is a seqlock: the writer bumps seq to odd, writes, bumps it to even;
+    a reader copies the slot and retries if seq was odd or changed meanwhile.
+    Writers of different processes are serialized per slot with a byte-range
+    fcntl lock, so readers never lock and writers only contend on the same slot.
+    The slot is chosen before the lock and checked again under it: if another
+    process took or recycled it meanwhile, the writer probes again.
+    """
+
+    def __init__(self, shm: shared_memory.SharedMemory, lock_path: str, created: bool):
+        self._shm = shm
+        self._created = created
+        self._lock_fd = os.open(lock_path, os.O_RDWR | os.O_CREAT, 0o600)
+
+        magic, version, slots, max_metrics = _HEADER.unpack_from(shm.buf, 0)
+        if magic != TABLE_MAGIC or version != TABLE_VERSION:
+            raise ValueError(f"Shared memory {shm.name} is not a session table")
+
+        self.slots = slots
+        self.max_metrics = max_metrics
+
+        table = np.ndarray((slots,), dtype=_slot_dtype(max_metrics), buffer=shm.buf, offset=HEADER_SIZE)
+        # viste per colonna: niente oggetti np.void sul percorso caldo
+        self._seq = table["seq"]
+        self._timestamp = table["timestamp"]
+        self._active_since = table["active_since"]
+        self._active_rule = table["active_rule"]
+        self._state_crc = table["state_crc"]
+        self._status = table["status"]
+        self._n_metrics = table["n_metrics"]
+        self._session_id = table["session_id"]
+        self._names = table["names"]
+        self._values = table["values"]
+        del table
+
+        self.contended_reads = 0
+        self.contended_writes = 0
+        self.evictions = 0
+
+
+    @classmethod
+    def attach(cls, name: str, slots: int = 16384, max_metrics: int = 16) -> "SharedSessionTable":
+        """Create the table, or attach to it if another worker already did"""
+
+        size = HEADER_SIZE + slots * _slot_dtype(max_metrics).itemsize
+
+        try:
+            shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+            created = True
+            # il resto del segmento è già azzerato dal kernel
+            _HEADER.pack_into(shm.buf, 0, TABLE_MAGIC, TABLE_VERSION, slots, max_metrics)
+        except FileExistsError:
+            shm = shared_memory.SharedMemory(name=name)
+            created = False
+            # il creatore potrebbe non aver ancora scritto l'header
+            deadline = time.monotonic() + 1.0
+            while bytes(shm.buf[:4]) != TABLE_MAGIC and time.monotonic() < deadline:
+                time.sleep(0.01)
+
+        # il ciclo di vita è del deployment, non del primo worker che esce
+        resource_tracker.unregister(shm._name, "shared_memory")
+
+        return cls(shm, os.path.join(tempfile.gettempdir(), f"{name}.lock"), created)
+
+
+    @staticmethod
+    def unlink(name: str) -> None:
+        """Remove the table from the system (after every worker detached)"""
+        shm = shared_memory.SharedMemory(name=name)
+        shm.close()
+        # unlink() toglie già il segmento dal resource tracker
+        shm.unlink()
+        try:
+            os.unlink(os.path.join(tempfile.gettempdir(), f"{name}.lock"))
+        except FileNotFoundError:
+            pass
+
+
+    @property
+    def created(self) -> bool:
+        return self._created
+
+
+    def close(self) -> None:
+        # le viste numpy tengono esportato il buffer: vanno rilasciate prima
+        self._seq = self._timestamp = self._active_since = self._active_rule = self._state_crc = None
+        self._status = self._n_metrics = self._session_id = self._names = self._values = None
+        self._shm.close()
+        os.close(self._lock_fd)
+
+
+    # --- slots ---
+
+    def _probe(self, key: bytes) -> range:
+        start = zlib.crc32(key) % self.slots
+        return range(start, start + MAX_PROBES)
+
+
+    def _find(self, key: bytes) -> int:
+        """Slot holding key, -1 if absent"""
+        for i in self._probe(key):
+            slot = i % self.slots
+            if self._session_id[slot] == key:
+                return slot
+        return -1
+
+
+    def _write(self, key: bytes, fields) -> bool:
+
+        if len(key) > SESSION_ID_SIZE:
+            return False
+
+        for _ in range(MAX_PROBES):
+
+            # 1) slot della sessione, altrimenti uno libero, altrimenti il meno recente
+            slot = self._find(key)
+            expected = key
+            if slot < 0:
+                window = [i % self.slots for i in self._probe(key)]
+                free = [s for s in window if not self._session_id[s]]
+                slot = free[0] if free else min(window, key=lambda s: self._timestamp[s])
+                expected = self._session_id[slot]
+
+            # 2) un solo scrittore per slot fra tutti i processi
+            fcntl.lockf(self._lock_fd, fcntl.LOCK_EX, 1, slot)
+            try:
+                owner = self._session_id[slot]
+                if owner != expected:
+                    # fra la scelta e il lock un altro processo ha preso o riciclato lo slot
+                    continue
+                if owner != key and self._find(key) >= 0:
+                    # un altro processo ha appena inserito la sessione altrove
+                    continue
+
+                self._seq[slot] += 1
+                if owner != key:
+                    if owner:
+                        self.evictions += 1
+                    self._session_id[slot] = key
+                    self._status[slot] = 0
+                    self._active_rule[slot] = -1
+                    self._active_since[slot] = 0.0
+                    self._state_crc[slot] = 0
+                    self._n_metrics[slot] = 0
+                fields(slot)
+                self._seq[slot] += 1
+                return True
+            finally:
+                fcntl.lockf(self._lock_fd, fcntl.LOCK_UN, 1, slot)
+
+        self.contended_writes += 1
+        return False
+
+
+    def put_metrics(self, session_id: str, timestamp: float, metrics: Dict[str, float]) -> bool:
+        """
+        False if the payload does not fit a slot (too many metrics, names too long):
+        the slot metrics are emptied, so readers fall back to the durable tier
+        instead of serving the previous payload
+        """
+
+        names = [name.encode() for name in metrics]
+        if len(names) > self.max_metrics or any(len(name) > NAME_SIZE for name in names):
+            self._clear_metrics(session_id.encode(), timestamp)
+            return False
+
+        def fields(slot):
+            self._timestamp[slot] = timestamp
+            self._n_metrics[slot] = len(names)
+            self._names[slot, :len(names)] = names
+            self._values[slot, :len(names)] = list(metrics.values())
+
+        return self._write(session_id.encode(), fields)
+
+
+    def _clear_metrics(self, key: bytes, timestamp: float) -> None:
+
+        if self._find(key) < 0:
+            return
+
+        def fields(slot):
+            self._timestamp[slot] = timestamp
+            self._n_metrics[slot] = 0
+
+        self._write(key, fields)
+
+
+    def put_state(
+        self,
+        session_id: str,
+        status: str,
+        active_rule_index: Optional[int],
+        active_since: Optional[float],
+        crc: int = 0
+    ) -> bool:
+
+        def fields(slot):
+            self._status[slot] = _STATUS.get(status, 0)
+            self._active_rule[slot] = -1 if active_rule_index is None else active_rule_index
+            self._active_since[slot] = active_since or 0.0
+            self._state_crc[slot] = crc
+
+        return self._write(session_id.encode(), fields)
+
+
+    def get(self, session_id: str) -> Optional[LiveState]:
+        """Consistent copy of the session slot, None if absent or under heavy write contention"""
+
+        key = session_id.encode()
+
+        for _ in range(READ_RETRIES):
+            slot = self._find(key)
+            if slot < 0:
+                return None
+
+            before = int(self._seq[slot])
+            if before & 1:
+                continue
+
+            n = int(self._n_metrics[slot])
+            names = self._names[slot, :n].tolist()
+            values = self._values[slot, :n].tolist()
+            timestamp = float(self._timestamp[slot])
+            status = int(self._status[slot])
+            active_rule = int(self._active_rule[slot])
+            active_since = float(self._active_since[slot])
+            crc = int(self._state_crc[slot])
+            owner = self._session_id[slot]
+
+            if int(self._seq[slot]) != before or owner != key:
+                continue
+
+            return LiveState(
+                timestamp=timestamp,
+                metrics={name.decode(): value for name, value in zip(names, values)},
+                status=_STATUS_NAMES.get(status),
+                active_rule_index=None if active_rule < 0 else active_rule,
+                active_since=active_since or None,
+                state_crc=crc
+            )
+
+        self.contended_reads += 1
+        return None
+
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "shared_slots": self.slots,
+            "shared_used": int(np.count_nonzero(self._session_id)),
+            "shared_evictions": self.evictions,
+            "shared_contended_reads": self.contended_reads,
+            "shared_contended_writes": self.contended_writes
+        }
+
+
+class SharedTableCache(IAsyncCache):
+    """
+    IAsyncCache in front of the Redis chain for multi-worker deployments.
+    Latest telemetry and the live rule state go to the SharedSessionTable, so any
+    worker reads them from memory; Redis stays the durable tier and keeps the
+    session configs (variable size) behind the L1 cache.
+
+    A full SessionState does not fit a slot: each worker keeps the last states
+    it wrote or loaded (LRU of max_states), and the slot holds the crc32 of the
+    last state written by any worker. get_session serves the local copy when its
+    crc matches the slot (read under the seqlock); the backend is read only on a
+    miss, a torn or contended read, or a state changed by another worker.
+    """
+
+    def __init__(self, backend: IAsyncCache, table: SharedSessionTable, max_states: Optional[int] = None):
+        self._backend = backend
+        self._table = table
+        self._logger = get_logger("SHARED_TABLE")
+
+        self._states: "OrderedDict[str, Tuple[int, SessionState]]" = OrderedDict()
+        self._max_states = max_states or table.slots
+
+        self.state_hits = 0
+        self.state_misses = 0
+
+
+    @property
+    def table(self) -> SharedSessionTable:
+        return self._table
+
+
+    async def connect(self) -> None:
+        await self._backend.connect()
+        role = "created" if self._table.created else "attached"
+        self._logger.info(f"🟢 Shared session table {role} ({self._table.slots} slots)")
+
+
+    async def close(self) -> None:
+        self._table.close()
+        await self._backend.close()
+
+
+    async def set_telemetry(self, payload: TelemetryPayload) -> None:
+        self._table.put_metrics(payload.session_id, payload.timestamp, payload.metrics)
+        await self._backend.set_telemetry(payload)
+
+
+    async def set_telemetry_many(self, payloads: List[TelemetryPayload]) -> None:
+        for payload in payloads:
+            self._table.put_metrics(payload.session_id, payload.timestamp, payload.metrics)
+        await self._backend.set_telemetry_many(payloads)
+
+
+    async def get_telemetry(self, session_id: str) -> Optional[TelemetryPayload]:
+
+        live = self._table.get(session_id)
+        if live is not None and live.metrics:
+            return TelemetryPayload.model_construct(session_id=session_id, timestamp=live.timestamp, metrics=live.metrics)
+
+        return await self._backend.get_telemetry(session_id)
+
+
+    def _remember(self, session_id: str, crc: int, state: SessionState) -> None:
+        self._states[session_id] = (crc, state)
+        self._states.move_to_end(session_id)
+        if len(self._states) > self._max_states:
+            self._states.popitem(last=False)
+
+
+    def _local_session(self, session_id: str) -> Optional[SessionState]:
+        """Local copy of the state if the slot says it is still the latest one"""
+
+        entry = self._states.get(session_id)
+        if entry is None:
+            return None
+
+        live = self._table.get(session_id)
+        if live is None or live.state_crc != entry[0]:
+            return None
+
+        self._states.move_to_end(session_id)
+        return entry[1]
+
+
+    async def set_session(self, payload: SessionState) -> None:
+        session_id = payload.config.session_id
+        crc = state_crc(payload)
+        self._table.put_state(session_id, payload.current_status, payload.active_rule_index, payload.active_since, crc)
+        await self._backend.set_session(payload)
+        self._remember(session_id, crc, payload)
+
+
+    async def get_session(self, session_id: str) -> Optional[SessionState]:
+
+        state = self._local_session(session_id)
+        if state is not None:
+            self.state_hits += 1
+            return state
+
+        self.state_misses += 1
+        state = await self._backend.get_session(session_id)
+        if state is not None:
+            self._remember(session_id, state_crc(state), state)
+        return state
+
+
+    async def get_sessions_many(self, session_ids: List[str]) -> Dict[str, Optional[SessionState]]:
+
+        sessions = {session_id: self._local_session(session_id) for session_id in session_ids}
+        misses = [session_id for session_id, state in sessions.items() if state is None]
+        self.state_hits += len(sessions) - len(misses)
+        self.state_misses += len(misses)
+
+        if misses:
+            for session_id, state in (await self._backend.get_sessions_many(misses)).items():
+                if state is not None:
+                    self._remember(session_id, state_crc(state), state)
+                sessions[session_id] = state
+
+        return sessions
+
+
+    async def get_state_and_telemetry(self, session_id: str) -> Tuple[Optional[SessionState], Optional[TelemetryPayload]]:
+        return await self.get_session(session_id), await self.get_telemetry(session_id)
+
+
+    def stats(self) -> Dict[str, int]:
+        stats = dict(getattr(self._backend, "stats", dict)())
+        stats.update(self._table.stats())
+        stats.update({"shared_state_hits": self.state_hits, "shared_state_misses": self.state_misses})
+        return stats
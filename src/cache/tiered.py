@@ -0,0 +1,279 @@
+import asyncio
+import uuid
+from typing import Awaitable, Callable, Dict, Hashable, List, Optional, Set, Tuple
+
+from .interface import IAsyncCache
+from .local import LRUTTLStore
+from .redis_async import AsyncRedisCache
+from schemas.metrics import TelemetryPayload
+from schemas.session import SessionState
+
+from shared.logger import get_logger
+
+
+class TieredCache(IAsyncCache):
+    """
+    Two-tier cache: an in-process LRU+TTL tier (L1) in front of AsyncRedisCache (L2).
+
+    L1 holds already validated SessionState / TelemetryPayload objects, so a hit
+    costs neither a Redis round-trip nor a model_validate_json. Writes go through
+    both tiers. Session writes are broadcast on a Redis pub/sub channel and every
+    other worker drops its L1 copy; telemetry changes every second, so it is not
+    broadcast and relies on a short TTL instead.
+
+    A backend read fills L1 only if no write or invalidation of that key
+    happened while it was in flight: a slow read never puts back a value older
+    than the one just written. With a backend that merges telemetry
+    (MERGES_TELEMETRY, the Redis hash: metrics missing from a payload keep their
+    last value) L1 keeps the same merged view instead of the bare payload.
+    """
+
+    def __init__(
+        self,
+        backend: AsyncRedisCache,
+        max_entries: int = 10000,
+        session_ttl: float = 60.0,
+        telemetry_ttl: float = 1.0,
+        channel: str = "resonance:invalidate"
+    ):
+        self._backend = backend
+        self._local = LRUTTLStore(max_entries=max_entries)
+        self._session_ttl = session_ttl
+        self._telemetry_ttl = telemetry_ttl
+        self._channel = channel
+        self._worker_id = uuid.uuid4().hex
+        self._logger = get_logger("TIERED_CACHE")
+
+        self._merges_telemetry = getattr(backend, "MERGES_TELEMETRY", False)
+
+        # key -> backend reads in flight; keys written or invalidated meanwhile
+        self._reading: Dict[Hashable, int] = {}
+        self._stale: Set[Hashable] = set()
+
+        self._listener: Optional[asyncio.Task] = None
+        self._invalidations = 0
+        self._skipped_fills = 0
+
+
+    async def connect(self) -> None:
+
+        await self._backend.connect()
+
+        if self._listener is None:
+            self._listener = asyncio.create_task(self._listen())
+            self._logger.info(f"🟢 L1 cache ready, listening for invalidations on {self._channel}")
+
+
+    async def close(self) -> None:
+
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+
+        self._local.clear()
+        await self._backend.close()
+
+
+    async def _listen(self) -> None:
+
+        while True:
+            pubsub = self._backend.client.pubsub()
+            try:
+                await pubsub.subscribe(self._channel)
+
+                # messages may have been missed while (re)subscribing
+                self._local.clear()
+
+                async for message in pubsub.listen():
+                    if message["type"] != "message":
+                        continue
+
+                    # str or bytes, depending on decode_responses of the client
+                    data = message["data"]
+                    if isinstance(data, bytes):
+                        data = data.decode()
+
+                    worker_id, _, session_id = data.partition("|")
+                    if worker_id != self._worker_id:
+                        self._invalidate(("state", session_id))
+                        self._invalidations += 1
+
+            except asyncio.CancelledError:
+                raise
+
+            except Exception as e:
+                self._logger.error(f"🔴 Invalidation listener error, resubscribing: {e}")
+                await asyncio.sleep(1.0)
+
+            finally:
+                await pubsub.aclose()
+
+
+    def _invalidate(self, key: Hashable) -> None:
+        self._local.delete(key)
+        if key in self._reading:
+            # la lettura in corso porterebbe un valore più vecchio
+            self._stale.add(key)
+
+
+    def _store(self, key: Hashable, value, ttl: float) -> None:
+        """Local write: L1 gets value, reads still in flight will not overwrite it"""
+        if key in self._reading:
+            self._stale.add(key)
+        self._local.set(key, value, ttl)
+
+
+    async def _read_through(self, keys: List[Hashable], fetch: Callable[[], Awaitable], fills: Callable):
+        """
+        Await fetch() and fill L1 with fills(result), (key, value, ttl) triples,
+        skipping the keys written or invalidated during the read
+        """
+
+        for key in keys:
+            self._reading[key] = self._reading.get(key, 0) + 1
+
+        stale = set()
+        try:
+            result = await fetch()
+        finally:
+            for key in keys:
+                if key in self._stale:
+                    stale.add(key)
+                n = self._reading[key] - 1
+                if n:
+                    self._reading[key] = n
+                else:
+                    del self._reading[key]
+                    self._stale.discard(key)
+
+        for key, value, ttl in fills(result):
+            if value is None:
+                continue
+            if key in stale:
+                self._skipped_fills += 1
+            else:
+                self._local.set(key, value, ttl)
+
+        return result
+
+
+    def _store_telemetry(self, payload: TelemetryPayload) -> None:
+
+        key = ("telemetry", payload.session_id)
+
+        if self._merges_telemetry:
+            # L1 come L2: le metriche assenti dal payload restano all'ultimo valore
+            cached = self._local.get(key)
+            if cached is None:
+                # nessuna base da unire: il prossimo get legge la vista completa da L2
+                self._invalidate(key)
+                return
+            payload = TelemetryPayload.model_construct(
+                session_id=payload.session_id, timestamp=payload.timestamp, metrics={**cached.metrics, **payload.metrics}
+            )
+
+        self._store(key, payload, self._telemetry_ttl)
+
+
+    async def set_telemetry(self, payload: TelemetryPayload) -> None:
+        await self._backend.set_telemetry(payload)
+        self._store_telemetry(payload)
+
+
+    async def get_telemetry(self, session_id: str) -> Optional[TelemetryPayload]:
+
+        key = ("telemetry", session_id)
+        payload = self._local.get(key)
+        if payload is not None:
+            return payload
+
+        return await self._read_through(
+            [key], lambda: self._backend.get_telemetry(session_id), lambda value: [(key, value, self._telemetry_ttl)]
+        )
+
+
+    async def set_session(self, payload: SessionState) -> None:
+
+        session_id = payload.config.session_id
+
+        await self._backend.set_session(payload)
+        self._store(("state", session_id), payload, self._session_ttl)
+
+        # tell the other workers their copy is stale
+        await self._backend.client.publish(self._channel, f"{self._worker_id}|{session_id}")
+
+
+    async def get_session(self, session_id: str) -> Optional[SessionState]:
+
+        key = ("state", session_id)
+        state = self._local.get(key)
+        if state is not None:
+            return state
+
+        return await self._read_through(
+            [key], lambda: self._backend.get_session(session_id), lambda value: [(key, value, self._session_ttl)]
+        )
+
+
+    # --- bulk operations: L1 first, one backend round-trip for the misses ---
+
+    async def set_telemetry_many(self, payloads: List[TelemetryPayload]) -> None:
+
+        await self._backend.set_telemetry_many(payloads)
+        for payload in payloads:
+            self._store_telemetry(payload)
+
+
+    async def _get_many(self, kind: str, session_ids: List[str], fetch, ttl: float) -> Dict[str, object]:
+
+        found = {sid: self._local.get((kind, sid)) for sid in session_ids}
+
+        missing = [sid for sid, value in found.items() if value is None]
+        if missing:
+            fetched = await self._read_through(
+                [(kind, sid) for sid in missing], lambda: fetch(missing),
+                lambda result: [((kind, sid), value, ttl) for sid, value in result.items()]
+            )
+            found.update(fetched)
+
+        return found
+
+
+    async def get_telemetry_many(self, session_ids: List[str]) -> Dict[str, Optional[TelemetryPayload]]:
+        return await self._get_many("telemetry", session_ids, self._backend.get_telemetry_many, self._telemetry_ttl)
+
+
+    async def get_sessions_many(self, session_ids: List[str]) -> Dict[str, Optional[SessionState]]:
+        return await self._get_many("state", session_ids, self._backend.get_sessions_many, self._session_ttl)
+
+
+    async def get_state_and_telemetry(self, session_id: str) -> Tuple[Optional[SessionState], Optional[TelemetryPayload]]:
+
+        state = self._local.get(("state", session_id))
+        telemetry = self._local.get(("telemetry", session_id))
+
+        if state is None and telemetry is None:
+            state_key, telemetry_key = ("state", session_id), ("telemetry", session_id)
+            state, telemetry = await self._read_through(
+                [state_key, telemetry_key], lambda: self._backend.get_state_and_telemetry(session_id),
+                lambda result: [(state_key, result[0], self._session_ttl), (telemetry_key, result[1], self._telemetry_ttl)]
+            )
+        elif state is None:
+            state = await self.get_session(session_id)
+        elif telemetry is None:
+            telemetry = await self.get_telemetry(session_id)
+
+        return state, telemetry
+
+
+    def stats(self) -> Dict[str, int]:
+        stats = self._local.stats()
+        stats["invalidations"] = self._invalidations
+        stats["skipped_fills"] = self._skipped_fills
+        if hasattr(self._backend, "stats"):
+            stats.update(self._backend.stats())
+        return stats
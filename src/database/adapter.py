@@ -0,0 +1,57 @@
+import asyncio
+from typing import Dict, List, Optional
+
+from .interface import IAsyncDatabase, IDatabase
+from schemas.metrics import TelemetryPayload
+from schemas.session import SessionState
+
+
+class AsyncDatabaseAdapter(IAsyncDatabase):
+    """
+    Expose a blocking IDatabase (e.g. Firestore) as IAsyncDatabase.
+    Each call runs in the default thread pool, so the event loop keeps serving
+    requests; batch writes cost one thread hop per batch.
+    """
+
+    def __init__(self, delegate: IDatabase):
+        self._delegate = delegate
+
+
+    @property
+    def delegate(self) -> IDatabase:
+        return self._delegate
+
+
+    async def connect(self) -> None:
+        await asyncio.to_thread(self._delegate.connect)
+
+
+    async def close(self) -> None:
+        close = getattr(self._delegate, "close", None)
+        if close:
+            await asyncio.to_thread(close)
+
+
+    async def set_telemetry(self, payload: TelemetryPayload) -> None:
+        await asyncio.to_thread(self._delegate.set_telemetry, payload)
+
+
+    async def set_telemetry_many(self, payloads: List[TelemetryPayload]) -> None:
+        await asyncio.to_thread(self._delegate.set_telemetry_many, payloads)
+
+
+    async def set_session(self, payload: SessionState) -> None:
+        await asyncio.to_thread(self._delegate.set_session, payload)
+
+
+    async def get_telemetry(self, session_id: str) -> Optional[TelemetryPayload]:
+        return await asyncio.to_thread(self._delegate.get_telemetry, session_id)
+
+
+    async def get_session(self, session_id: str) -> Optional[SessionState]:
+        return await asyncio.to_thread(self._delegate.get_session, session_id)
+
+
+    def stats(self) -> Dict[str, float]:
+        stats = getattr(self._delegate, "stats", None)
+        return stats() if stats else {}
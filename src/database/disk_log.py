@@ -0,0 +1,222 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Set
+from urllib.parse import quote, unquote
+
+import numpy as np
+
+from .interface import IDatabase
+from .segment import TelemetrySegment, fsync_directory
+from schemas.metrics import TelemetryPayload
+from schemas.session import SessionState
+from schemas.codec import CodecError, decode_session, get_codec
+from shared.logger import get_logger
+from shared.config import settings
+
+
+class DiskLogService(IDatabase):
+    """
+    Local persistent database: one memory-mapped TelemetrySegment per session
+    (<session>.tlog) plus a session state snapshot (<session>.state: temp file,
+    fsync, atomic replace).
+
+    On connect every segment is replayed through a zero-copy view to rebuild the
+    latest telemetry and states in memory: reads never touch the disk.
+    A segment past max_records is compacted to its most recent half.
+    At most max_open segments stay mapped (LRU): the least recently written one
+    is synced and closed, and reopened on its next write. Every flush_every
+    writes only the segments written since the previous msync are synced.
+    """
+
+    _instance = None
+
+    def __init__(self):
+        self._logger = get_logger("DISK_LOG")
+        self._initialized = False
+
+        self._directory = settings.DISK_LOG_DIR
+        self._max_records = settings.DISK_LOG_MAX_RECORDS
+        self._flush_every = settings.DISK_LOG_FLUSH_EVERY
+        self._max_open = settings.DISK_LOG_MAX_OPEN
+        self._codec = get_codec(settings.CACHE_CODEC)
+
+        self._segments: "OrderedDict[str, TelemetrySegment]" = OrderedDict()
+        self._dirty: Set[str] = set()
+        self._logged: Set[str] = set()
+        self._telemetry_store: Dict[str, TelemetryPayload] = {}
+        self._session_store: Dict[str, SessionState] = {}
+        self._lock = threading.Lock()
+
+        self._writes = 0
+        self._compactions = 0
+        self._segment_evictions = 0
+
+
+    def __new__(cls):
+
+        if cls._instance is None:
+            cls._instance = super(DiskLogService, cls).__new__(cls)
+
+        return cls._instance
+
+
+    def _path(self, session_id: str, suffix: str) -> str:
+        return os.path.join(self._directory, quote(session_id, safe="") + suffix)
+
+
+    def connect(self) -> None:
+
+        if self._initialized: return
+
+        os.makedirs(self._directory, exist_ok=True)
+
+        # 1) replay dei segmenti: l'ultimo record di ogni sessione, poi il segmento si chiude
+        for entry in os.listdir(self._directory):
+            session_id = unquote(entry.rsplit(".", 1)[0])
+
+            if entry.endswith(".tlog"):
+                try:
+                    segment = TelemetrySegment(os.path.join(self._directory, entry))
+                except (ValueError, OSError) as e:
+                    self._logger.warning(f"⚠️ Skipping unreadable segment {entry}: {e}")
+                    continue
+                self._logged.add(session_id)
+                latest = segment.latest()
+                segment.close()
+                if latest is not None:
+                    timestamp, metrics = latest
+                    self._telemetry_store[session_id] = TelemetryPayload.model_construct(
+                        session_id=session_id, timestamp=timestamp, metrics=metrics
+                    )
+
+            # 2) snapshot degli stati
+            elif entry.endswith(".state"):
+                with open(os.path.join(self._directory, entry), "rb") as f:
+                    data = f.read()
+                try:
+                    self._session_store[session_id] = decode_session(data, trusted=True)
+                except (CodecError, ValueError) as e:
+                    self._logger.warning(f"⚠️ Skipping corrupted state {entry}: {e}")
+
+        self._initialized = True
+        self._logger.info(
+            f"💾 DiskLogService ready in {self._directory}: "
+            f"{len(self._logged)} segments, {len(self._session_store)} sessions replayed."
+        )
+
+
+    def close(self) -> None:
+
+        with self._lock:
+            for session_id, segment in self._segments.items():
+                if session_id in self._dirty:
+                    segment.flush()
+                segment.close()
+            self._segments.clear()
+            self._dirty.clear()
+            self._initialized = False
+
+
+    def _segment(self, session_id: str) -> Optional[TelemetrySegment]:
+        """Open segment of the session (LRU), reopened from disk if it was closed; None if never logged"""
+
+        segment = self._segments.get(session_id)
+        if segment is not None:
+            self._segments.move_to_end(session_id)
+            return segment
+
+        if session_id not in self._logged:
+            return None
+
+        segment = TelemetrySegment(self._path(session_id, ".tlog"))
+        self._keep_open(session_id, segment)
+        return segment
+
+
+    def _keep_open(self, session_id: str, segment: TelemetrySegment) -> None:
+
+        self._segments[session_id] = segment
+        self._segments.move_to_end(session_id)
+        self._logged.add(session_id)
+
+        while len(self._segments) > self._max_open:
+            evicted_id, evicted = self._segments.popitem(last=False)
+            if evicted_id in self._dirty:
+                evicted.flush()
+                self._dirty.discard(evicted_id)
+            evicted.close()
+            self._segment_evictions += 1
+
+
+    def set_telemetry(self, payload: TelemetryPayload) -> None:
+
+        with self._lock:
+            segment = self._segment(payload.session_id)
+
+            if segment is None:
+                segment = TelemetrySegment(self._path(payload.session_id, ".tlog"), list(payload.metrics))
+            elif not segment.accepts(payload.metrics):
+                # nuova metrica: lo schema si allarga riscrivendo il segmento
+                names = segment.names + [name for name in payload.metrics if name not in segment.names]
+                segment = segment.rewrite(names, keep_last=segment.count)
+
+            segment.append(payload.timestamp, payload.metrics)
+
+            if segment.count >= self._max_records:
+                segment = segment.rewrite(segment.names, keep_last=self._max_records // 2)
+                self._compactions += 1
+
+            self._dirty.add(payload.session_id)
+            self._keep_open(payload.session_id, segment)
+            self._telemetry_store[payload.session_id] = payload
+
+            self._writes += 1
+            if self._writes % self._flush_every == 0:
+                # solo i segmenti scritti dall'ultimo msync
+                for session_id in self._dirty:
+                    segment = self._segments.get(session_id)
+                    if segment is not None:
+                        segment.flush()
+                self._dirty.clear()
+
+
+    def get_telemetry(self, session_id: str) -> Optional[TelemetryPayload]:
+        return self._telemetry_store.get(session_id)
+
+
+    def get_records(self, session_id: str) -> Optional[np.ndarray]:
+        """All logged records of the session (fields timestamp, values), in segment.names order"""
+        with self._lock:
+            segment = self._segment(session_id)
+            return segment.records() if segment is not None else None
+
+
+    def set_session(self, payload: SessionState) -> None:
+
+        session_id = payload.config.session_id
+        path = self._path(session_id, ".state")
+
+        with self._lock:
+            # tmp completo e su disco prima del replace: un crash lascia il vecchio stato o il nuovo
+            with open(path + ".tmp", "wb") as f:
+                f.write(self._codec.encode_session(payload))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(path + ".tmp", path)
+            fsync_directory(path)
+            self._session_store[session_id] = payload
+
+
+    def get_session(self, session_id: str) -> Optional[SessionState]:
+        return self._session_store.get(session_id)
+
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "segments": len(self._logged),
+            "open_segments": len(self._segments),
+            "segment_evictions": self._segment_evictions,
+            "log_writes": self._writes,
+            "compactions": self._compactions
+        }
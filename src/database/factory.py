@@ -1,7 +1,12 @@
 import os
 from enum import Enum
+from .interface import IAsyncDatabase
 from .firestore import FirebaseService
 from .memory import MemoryService
+from .memory_async import AsyncMemoryService
+from .disk_log import DiskLogService
+from .sqlite import SQLiteService
+from .adapter import AsyncDatabaseAdapter
 
 
 class DBEnum(str, Enum):
@@ -9,6 +14,7 @@ class DBEnum(str, Enum):
     FIRESTORE = 'FIRESTORE'
     SQL = 'SQL'
     MEMORY = 'MEMORY'
+    DISK = 'DISK'
 
 
 class DatabaseFactory(object):
@@ -20,9 +26,36 @@ class DatabaseFactory(object):
             instance = FirebaseService()
         elif db_type == DBEnum.MEMORY:
             instance = MemoryService()
+        elif db_type == DBEnum.DISK:
+            instance = DiskLogService()
+        elif db_type == DBEnum.SQL:
+            instance = SQLiteService()
         else:
-            raise ValueError(f"Database type '{db_type}' not supported. Valid values are [FIRESTORE, MEMORY]")
+            raise ValueError(f"Database type '{db_type}' not supported. Valid values are [FIRESTORE, SQL, MEMORY, DISK]")
         
         instance.connect()
 
         return instance
+
+
+    @staticmethod
+    async def get_async_database(db_type: DBEnum) -> IAsyncDatabase:
+
+        if db_type == DBEnum.FIRESTORE:
+            # no native asyncio client: blocking calls go to the thread pool
+            instance = AsyncDatabaseAdapter(FirebaseService())
+        elif db_type == DBEnum.MEMORY:
+            # striped MemoryService called inline: nothing blocks, no thread pool
+            instance = AsyncMemoryService()
+        elif db_type == DBEnum.DISK:
+            # file I/O and msync stay off the event loop
+            instance = AsyncDatabaseAdapter(DiskLogService())
+        elif db_type == DBEnum.SQL:
+            # sqlite3 is blocking: one connection per pool thread
+            instance = AsyncDatabaseAdapter(SQLiteService())
+        else:
+            raise ValueError(f"Database type '{db_type}' not supported. Valid values are [FIRESTORE, SQL, MEMORY, DISK]")
+
+        await instance.connect()
+
+        return instance
@@ -1,7 +1,9 @@
 import os
-from typing import Optional
+import threading
+from typing import Dict, List, Optional
 
 from .interface import IDatabase
+from .firestore_batch import FirestoreBatchWriter
 from schemas.metrics import TelemetryPayload
 from schemas.session import SessionConfig, SessionState
 from shared.decorator import retry_on_failure
@@ -13,31 +15,58 @@ from firebase_admin import credentials, firestore
 
 
 class FirebaseService(IDatabase):
+    """
+    One document per session (settings.FIRESTORE_COLLECTION) with the fields
+    'telemetry' and 'state'.
+
+    Writes are not sent one by one: they are coalesced per document by a
+    FirestoreBatchWriter and committed as WriteBatch every FIRESTORE_FLUSH_INTERVAL
+    seconds, or as soon as a full batch is pending.
+
+    Coalescing has one owner per kind of write. With WRITE_BEHIND on, telemetry
+    is coalesced by AsyncWriteBehindDatabase and set_telemetry_many (its flush)
+    commits right away: the batcher adds no second delay, it only groups the
+    flushed payloads into WriteBatch. Session states (set_session) and telemetry
+    without write-behind are coalesced here.
+
+    Retry and the "firestore" breaker wrap each WriteBatch commit (_commit), not
+    flush(): the background thread flushes every interval and an idle tick must
+    not count as a success (it would reset the failures and close a HALF_OPEN circuit).
+    """
 
     _instance = None
 
-    
+
     def __init__(self):
         self._logger = get_logger("FIREBASE_SVC")
-        self._initalized = False
+        self._initialized = False
+
+        self._db = None
+        self._batcher: Optional[FirestoreBatchWriter] = None
+        self._flush_interval = settings.FIRESTORE_FLUSH_INTERVAL
+
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._flush_errors = 0
+
 
-    
     def __new__(cls):
         if cls._instance is None:
             cls._instance = super(FirebaseService, cls).__new__(cls)
 
         return cls._instance
-        
-    
+
+
     @retry_on_failure(max_retries=5, base_delay=2.0)
     def connect(self) -> None:
-        
+
         if self._initialized: return
 
         self._logger.info("⚪ Connecting to Firebase DB")
 
         cred_path = settings.FIRESTORE_KEY_FILE
-        
+
         if (not cred_path) and (not os.path.exists(cred_path)):
             self._logger.error(f"🔴 Credential not found in {cred_path}")
             raise FileNotFoundError(f"Credential not found in {cred_path}")
@@ -45,64 +74,120 @@ class FirebaseService(IDatabase):
         cred = credentials.Certificate(cred_path)
         firebase_admin.initialize_app(cred)
         self._db = firestore.client()
+        self._batcher = FirestoreBatchWriter(self._db, commit=self._commit)
+
+        self._thread = threading.Thread(target=self._run, name="firestore-batch", daemon=True)
+        self._thread.start()
 
         self._initialized = True
 
         self._logger.info("🟢 Connection to Firebase estabilished.")
 
-    
-    @retry_on_failure(max_retries=3, base_delay=0.5)
+
+    def _document_path(self, session_id: str) -> str:
+        return settings.FIRESTORE_COLLECTION.format(session_id)
+
+
+    def _run(self) -> None:
+
+        while not self._stopped.is_set():
+            self._wakeup.wait(self._flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                # i documenti restano in coda per il prossimo giro
+                self._flush_errors += 1
+                self._logger.error(f"🔴 Firestore batch commit failed, {len(self._batcher)} documents pending: {e}")
+
+
+    @retry_on_failure(max_retries=3, base_delay=0.5, breaker="firestore")
+    def _commit(self, chunk: List[tuple]) -> None:
+        self._batcher.commit_chunk(chunk)
+
+
+    def flush(self) -> int:
+
+        # niente in coda: nessuna chiamata a Firestore, niente da contare sul breaker
+        if not len(self._batcher):
+            return 0
+
+        written = self._batcher.flush()
+        if written:
+            self._logger.debug(f"🟢 Committed {written} documents to Firestore")
+        return written
+
+
+    def close(self) -> None:
+
+        self._stopped.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+        if self._batcher is not None:
+            self.flush()
+
+
+    def _enqueue(self, session_id: str, fields: Dict) -> None:
+        if self._batcher.update(self._document_path(session_id), fields) >= FirestoreBatchWriter.MAX_BATCH_OPS:
+            self._wakeup.set()
+
+
     def set_telemetry(self, payload: TelemetryPayload) -> None:
-        
-        path = settings.FIRESTORE_COLLECTION
+        self._enqueue(payload.session_id, {"telemetry": payload.model_dump()})
+
 
-        # get or create collection
-        doc_ref = self._db.collection(path).document('metrics')
+    def set_telemetry_many(self, payloads: List[TelemetryPayload]) -> None:
 
-        # update data
-        doc_ref.update(payload.metrics)
+        for payload in payloads:
+            self._batcher.update(self._document_path(payload.session_id), {"telemetry": payload.model_dump()})
 
-        self._logger.debug(f"🟢 Valid update for {payload.session_id}")
+        self.flush()
 
 
-    @retry_on_failure(max_retries=3, base_delay=0.5)
     def set_session(self, payload: SessionState) -> None:
-        
-        path = settings.FIRESTORE_COLLECTION
-        
-        doc_ref = self._db.collection(path).document("state")
+        self._enqueue(payload.config.session_id, {"state": payload.model_dump(mode="json")})
+
+
+    @retry_on_failure(max_retries=3, base_delay=0.5, breaker="firestore")
+    def _read(self, session_id: str, field: str) -> Optional[Dict]:
+
+        path = self._document_path(session_id)
 
-        doc_ref.update(payload)
+        pending = self._batcher.get(path)
+        if pending and field in pending:
+            return pending[field]
 
-        self._logger.debug(f"🟢 Valid update for {payload.config.session_id}")
+        self._logger.debug(f"🔍 Search {field} of session {session_id} from Firebase...")
 
-    
-    @retry_on_failure(max_retries=3, base_delay=0.5)
-    def get_telemetry(self, session_id: str) -> Optional[SessionState]:
-        
-        path = settings.FIRESTORE_COLLECTION
+        snapshot = self._db.document(path).get()
+        data = snapshot.to_dict() if snapshot.exists else None
+        return data.get(field) if data else None
 
-        self.log.debug(f"🔍 Search session {session_id} from Firebase...")
 
-        state_ref = self._db.collection(path).document("telemetry")
-        if not state_ref:
-            self._logger.warning(f"⚠️ Telemetry for session id {session_id} not present in Redis")
+    def get_telemetry(self, session_id: str) -> Optional[TelemetryPayload]:
+
+        data = self._read(session_id, "telemetry")
+        if data is None:
+            self._logger.warning(f"⚠️ Telemetry for session id {session_id} not present in Firestore")
             return None
-        
-        return state_ref.get()
 
+        return TelemetryPayload.model_validate(data)
 
-    @retry_on_failure(max_retries=3, base_delay=0.5)
-    def get_session(self, session_id: str) -> Optional[TelemetryPayload]:
-        
-        path = settings.FIRESTORE_COLLECTION
 
-        self.log.debug(f"🔍 Search session {session_id} from Firebase...")
+    def get_session(self, session_id: str) -> Optional[SessionState]:
 
-        state_ref = self._db.collection(path).document("state")
-        if not state_ref:
-            self._logger.warning(f"⚠️ Session state for session id {session_id} not present in Redis")
+        data = self._read(session_id, "state")
+        if data is None:
+            self._logger.warning(f"⚠️ Session state for session id {session_id} not present in Firestore")
             return None
-        
-        return state_ref.get()
-        
\ No newline at end of file
+
+        return SessionState.model_validate(data)
+
+
+    def stats(self) -> Dict[str, int]:
+        stats = self._batcher.stats() if self._batcher is not None else {}
+        stats["flush_errors"] = self._flush_errors
+        return stats
@@ -0,0 +1,120 @@
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+
+class FirestoreBatchWriter(object):
+    """
+    Pending Firestore updates, coalesced per document and committed as WriteBatch.
+
+    update() merges fields into the pending write of the document: within a flush
+    window N updates of the same session cost one billed write. flush() sends
+    them as set(merge=True) in WriteBatch commits of at most max_ops operations
+    (the Firestore limit is 500). The client is anything exposing batch() and
+    document(path): firestore.Client, the emulator, or an in-process fake.
+
+    commit(chunk) sends one chunk of (path, fields); the default is commit_chunk.
+    The owner can pass a wrapped version (retry, circuit breaker) so that only
+    real WriteBatch commits are retried and counted, never an empty flush.
+    """
+
+    MAX_BATCH_OPS = 500
+
+    def __init__(self, client, max_ops: int = MAX_BATCH_OPS, commit: Optional[Callable[[List[tuple]], None]] = None):
+        if not 0 < max_ops <= self.MAX_BATCH_OPS:
+            raise ValueError(f"max_ops must be in [1, {self.MAX_BATCH_OPS}], got {max_ops}")
+
+        self._client = client
+        self._max_ops = max_ops
+        self._commit = commit or self.commit_chunk
+        self._pending: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+
+        self.updates = 0
+        self.coalesced = 0
+        self.commits = 0
+        self.written = 0
+
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+
+    def update(self, path: str, fields: Dict[str, Any]) -> int:
+        """Queue fields for document path; return the number of pending documents"""
+
+        with self._lock:
+            pending = self._pending.get(path)
+            if pending is None:
+                self._pending[path] = dict(fields)
+            else:
+                pending.update(fields)
+                self.coalesced += 1
+            self.updates += 1
+            return len(self._pending)
+
+
+    def get(self, path: str) -> Optional[Dict[str, Any]]:
+        """Fields still waiting for a commit (read-your-writes)"""
+        with self._lock:
+            pending = self._pending.get(path)
+            return dict(pending) if pending is not None else None
+
+
+    def _restore(self, documents: List[tuple]) -> None:
+        # campi più recenti arrivati durante il commit vincono su quelli ripristinati
+        with self._lock:
+            for path, fields in documents:
+                newer = self._pending.get(path)
+                self._pending[path] = {**fields, **newer} if newer else fields
+
+
+    def commit_chunk(self, chunk: List[tuple]) -> None:
+        """One WriteBatch of set(merge=True), built anew on every call (and every retry)"""
+
+        batch = self._client.batch()
+        for path, fields in chunk:
+            batch.set(self._client.document(path), fields, merge=True)
+
+        batch.commit()
+
+
+    def flush(self) -> int:
+        """
+        Commit every pending document. On a failed commit the uncommitted documents
+        go back to the pending set and the error is raised. Return the documents written.
+        """
+
+        written = 0
+
+        with self._flush_lock:
+
+            with self._lock:
+                documents = list(self._pending.items())
+                self._pending = {}
+
+            for i in range(0, len(documents), self._max_ops):
+                chunk = documents[i:i + self._max_ops]
+
+                try:
+                    self._commit(chunk)
+                except Exception:
+                    self._restore(documents[i:])
+                    raise
+
+                self.commits += 1
+                written += len(chunk)
+
+            self.written += written
+
+        return written
+
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "pending_documents": len(self._pending),
+            "updates": self.updates,
+            "coalesced_updates": self.coalesced,
+            "batch_commits": self.commits,
+            "documents_written": self.written
+        }
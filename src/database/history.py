@@ -0,0 +1,291 @@
+import threading
+from collections import OrderedDict
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from .interface import IAsyncDatabase
+from schemas.metrics import TelemetryPayload
+from schemas.session import SessionState
+from shared.logger import get_logger
+
+
+class RollupFrame(NamedTuple):
+    """Rollup buckets in time order: start[i] is the beginning of bucket i"""
+    interval: float
+    start: np.ndarray
+    min: Dict[str, np.ndarray]
+    max: Dict[str, np.ndarray]
+    mean: Dict[str, np.ndarray]
+    count: Dict[str, np.ndarray]
+
+
+class TelemetrySeries(object):
+    """
+    Time series of one session, with columns stored as numpy arrays.
+
+    Raw points go into a ring of raw_capacity slots: timestamps plus one column
+    per metric, with NaN where a payload does not carry that metric. Every point
+    is also folded into the min/max/sum/count rollup of its bucket, which is
+    rollup_interval seconds wide. The rollups are another ring of rollup_capacity
+    buckets. Memory is fixed per metric whatever the session length: old raw
+    points survive only as rollups, and old rollups are dropped. At most
+    max_metrics distinct metrics get columns; values of any further metric
+    are not recorded (counted in metrics_dropped).
+    """
+
+    def __init__(
+        self,
+        raw_capacity: int = 3600,
+        rollup_interval: float = 60.0,
+        rollup_capacity: int = 1440,
+        max_metrics: int = 64
+    ):
+        self._raw_capacity = raw_capacity
+        self._interval = rollup_interval
+        self._rollup_capacity = rollup_capacity
+        self._max_metrics = max_metrics
+
+        # raw ring: slot = appended % raw_capacity
+        self._ts = np.full(raw_capacity, np.nan)
+        self._raw: Dict[str, np.ndarray] = {}
+        self._appended = 0
+
+        # rollup ring: slot = bucket % rollup_capacity, -1 = empty
+        self._bucket = np.full(rollup_capacity, -1, dtype=np.int64)
+        self._min: Dict[str, np.ndarray] = {}
+        self._max: Dict[str, np.ndarray] = {}
+        self._sum: Dict[str, np.ndarray] = {}
+        self._count: Dict[str, np.ndarray] = {}
+
+        self.late_dropped = 0
+        self.metrics_dropped = 0
+
+
+    def __len__(self) -> int:
+        return min(self._appended, self._raw_capacity)
+
+
+    def _add_metric(self, name: str) -> None:
+        self._raw[name] = np.full(self._raw_capacity, np.nan)
+        self._min[name] = np.full(self._rollup_capacity, np.nan)
+        self._max[name] = np.full(self._rollup_capacity, np.nan)
+        self._sum[name] = np.zeros(self._rollup_capacity)
+        self._count[name] = np.zeros(self._rollup_capacity, dtype=np.int64)
+
+
+    def append(self, timestamp: float, metrics: Dict[str, float]) -> None:
+
+        for name in metrics:
+            if name not in self._raw:
+                if len(self._raw) >= self._max_metrics:
+                    # a client inventing metric names must not grow the series without bound
+                    self.metrics_dropped += 1
+                    continue
+                self._add_metric(name)
+
+        # 1) raw point, overwriting the oldest slot
+        slot = self._appended % self._raw_capacity
+        self._ts[slot] = timestamp
+        for name, column in self._raw.items():
+            column[slot] = metrics.get(name, np.nan)
+        self._appended += 1
+
+        # 2) rollup of the point's bucket
+        bucket = int(timestamp // self._interval)
+        slot = bucket % self._rollup_capacity
+
+        if self._bucket[slot] != bucket:
+            if self._bucket[slot] > bucket:
+                # older than the whole rollup window
+                self.late_dropped += 1
+                return
+            self._bucket[slot] = bucket
+            for name in self._min:
+                self._min[name][slot] = np.nan
+                self._max[name][slot] = np.nan
+                self._sum[name][slot] = 0.0
+                self._count[name][slot] = 0
+
+        for name, value in metrics.items():
+            if name not in self._count:
+                continue
+            if self._count[name][slot]:
+                self._min[name][slot] = min(self._min[name][slot], value)
+                self._max[name][slot] = max(self._max[name][slot], value)
+            else:
+                self._min[name][slot] = self._max[name][slot] = value
+            self._sum[name][slot] += value
+            self._count[name][slot] += 1
+
+
+    def points(self, start: float = -np.inf, end: float = np.inf) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+        """Raw points with start <= timestamp <= end, in time order"""
+
+        n = len(self)
+        order = (np.arange(n) + (self._appended - n)) % self._raw_capacity
+        ts = self._ts[order]
+
+        selected = order[(ts >= start) & (ts <= end)]
+        # sort by timestamp, in case points arrived out of order
+        selected = selected[np.argsort(self._ts[selected], kind="stable")]
+
+        return self._ts[selected], {name: column[selected] for name, column in self._raw.items()}
+
+
+    def rollups(self, start: float = -np.inf, end: float = np.inf) -> RollupFrame:
+        """Buckets overlapping [start, end], in time order"""
+
+        starts = self._bucket * self._interval
+        selected = np.flatnonzero((self._bucket >= 0) & (starts + self._interval > start) & (starts <= end))
+        selected = selected[np.argsort(self._bucket[selected])]
+
+        mean = {}
+        for name, total in self._sum.items():
+            count = self._count[name][selected]
+            with np.errstate(invalid="ignore", divide="ignore"):
+                mean[name] = np.where(count > 0, total[selected] / count, np.nan)
+
+        return RollupFrame(
+            interval=self._interval,
+            start=starts[selected],
+            min={name: column[selected] for name, column in self._min.items()},
+            max={name: column[selected] for name, column in self._max.items()},
+            mean=mean,
+            count={name: column[selected] for name, column in self._count.items()}
+        )
+
+
+class TelemetryHistory(object):
+    """
+    One TelemetrySeries per session, of at most max_metrics metrics each.
+    Sessions past max_sessions are evicted least recently written first,
+    so total memory stays bounded.
+    """
+
+    def __init__(
+        self,
+        raw_capacity: int = 3600,
+        rollup_interval: float = 60.0,
+        rollup_capacity: int = 1440,
+        max_sessions: int = 1000,
+        max_metrics: int = 64
+    ):
+        self._raw_capacity = raw_capacity
+        self._rollup_interval = rollup_interval
+        self._rollup_capacity = rollup_capacity
+        self._max_sessions = max_sessions
+        self._max_metrics = max_metrics
+
+        self._series: "OrderedDict[str, TelemetrySeries]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.appended = 0
+        self.evicted = 0
+
+
+    def __len__(self) -> int:
+        return len(self._series)
+
+
+    def append(self, payload: TelemetryPayload) -> None:
+
+        with self._lock:
+            series = self._series.get(payload.session_id)
+
+            if series is None:
+                series = self._series[payload.session_id] = TelemetrySeries(
+                    self._raw_capacity, self._rollup_interval, self._rollup_capacity, self._max_metrics
+                )
+                if len(self._series) > self._max_sessions:
+                    self._series.popitem(last=False)
+                    self.evicted += 1
+            else:
+                self._series.move_to_end(payload.session_id)
+
+            series.append(payload.timestamp, payload.metrics)
+            self.appended += 1
+
+
+    def points(self, session_id: str, start: float = -np.inf, end: float = np.inf) -> Optional[Tuple[np.ndarray, Dict[str, np.ndarray]]]:
+        with self._lock:
+            series = self._series.get(session_id)
+            return series.points(start, end) if series is not None else None
+
+
+    def rollups(self, session_id: str, start: float = -np.inf, end: float = np.inf) -> Optional[RollupFrame]:
+        with self._lock:
+            series = self._series.get(session_id)
+            return series.rollups(start, end) if series is not None else None
+
+
+    def remove(self, session_id: str) -> None:
+        with self._lock:
+            self._series.pop(session_id, None)
+
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "history_sessions": len(self._series),
+                "history_appended": self.appended,
+                "history_evicted": self.evicted,
+                "history_late_dropped": sum(series.late_dropped for series in self._series.values()),
+                "history_metrics_dropped": sum(series.metrics_dropped for series in self._series.values())
+            }
+
+
+class HistoryDatabase(IAsyncDatabase):
+    """
+    Records every telemetry payload in a TelemetryHistory, then forwards it to the
+    wrapped IAsyncDatabase. The wrapped backend keeps storing only the latest payload.
+    Put it outside the write-behind wrapper so coalesced points are not lost.
+    """
+
+    def __init__(self, delegate: IAsyncDatabase, history: TelemetryHistory):
+        self._delegate = delegate
+        self._history = history
+        self._logger = get_logger("HISTORY")
+
+
+    @property
+    def history(self) -> TelemetryHistory:
+        return self._history
+
+
+    async def connect(self) -> None:
+        await self._delegate.connect()
+        self._logger.info("💾 Telemetry history enabled.")
+
+
+    async def close(self) -> None:
+        await self._delegate.close()
+
+
+    async def set_telemetry(self, payload: TelemetryPayload) -> None:
+        self._history.append(payload)
+        await self._delegate.set_telemetry(payload)
+
+
+    async def set_telemetry_many(self, payloads: List[TelemetryPayload]) -> None:
+        for payload in payloads:
+            self._history.append(payload)
+        await self._delegate.set_telemetry_many(payloads)
+
+
+    async def set_session(self, payload: SessionState) -> None:
+        await self._delegate.set_session(payload)
+
+
+    async def get_telemetry(self, session_id: str) -> Optional[TelemetryPayload]:
+        return await self._delegate.get_telemetry(session_id)
+
+
+    async def get_session(self, session_id: str) -> Optional[SessionState]:
+        return await self._delegate.get_session(session_id)
+
+
+    def stats(self) -> Dict[str, float]:
+        stats = dict(getattr(self._delegate, "stats", dict)())
+        stats.update(self._history.stats())
+        return stats
@@ -1,6 +1,5 @@
 from abc import ABC, abstractmethod
-from typing import Optional
-from pydantic import validate_call
+from typing import List, Optional
 from schemas.session import SessionConfig, SessionState
 from schemas.metrics import TelemetryPayload 
 
@@ -8,7 +7,7 @@ class IDatabase(ABC):
     """
     Strategy Interface: Definisce le operazioni obbligatorie 
     per qualsiasi sistema di persistenza.
-    Tutti i metodi sono protetti da validazione a runtime.
+    I payload arrivano già validati dal bordo dell'API: le implementazioni non li rivalidano.
     """
 
     @abstractmethod
@@ -16,7 +15,6 @@ class IDatabase(ABC):
         pass
 
     @abstractmethod
-    @validate_call
     def set_telemetry(self, payload: TelemetryPayload) -> None:
         """
         Aggiorna la telemetria.
@@ -24,8 +22,15 @@ class IDatabase(ABC):
         """
         pass
 
+    def set_telemetry_many(self, payloads: List[TelemetryPayload]) -> None:
+        """
+        Aggiorna la telemetria di più sessioni.
+        Default: una set_telemetry per payload, i backend con scritture batch la ridefiniscono.
+        """
+        for payload in payloads:
+            self.set_telemetry(payload)
+
     @abstractmethod
-    @validate_call
     def set_session(self, payload: SessionState) -> None:
         """
         Aggiorna la sessione.
@@ -34,7 +39,6 @@ class IDatabase(ABC):
         pass
 
     @abstractmethod
-    @validate_call
     def get_telemetry(self, session_id: str) -> Optional[TelemetryPayload]:
         """
         Return telemetry associated to session_id
@@ -45,7 +49,6 @@ class IDatabase(ABC):
         pass
 
     @abstractmethod
-    @validate_call
     def get_session(self, session_id: str) -> Optional[SessionState]:
         """
         Return session state associated to session_id
@@ -54,3 +57,41 @@ class IDatabase(ABC):
         :type session_id: str
         """
         pass
+
+
+class IAsyncDatabase(ABC):
+    """
+    Controparte asyncio di IDatabase: ogni operazione è una coroutine.
+    """
+
+    @abstractmethod
+    async def connect(self) -> None:
+        pass
+
+    @abstractmethod
+    async def close(self) -> None:
+        pass
+
+    @abstractmethod
+    async def set_telemetry(self, payload: TelemetryPayload) -> None:
+        pass
+
+    async def set_telemetry_many(self, payloads: List[TelemetryPayload]) -> None:
+        """
+        Aggiorna la telemetria di più sessioni.
+        Default: una set_telemetry per payload, i backend con scritture batch la ridefiniscono.
+        """
+        for payload in payloads:
+            await self.set_telemetry(payload)
+
+    @abstractmethod
+    async def set_session(self, payload: SessionState) -> None:
+        pass
+
+    @abstractmethod
+    async def get_telemetry(self, session_id: str) -> Optional[TelemetryPayload]:
+        pass
+
+    @abstractmethod
+    async def get_session(self, session_id: str) -> Optional[SessionState]:
+        pass
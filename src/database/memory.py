@@ -1,69 +1,209 @@
-import os
+import time
 import threading
-from typing import Dict, Optional
-from pydantic import validate_call
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
 
 from .interface import IDatabase
 from schemas.metrics import TelemetryPayload
 from schemas.session import SessionState
 from shared.logger import get_logger
 
+
+class _Stripe(object):
+
+    __slots__ = ("lock", "data", "last_access")
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.data: Dict[Hashable, Any] = {}        # snapshot immutabile, sostituito a ogni scrittura
+        self.last_access: Dict[Hashable, float] = {}
+
+
+class StripedStore(object):
+    """
+    Thread-safe map split into stripes (hash of the key), each with its own lock.
+
+    Writers lock only their stripe and publish a new copy of the stripe dict
+    (copy-on-write); readers take the current snapshot with a single attribute
+    read and never lock. With max_entries the least recently used keys of a
+    full stripe are evicted, so idle sessions do not pin memory forever.
+    """
+
+    def __init__(self, stripes: int = 64, max_entries: Optional[int] = None, clock: Callable[[], float] = time.monotonic):
+        if stripes < 1 or stripes & (stripes - 1):
+            raise ValueError(f"stripes must be a power of two, got {stripes}")
+
+        self._stripes = [_Stripe() for _ in range(stripes)]
+        self._mask = stripes - 1
+        self._per_stripe = -(-max_entries // stripes) if max_entries else None
+        self._clock = clock
+
+        self.evictions = 0
+
+
+    def _stripe(self, key: Hashable) -> _Stripe:
+        return self._stripes[hash(key) & self._mask]
+
+
+    def __len__(self) -> int:
+        return sum(len(stripe.data) for stripe in self._stripes)
+
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        stripe = self._stripe(key)
+        value = stripe.data.get(key, default)
+        if value is not default:
+            # un solo store su dict: atomico, nessun lock sul percorso di lettura
+            stripe.last_access[key] = self._clock()
+        return value
+
+
+    def update(self, key: Hashable, func: Callable[[Any], Any]) -> Any:
+        """Store func(current value or None) under key, atomically for that key"""
+
+        stripe = self._stripe(key)
+
+        with stripe.lock:
+            data = dict(stripe.data)
+            data[key] = value = func(data.get(key))
+            stripe.last_access[key] = self._clock()
+
+            if self._per_stripe is not None and len(data) > self._per_stripe:
+                self._evict(stripe, data, keep=key)
+
+            stripe.data = data
+
+        return value
+
+
+    def set(self, key: Hashable, value: Any) -> None:
+        self.update(key, lambda _: value)
+
+
+    def delete(self, key: Hashable) -> bool:
+
+        stripe = self._stripe(key)
+
+        with stripe.lock:
+            if key not in stripe.data:
+                return False
+            data = dict(stripe.data)
+            del data[key]
+            stripe.last_access.pop(key, None)
+            stripe.data = data
+            return True
+
+
+    def _evict(self, stripe: _Stripe, data: Dict, keep: Hashable) -> None:
+        # evict down to 90% of the stripe so the O(n) scan is amortized
+        target = max(1, int(self._per_stripe * 0.9))
+        by_age = sorted((stripe.last_access.get(k, 0.0), k) for k in data if k != keep)
+        for _, key in by_age[:len(data) - target]:
+            del data[key]
+            stripe.last_access.pop(key, None)
+            self.evictions += 1
+
+
+    def evict_idle(self, max_idle: float) -> int:
+        """Drop every key not read or written for max_idle seconds"""
+
+        cutoff = self._clock() - max_idle
+        evicted = 0
+
+        for stripe in self._stripes:
+            with stripe.lock:
+                idle = [k for k in stripe.data if stripe.last_access.get(k, 0.0) < cutoff]
+                if not idle:
+                    continue
+                data = dict(stripe.data)
+                for key in idle:
+                    del data[key]
+                    stripe.last_access.pop(key, None)
+                stripe.data = data
+                evicted += len(idle)
+
+        self.evictions += evicted
+        return evicted
+
+
+    def stats(self) -> Dict[str, int]:
+        sizes = [len(stripe.data) for stripe in self._stripes]
+        return {"size": sum(sizes), "stripes": len(sizes), "largest_stripe": max(sizes), "evictions": self.evictions}
+
+
+# record di sessione: (telemetry, state), sostituito per intero a ogni scrittura
+_Record = Tuple[Optional[TelemetryPayload], Optional[SessionState]]
+
+
 class MemoryService(IDatabase):
+    """
+    In-memory database for the sync stack, on a StripedStore: threads writing
+    different sessions rarely share a lock and reads never take one.
+    Telemetry and state of a session live in one record, so idle eviction drops both.
+    """
 
     _instance = None
 
-    def __init__(self):
+    def __init__(self, stripes: int = 64, max_sessions: Optional[int] = 100000):
+        # singleton: __init__ runs again on every MemoryService(), the store must survive it
+        if hasattr(self, "_store"):
+            return
+
         self._logger = get_logger("MEMORY_SVC")
         self._initalized = False
 
-        self._telemetry_store: Dict[str, TelemetryPayload] = {}
-        self._session_store: Dict[str, SessionState] = {}
-        self._lock = threading.Lock() # Mutex per thread safety
+        self._store = StripedStore(stripes=stripes, max_entries=max_sessions)
+
+    def __new__(cls, *args, **kwargs):
 
-    def __new__(cls):
-        
         if cls._instance is None:
             cls._instance = super(MemoryService, cls).__new__(cls)
-        
+
         return cls._instance
-    
-    
+
+
     def connect(self):
-       self._logger.info("💾 MemoryService created (Thread-Safe).")
+       self._logger.info("💾 MemoryService created (Thread-Safe, striped).")
        self._initalized = True
 
 
-    def update_telemetry(self, payload: TelemetryPayload) -> None:
-        with self._lock:
-            self._telemetry_store[payload.session_id] = payload
-            self._logger.info(f"🟢 Telemetry payload saved for session {payload.session_id}")
-    
+    def set_telemetry(self, payload: TelemetryPayload) -> None:
+        self._store.update(payload.session_id, lambda record: (payload, record[1] if record else None))
+        self._logger.debug(f"🟢 Telemetry payload saved for session {payload.session_id}")
+
+
+    def set_telemetry_many(self, payloads: List[TelemetryPayload]) -> None:
+        for payload in payloads:
+            self._store.update(payload.session_id, lambda record, p=payload: (p, record[1] if record else None))
+
 
     def get_telemetry(self, session_id: str) -> Optional[TelemetryPayload]:
+        record: Optional[_Record] = self._store.get(session_id)
+        return record[0] if record else None
+
+
+    def set_session(self, payload: SessionState) -> None:
+        session_id = payload.config.session_id
+        self._store.update(session_id, lambda record: (record[0] if record else None, payload))
+        self._logger.debug(f"🟢 Session state saved for session {session_id}")
 
-        if not(session_id in self._telemetry_store):
-            self._logger.error(f"🔴 Session id {session_id} not in telemetry_store db")
-            raise ValueError(f"Session id {session_id} not in telemetry_store db")
 
-        with self._lock:
-            payload =  self._telemetry_store.get(session_id)
-            self._logger.info(f"🟢 Telemetry found with {session_id}")
-            return payload
+    def get_session(self, session_id: str) -> Optional[SessionState]:
+        record: Optional[_Record] = self._store.get(session_id)
+        return record[1] if record else None
 
 
-    def update_session(self, payload: SessionState) -> None:
-        with self._lock:
-            self._session_store[payload.config.session_id] = payload
-            self._logger.info(f"🟢 Telemetry payload saved for session {payload.session_id}")
+    # nomi storici
+    update_telemetry = set_telemetry
+    update_session = set_session
+    get_session_state = get_session
 
 
-    def get_session_state(self, session_id: str) -> Optional[SessionState]:
+    def evict_idle(self, max_idle: float) -> int:
+        evicted = self._store.evict_idle(max_idle)
+        if evicted:
+            self._logger.info(f"💾 Evicted {evicted} idle sessions")
+        return evicted
 
-        if not(session_id in self._session_store):
-            self._logger.error(f"🔴 Session id {session_id} not in session_state db")
-            raise ValueError(f"Session id {session_id} not in session_state db")
 
-        with self._lock:
-            payload = self._session_store.get(session_id)
-            self._logger.info(f"🟢 Session state found with {session_id}")
-            return payload
+    def stats(self) -> Dict[str, int]:
+        return self._store.stats()
@@ -0,0 +1,71 @@
+from typing import Dict, List, Optional
+
+from .interface import IAsyncDatabase
+from .memory import MemoryService
+from schemas.metrics import TelemetryPayload
+from schemas.session import SessionState
+from shared.logger import get_logger
+
+
+class AsyncMemoryService(IAsyncDatabase):
+    """
+    In-memory database for the event loop, on the striped MemoryService of the
+    sync stack. Its calls never wait on I/O and hold a stripe lock only for a
+    dict copy, so they run inline on the loop: no thread pool hop.
+    """
+
+    _instance = None
+
+    def __init__(self, stripes: int = 64, max_sessions: Optional[int] = 100000):
+        # singleton: __init__ runs again on every AsyncMemoryService()
+        if hasattr(self, "_service"):
+            return
+
+        self._logger = get_logger("MEMORY_SVC")
+        self._initialized = False
+
+        self._service = MemoryService(stripes=stripes, max_sessions=max_sessions)
+
+    def __new__(cls, *args, **kwargs):
+
+        if cls._instance is None:
+            cls._instance = super(AsyncMemoryService, cls).__new__(cls)
+
+        return cls._instance
+
+
+    async def connect(self) -> None:
+        self._service.connect()
+        self._initialized = True
+
+
+    async def close(self) -> None:
+        self._initialized = False
+
+
+    async def set_telemetry(self, payload: TelemetryPayload) -> None:
+        self._service.set_telemetry(payload)
+
+
+    async def set_telemetry_many(self, payloads: List[TelemetryPayload]) -> None:
+        self._service.set_telemetry_many(payloads)
+
+
+    async def get_telemetry(self, session_id: str) -> Optional[TelemetryPayload]:
+        return self._service.get_telemetry(session_id)
+
+
+    async def set_session(self, payload: SessionState) -> None:
+        self._service.set_session(payload)
+
+
+    async def get_session(self, session_id: str) -> Optional[SessionState]:
+        return self._service.get_session(session_id)
+
+
+    def evict_idle(self, max_idle: float) -> int:
+        return self._service.evict_idle(max_idle)
+
+
+    def stats(self) -> Dict[str, int]:
+        return self._service.stats()
@@ -0,0 +1,185 @@
+import os
+import mmap
+import struct
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+# Header del segmento (HEADER_SIZE byte, little-endian):
+# magic (4) | version u16 | n_metrics u16 | count u64 | names_len u32 | nomi metriche utf-8 separati da "\n"
+SEGMENT_MAGIC = b"RETL"
+SEGMENT_VERSION = 1
+HEADER_SIZE = 4096
+_HEADER = struct.Struct("<4sHHQI")
+_COUNT_OFFSET = 8
+
+
+def fsync_directory(path: str) -> None:
+    """fsync the directory holding path: a rename into it survives a crash"""
+    directory = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    try:
+        os.fsync(directory)
+    finally:
+        os.close(directory)
+
+
+class TelemetrySegment(object):
+    """
+    Append-only log of one session's telemetry in a memory-mapped file.
+
+    Records are fixed width: a float64 timestamp plus one float64 per metric of
+    the segment schema, NaN when absent, so record i is at HEADER_SIZE + i * record_size.
+    A record is written first; the count in the header is bumped afterwards, so
+    a crash mid-write leaves at most one partial record past count, which is ignored.
+    """
+
+    def __init__(self, path: str, names: Optional[List[str]] = None, capacity: int = 1024, rows: Optional[np.ndarray] = None):
+        """
+        names: create the segment (replacing any file at path) with this schema,
+        holding rows, float64 of shape (n, len(names) + 1), timestamp first.
+        """
+        self.path = path
+
+        if names is not None:
+            self._create(names, capacity, rows)
+        self._open()
+
+
+    # --- file layout ---
+
+    def _create(self, names: List[str], capacity: int, rows: Optional[np.ndarray] = None) -> None:
+
+        encoded = "\n".join(names).encode()
+        if _HEADER.size + len(encoded) > HEADER_SIZE:
+            raise ValueError(f"Too many metrics for a segment header: {len(names)}")
+
+        count = 0 if rows is None else len(rows)
+        capacity = max(capacity, count)
+
+        # 1) il file completo nel tmp, su disco prima del replace:
+        # un crash lascia il vecchio segmento o il nuovo, mai uno a metà
+        tmp = self.path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(_HEADER.pack(SEGMENT_MAGIC, SEGMENT_VERSION, len(names), count, len(encoded)) + encoded)
+            if count:
+                f.seek(HEADER_SIZE)
+                f.write(np.ascontiguousarray(rows, dtype="<f8").tobytes())
+            f.truncate(HEADER_SIZE + capacity * 8 * (len(names) + 1))
+            f.flush()
+            os.fsync(f.fileno())
+
+        # 2) replace atomico, poi la directory: il nuovo nome sopravvive al crash
+        os.replace(tmp, self.path)
+        fsync_directory(self.path)
+
+
+    def _open(self) -> None:
+
+        self._file = open(self.path, "r+b")
+        self._mm = mmap.mmap(self._file.fileno(), 0)
+
+        magic, version, n_metrics, count, names_len = _HEADER.unpack_from(self._mm, 0)
+        if magic != SEGMENT_MAGIC or version > SEGMENT_VERSION:
+            self.close()
+            raise ValueError(f"{self.path} is not a telemetry segment (version {version})")
+
+        raw_names = bytes(self._mm[_HEADER.size:_HEADER.size + names_len]).decode()
+        self.names: List[str] = raw_names.split("\n") if raw_names else []
+        self._columns = {name: i for i, name in enumerate(self.names)}
+        self.record_size = 8 * (n_metrics + 1)
+        self.capacity = (len(self._mm) - HEADER_SIZE) // self.record_size
+        self.count = count
+
+        self._dtype = np.dtype([("timestamp", "<f8"), ("values", "<f8", (n_metrics,))])
+
+
+    def close(self) -> None:
+        self._mm.close()
+        self._file.close()
+
+
+    def flush(self) -> None:
+        self._mm.flush()
+
+
+    def _grow(self) -> None:
+        # il mapping va ricreato: nessuna view deve essere ancora viva
+        self._mm.close()
+        self._file.truncate(HEADER_SIZE + 2 * max(self.capacity, 1) * self.record_size)
+        self._mm = mmap.mmap(self._file.fileno(), 0)
+        self.capacity = (len(self._mm) - HEADER_SIZE) // self.record_size
+
+
+    # --- records ---
+
+    def accepts(self, metrics: Dict[str, float]) -> bool:
+        """False if metrics carries names outside the segment schema"""
+        return all(name in self._columns for name in metrics)
+
+
+    def append(self, timestamp: float, metrics: Dict[str, float]) -> None:
+
+        if self.count >= self.capacity:
+            self._grow()
+
+        # 1) record oltre l'ultimo committato
+        row = np.full(len(self.names) + 1, np.nan, dtype="<f8")
+        row[0] = timestamp
+        for name, value in metrics.items():
+            row[self._columns[name] + 1] = value
+
+        offset = HEADER_SIZE + self.count * self.record_size
+        self._mm[offset:offset + self.record_size] = row.tobytes()
+
+        # 2) commit: il record diventa visibile solo ora
+        self.count += 1
+        struct.pack_into("<Q", self._mm, _COUNT_OFFSET, self.count)
+
+
+    def view(self) -> np.ndarray:
+        """
+        Zero-copy structured view of the committed records.
+        It pins the mapping: drop it before the next append.
+        """
+        return np.frombuffer(self._mm, dtype=self._dtype, count=self.count, offset=HEADER_SIZE)
+
+
+    def records(self) -> np.ndarray:
+        """Copy of the committed records, safe to keep around"""
+        return self.view().copy()
+
+
+    def latest(self) -> Optional[Tuple[float, Dict[str, float]]]:
+
+        if not self.count:
+            return None
+
+        view = self.view()
+        last = view[-1]
+        timestamp = float(last["timestamp"])
+        metrics = {name: float(value) for name, value in zip(self.names, last["values"].tolist()) if value == value}
+        del view, last
+        return timestamp, metrics
+
+
+    def rewrite(self, names: List[str], keep_last: int) -> "TelemetrySegment":
+        """
+        Compaction: a new segment with schema names holding the last keep_last records.
+        The new file is written and synced whole before it replaces this one;
+        this segment is closed only once the new one exists, so a failed rewrite
+        leaves it open and usable.
+        """
+        records = self.records()[-keep_last:] if keep_last else self.records()[:0]
+
+        # records riportati sullo schema names, le colonne assenti restano NaN
+        rows = np.full((len(records), len(names) + 1), np.nan, dtype="<f8")
+        rows[:, 0] = records["timestamp"]
+        for i, name in enumerate(names):
+            column = self._columns.get(name)
+            if column is not None:
+                rows[:, i + 1] = records["values"][:, column]
+
+        segment = TelemetrySegment(self.path, names, capacity=max(2 * len(rows), 1024), rows=rows)
+        self.close()
+        return segment
@@ -0,0 +1,176 @@
+import os
+import sqlite3
+import threading
+from typing import Dict, List, Optional
+
+from .interface import IDatabase
+from schemas.metrics import TelemetryPayload
+from schemas.session import SessionState
+from schemas.codec import CodecError, decode_session, decode_telemetry, get_codec
+from shared.logger import get_logger
+from shared.config import settings
+
+
+_SCHEMA = (
+    """CREATE TABLE IF NOT EXISTS telemetry (
+        session_id TEXT PRIMARY KEY,
+        timestamp REAL NOT NULL,
+        data BLOB NOT NULL
+    ) WITHOUT ROWID""",
+    """CREATE TABLE IF NOT EXISTS sessions (
+        session_id TEXT PRIMARY KEY,
+        data BLOB NOT NULL
+    ) WITHOUT ROWID""",
+)
+
+# SQL costanti: sqlite3 tiene in cache lo statement preparato di ogni stringa
+_UPSERT_TELEMETRY = (
+    "INSERT INTO telemetry (session_id, timestamp, data) VALUES (?, ?, ?) "
+    "ON CONFLICT(session_id) DO UPDATE SET timestamp = excluded.timestamp, data = excluded.data "
+    "WHERE excluded.timestamp >= telemetry.timestamp"
+)
+_SELECT_TELEMETRY = "SELECT data FROM telemetry WHERE session_id = ?"
+_UPSERT_SESSION = (
+    "INSERT INTO sessions (session_id, data) VALUES (?, ?) "
+    "ON CONFLICT(session_id) DO UPDATE SET data = excluded.data"
+)
+_SELECT_SESSION = "SELECT data FROM sessions WHERE session_id = ?"
+
+
+class SQLiteService(IDatabase):
+    """
+    Embedded database for single-node installs (DBEnum.SQL).
+
+    WAL journal, so readers never block the writer. Each thread gets its own
+    connection (to_thread calls land on different pool threads). Values are
+    codec blobs keyed by session_id: the primary key of the WITHOUT ROWID tables
+    is the session_id index. set_telemetry_many writes a whole batch in one
+    transaction with executemany.
+    """
+
+    _instance = None
+
+    def __init__(self):
+        self._logger = get_logger("SQLITE_SVC")
+        self._initialized = False
+
+        self._path = settings.SQLITE_PATH
+        self._codec = get_codec(settings.CACHE_CODEC)
+
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
+
+
+    def __new__(cls):
+
+        if cls._instance is None:
+            cls._instance = super(SQLiteService, cls).__new__(cls)
+
+        return cls._instance
+
+
+    def _connection(self) -> sqlite3.Connection:
+        """Connessione del thread corrente, aperta al primo uso"""
+
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(
+                self._path,
+                timeout=5.0,
+                check_same_thread=False, # solo per close() dal thread principale
+                cached_statements=64
+            )
+            conn.execute("PRAGMA synchronous=NORMAL") # durabile al checkpoint, sicuro con WAL
+            conn.execute("PRAGMA busy_timeout=5000")
+            self._local.conn = conn
+            with self._connections_lock:
+                self._connections.append(conn)
+
+        return conn
+
+
+    def connect(self) -> None:
+
+        if self._initialized: return
+
+        directory = os.path.dirname(self._path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        conn = self._connection()
+        # WAL è persistente nel file: basta impostarlo una volta
+        mode = conn.execute("PRAGMA journal_mode=WAL").fetchone()[0]
+        with conn:
+            for statement in _SCHEMA:
+                conn.execute(statement)
+
+        self._initialized = True
+        self._logger.info(f"🟢 SQLite ready at {self._path} (journal {mode}).")
+
+
+    def close(self) -> None:
+
+        with self._connections_lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+
+        self._local = threading.local()
+        self._initialized = False
+
+
+    def set_telemetry(self, payload: TelemetryPayload) -> None:
+        self.set_telemetry_many([payload])
+
+
+    def set_telemetry_many(self, payloads: List[TelemetryPayload]) -> None:
+
+        if not payloads: return
+
+        rows = [(p.session_id, p.timestamp, self._codec.encode_telemetry(p)) for p in payloads]
+
+        conn = self._connection()
+        with conn: # una transazione per batch
+            conn.executemany(_UPSERT_TELEMETRY, rows)
+
+        self._logger.debug(f"🟢 Saved telemetry data for {len(payloads)} sessions")
+
+
+    def get_telemetry(self, session_id: str) -> Optional[TelemetryPayload]:
+
+        row = self._connection().execute(_SELECT_TELEMETRY, (session_id,)).fetchone()
+        if row is None:
+            return None
+
+        try:
+            return decode_telemetry(row[0], trusted=True)
+        except (CodecError, ValueError) as e:
+            self._logger.warning(f"⚠️ Telemetry data corrupted for session id {session_id}: {e}")
+            return None
+
+
+    def set_session(self, payload: SessionState) -> None:
+
+        conn = self._connection()
+        with conn:
+            conn.execute(_UPSERT_SESSION, (payload.config.session_id, self._codec.encode_session(payload)))
+
+        self._logger.debug(f"🟢 Saved session state data for {payload.config.session_id}")
+
+
+    def get_session(self, session_id: str) -> Optional[SessionState]:
+
+        row = self._connection().execute(_SELECT_SESSION, (session_id,)).fetchone()
+        if row is None:
+            return None
+
+        try:
+            return decode_session(row[0], trusted=True)
+        except (CodecError, ValueError) as e:
+            self._logger.warning(f"⚠️ Session state data corrupted for session id {session_id}: {e}")
+            return None
+
+
+    def stats(self) -> Dict[str, int]:
+        return {"sqlite_connections": len(self._connections)}
@@ -0,0 +1,311 @@
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from .interface import IAsyncDatabase
+from schemas.metrics import TelemetryPayload
+from schemas.session import SessionState
+from shared.logger import get_logger
+
+
+class CoalescingBuffer(object):
+    """
+    Bounded, thread-safe buffer of pending telemetry.
+    Keeps only the latest payload per session: a newer payload replaces the
+    pending one in place, so a session never occupies more than one slot.
+    """
+
+    def __init__(self, max_pending: int = 10000):
+        self._max_pending = max_pending
+        self._pending: "OrderedDict[str, TelemetryPayload]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.enqueued = 0
+        self.coalesced = 0
+        self.rejected = 0
+
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+
+    def put(self, payload: TelemetryPayload) -> bool:
+        """
+        Store payload as the pending write of its session. False if the buffer is full
+        """
+        with self._lock:
+            if payload.session_id in self._pending:
+                self._pending[payload.session_id] = payload
+                self.coalesced += 1
+                return True
+
+            if len(self._pending) >= self._max_pending:
+                self.rejected += 1
+                return False
+
+            self._pending[payload.session_id] = payload
+            self.enqueued += 1
+            return True
+
+
+    def get(self, session_id: str) -> Optional[TelemetryPayload]:
+        return self._pending.get(session_id)
+
+
+    def drain(self, limit: Optional[int] = None) -> List[TelemetryPayload]:
+        """
+        Pop up to limit pending payloads, oldest session first
+        """
+        with self._lock:
+            count = len(self._pending) if limit is None else min(limit, len(self._pending))
+            return [self._pending.popitem(last=False)[1] for _ in range(count)]
+
+
+    def restore(self, payloads: List[TelemetryPayload]) -> int:
+        """
+        Put back payloads of a failed flush, unless a newer one is already pending.
+        Return how many were dropped because the buffer is full.
+        """
+        dropped = 0
+        with self._lock:
+            for payload in payloads:
+                if payload.session_id in self._pending:
+                    continue
+                if len(self._pending) >= self._max_pending:
+                    dropped += 1
+                    continue
+                self._pending[payload.session_id] = payload
+                self._pending.move_to_end(payload.session_id, last=False)
+        return dropped
+
+
+class AsyncWriteBehindDatabase(IAsyncDatabase):
+    """
+    Write-behind decorator around any IAsyncDatabase.
+
+    set_telemetry only stores the payload in a CoalescingBuffer; an asyncio task
+    flushes it to the wrapped database every flush_interval seconds, or earlier
+    once batch_size sessions are pending. When the buffer is full the caller
+    flushes inline (backpressure) instead of dropping data.
+    Session state writes are rare (transitions) and go straight through.
+
+    A failed batch is retried payload by payload, so one bad payload does not
+    hold back the others. A payload that keeps failing while others of the same
+    flush succeed is dropped after max_attempts flushes (dead_lettered); when
+    every write fails the backend is down and nothing is counted.
+    """
+
+    def __init__(
+        self,
+        delegate: IAsyncDatabase,
+        flush_interval: float = 1.0,
+        batch_size: int = 200,
+        max_pending: int = 10000,
+        max_attempts: int = 5
+    ):
+        self._delegate = delegate
+        self._flush_interval = flush_interval
+        self._batch_size = batch_size
+        self._max_attempts = max_attempts
+        self._buffer = CoalescingBuffer(max_pending=max_pending)
+        self._logger = get_logger("WRITE_BEHIND")
+
+        self._flush_lock: Optional[asyncio.Lock] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._stopping: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+        # failed flushes per session, while its payload is isolated as the culprit
+        self._attempts: Dict[str, int] = {}
+
+        # backpressure / throughput counters
+        self._flushed = 0
+        self._flush_batches = 0
+        self._flush_errors = 0
+        self._backpressure = 0
+        self._dropped = 0
+        self._dead_lettered = 0
+        self._last_flush_ms = 0.0
+
+
+    async def connect(self) -> None:
+
+        await self._delegate.connect()
+
+        if self._task is None:
+            # created here so they bind to the running loop
+            self._flush_lock = asyncio.Lock()
+            self._wakeup = asyncio.Event()
+            self._stopping = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+            self._logger.info(
+                f"💾 Async write-behind started (interval {self._flush_interval}s, batch {self._batch_size})."
+            )
+
+
+    async def _run(self) -> None:
+
+        while not self._stopping.is_set():
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self._flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+
+    async def set_telemetry(self, payload: TelemetryPayload) -> None:
+
+        if not self._buffer.put(payload):
+            # buffer full: the writer pays for the flush
+            self._backpressure += 1
+            self._logger.warning(f"🟡 Write-behind buffer full, flushing inline for {payload.session_id}")
+            await self.flush()
+            if not self._buffer.put(payload):
+                await self._delegate.set_telemetry(payload)
+                return
+
+        if len(self._buffer) >= self._batch_size and self._wakeup is not None:
+            self._wakeup.set()
+
+
+    async def set_session(self, payload: SessionState) -> None:
+        await self._delegate.set_session(payload)
+
+
+    async def get_telemetry(self, session_id: str) -> Optional[TelemetryPayload]:
+        # read-your-writes: the pending payload is the newest one
+        pending = self._buffer.get(session_id)
+        if pending is not None:
+            return pending
+        return await self._delegate.get_telemetry(session_id)
+
+
+    async def get_session(self, session_id: str) -> Optional[SessionState]:
+        return await self._delegate.get_session(session_id)
+
+
+    async def flush(self) -> int:
+        """
+        Write every pending payload to the wrapped database. Return how many were written
+        """
+
+        if self._flush_lock is None:
+            self._flush_lock = asyncio.Lock()
+
+        written = 0
+
+        async with self._flush_lock:
+
+            start = time.perf_counter()
+
+            while True:
+                batch = self._buffer.drain(self._batch_size)
+                if not batch:
+                    break
+
+                try:
+                    await self._delegate.set_telemetry_many(batch)
+                    for payload in batch:
+                        self._attempts.pop(payload.session_id, None)
+
+                except Exception as e:
+                    self._flush_errors += 1
+                    self._logger.error(f"🔴 Write-behind flush failed for {len(batch)} sessions, retrying one by one: {e}")
+                    written += await self._write_one_by_one(batch)
+                    # the failed payloads are back in front: next flush
+                    break
+
+                except BaseException:
+                    # cancelled mid-write: the drained batch goes back
+                    self._dropped += self._buffer.restore(batch)
+                    raise
+
+                written += len(batch)
+                self._flush_batches += 1
+
+            self._flushed += written
+            if written:
+                self._last_flush_ms = (time.perf_counter() - start) * 1000
+                self._logger.debug(f"🟢 Flushed {written} telemetry payloads in {self._last_flush_ms:.1f}ms")
+
+        return written
+
+
+    async def _write_one_by_one(self, batch: List[TelemetryPayload]) -> int:
+        """
+        Retry a failed batch payload by payload. Return how many were written; the
+        failed ones go back to the buffer, or are dropped after max_attempts
+        """
+
+        failed: List[TelemetryPayload] = []
+        written = 0
+
+        try:
+            for i, payload in enumerate(batch):
+                try:
+                    await self._delegate.set_telemetry(payload)
+                    self._attempts.pop(payload.session_id, None)
+                    written += 1
+                except Exception as e:
+                    failed.append(payload)
+                    self._logger.warning(f"⚠️ Write of session {payload.session_id} failed: {e}")
+        except BaseException:
+            self._dropped += self._buffer.restore(failed + batch[i:])
+            raise
+
+        # only when others went through the payload itself is the problem
+        retry = failed
+        if written:
+            retry = []
+            for payload in failed:
+                attempts = self._attempts.get(payload.session_id, 0) + 1
+                if attempts >= self._max_attempts:
+                    self._attempts.pop(payload.session_id, None)
+                    self._dead_lettered += 1
+                    self._logger.error(
+                        f"🔴 Dropping telemetry of session {payload.session_id} "
+                        f"(timestamp {payload.timestamp}) after {attempts} failed flushes"
+                    )
+                else:
+                    self._attempts[payload.session_id] = attempts
+                    retry.append(payload)
+
+        self._dropped += self._buffer.restore(retry)
+        return written
+
+
+    async def close(self) -> None:
+        """
+        Stop the flusher task, write whatever is still pending and close the wrapped database
+        """
+
+        if self._task is not None:
+            # the running flush completes: nothing drained is left behind
+            self._stopping.set()
+            self._wakeup.set()
+            await self._task
+            self._task = None
+
+        written = await self.flush()
+        self._logger.info(f"💾 Write-behind stopped, {written} payloads flushed on shutdown.")
+
+        await self._delegate.close()
+
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "pending": len(self._buffer),
+            "enqueued": self._buffer.enqueued,
+            "coalesced": self._buffer.coalesced,
+            "rejected": self._buffer.rejected,
+            "flushed": self._flushed,
+            "flush_batches": self._flush_batches,
+            "flush_errors": self._flush_errors,
+            "backpressure": self._backpressure,
+            "dropped": self._dropped,
+            "dead_lettered": self._dead_lettered,
+            "last_flush_ms": self._last_flush_ms
+        }
@@ -0,0 +1,142 @@
+import asyncio
+import json
+from collections import deque
+from typing import Deque, Dict, Optional, Set
+
+from schemas.session import SessionState
+from shared.logger import get_logger
+
+
+def state_event(state: SessionState, genre: Optional[str] = None) -> dict:
+    """What a dashboard needs of a SessionState: no rules, those come with the setup"""
+    return {
+        "session_id": state.config.session_id,
+        "status": state.current_status,
+        "active_rule_metric": state.active_rule_metric,
+        "active_rule_index": state.active_rule_index,
+        "active_since": state.active_since,
+        "metrics_at_transition": state.metrics_at_transition,
+        "genre": genre
+    }
+
+
+def encode_event(event: dict, name: str = "state") -> bytes:
+    """Server-sent event frame"""
+    return f"event: {name}\ndata: {json.dumps(event)}\n\n".encode()
+
+
+class Subscription(object):
+    """
+    Bounded queue of one subscriber. When full the oldest frame is dropped:
+    a slow dashboard skips intermediate states, it never slows the publisher.
+    """
+
+    def __init__(self, session_id: str, maxsize: int):
+        self.session_id = session_id
+        self._frames: Deque[bytes] = deque(maxlen=maxsize)
+        self._ready = asyncio.Event()
+        self.dropped = 0
+
+
+    def __len__(self) -> int:
+        return len(self._frames)
+
+
+    def push(self, frame: bytes) -> None:
+
+        if len(self._frames) == self._frames.maxlen:
+            self.dropped += 1
+        self._frames.append(frame)
+        self._ready.set()
+
+
+    async def get(self, timeout: Optional[float] = None) -> bytes:
+        """Next frame; asyncio.TimeoutError after timeout seconds without one"""
+
+        while not self._frames:
+            self._ready.clear()
+            await asyncio.wait_for(self._ready.wait(), timeout)
+
+        return self._frames.popleft()
+
+
+class SessionBroadcaster(object):
+    """
+    In-process pub/sub of session state changes.
+
+    publish() serializes the event once and hands the same bytes to every
+    subscriber of the session; with no subscribers it costs a dict lookup.
+    Subscribers only see the transitions handled by this process.
+    """
+
+    def __init__(self, queue_size: int = 64, keepalive: float = 15.0):
+        self._queue_size = queue_size
+        self._keepalive = keepalive
+        self._subscribers: Dict[str, Set[Subscription]] = {}
+        self._logger = get_logger("EVENTS")
+
+        self.published = 0
+        self.delivered = 0
+        self._dropped_closed = 0
+
+
+    @property
+    def keepalive(self) -> float:
+        """Seconds of silence before a stream sends a keep-alive comment"""
+        return self._keepalive
+
+
+    def subscribe(self, session_id: str) -> Subscription:
+
+        subscription = Subscription(session_id, self._queue_size)
+        self._subscribers.setdefault(session_id, set()).add(subscription)
+        self._logger.debug(f"🟢 New subscriber for session {session_id}")
+
+        return subscription
+
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+
+        subscribers = self._subscribers.get(subscription.session_id)
+        if subscribers is None or subscription not in subscribers:
+            return
+
+        subscribers.discard(subscription)
+        if not subscribers:
+            del self._subscribers[subscription.session_id]
+        self._dropped_closed += subscription.dropped
+
+
+    def subscribers(self, session_id: str) -> int:
+        return len(self._subscribers.get(session_id, ()))
+
+
+    def publish(self, state: SessionState, genre: Optional[str] = None) -> int:
+        """Broadcast the new state of a session, return how many subscribers got it"""
+
+        subscribers = self._subscribers.get(state.config.session_id)
+        if not subscribers:
+            return 0
+
+        # serialized once for everyone
+        frame = encode_event(state_event(state, genre))
+        for subscription in subscribers:
+            subscription.push(frame)
+
+        self.published += 1
+        self.delivered += len(subscribers)
+
+        return len(subscribers)
+
+
+    def stats(self) -> Dict[str, int]:
+
+        live = [s for subscribers in self._subscribers.values() for s in subscribers]
+
+        return {
+            "sessions": len(self._subscribers),
+            "subscribers": len(live),
+            "published": self.published,
+            "delivered": self.delivered,
+            "dropped": self._dropped_closed + sum(s.dropped for s in live)
+        }
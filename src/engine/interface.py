@@ -1,22 +1,34 @@
 from abc import ABC, abstractmethod
-from typing import Optional
+from typing import List, Optional
 from schemas.metrics import TelemetryPayload
 from schemas.session import SessionState
+from .transitions import Transition
 
 class IOrchestrator(ABC):
 
     @abstractmethod
-    def process_telemetry(self, payload: TelemetryPayload) -> bool:
+    async def process_telemetry(self, payload: TelemetryPayload) -> Optional[str]:
+        """Persist telemetry and return the target genre of the winning rule, if any"""
         pass
 
     @abstractmethod
-    def process_session(self, payload: SessionState) -> bool:
+    async def process_transition(self, payload: TelemetryPayload) -> Optional[Transition]:
+        """Persist telemetry and return the state transition it causes, if any"""
         pass
 
     @abstractmethod
-    def get_telemetry(self,  session_id: str) -> Optional[TelemetryPayload]:
+    async def process_batch(self, payloads: List[TelemetryPayload]) -> List[Optional[Transition]]:
+        """Persist telemetry of many sessions and return the transition of each payload"""
         pass
 
     @abstractmethod
-    def get_session(self, session_id: str) -> Optional[SessionState]:
+    async def process_session(self, payload: SessionState) -> bool:
+        pass
+
+    @abstractmethod
+    async def get_telemetry(self,  session_id: str) -> Optional[TelemetryPayload]:
+        pass
+
+    @abstractmethod
+    async def get_session(self, session_id: str) -> Optional[SessionState]:
         pass
@@ -1,54 +1,208 @@
+import asyncio
 import os
-from typing import Optional, List
+from collections import OrderedDict
+from typing import Dict, Optional, List, Tuple
 
-from cache.interface import ICache
-from database.interface import IDatabase
+from cache.interface import IAsyncCache
+from database.interface import IAsyncDatabase
 
 from schemas.session import SessionState, TriggerRule
 from schemas.metrics import TelemetryPayload
 
 from .interface import IOrchestrator
-from .strategies import RuleEvaluator
+from .strategies import RuleEvaluator, CompiledRuleSet, rules_fingerprint
+from .transitions import Transition, TransitionMachine
+from .events import SessionBroadcaster
 from shared.logger import get_logger
 
 
 class Orchestrator(IOrchestrator):
+    """
+    Brain of the engine. Storage is awaited on the event loop through the
+    asyncio backends; rule evaluation is pure CPU work and stays synchronous.
+    """
 
-    def __init__(self, cache: ICache, db: IDatabase):
+    def __init__(
+        self,
+        cache: IAsyncCache,
+        db: IAsyncDatabase,
+        events: Optional[SessionBroadcaster] = None,
+        max_rule_sets: int = 1024
+    ):
         self._cache = cache
         self._db = db
+        self._events = events
         self._logger = get_logger("ORCHESTRATOR")
 
+        # (rules_version, compiled rules) per session id (LRU), rebuilt only when the version changes
+        self._rule_sets: "OrderedDict[str, Tuple[str, CompiledRuleSet]]" = OrderedDict()
+        self._max_rule_sets = max_rule_sets
 
-    def process_telemetry(self, payload: TelemetryPayload) -> bool:
+
+    @property
+    def cache(self) -> IAsyncCache:
+        return self._cache
+
+
+    @property
+    def db(self) -> IAsyncDatabase:
+        return self._db
+
+
+    @property
+    def events(self) -> Optional[SessionBroadcaster]:
+        return self._events
+
+
+    def get_rule_set(self, session: SessionState) -> CompiledRuleSet:
+        """
+        Return the compiled rules of the session, compiling them on first use
+        or when the rules version changes (config set up again, maybe through
+        another worker). The version is stamped once by process_session, so the
+        check is a string comparison; only states stored without it hash their rules.
+        """
+
+        config = session.config
+        session_id = config.session_id
+        version = config.rules_version or rules_fingerprint(config.rules)
+
+        cached = self._rule_sets.get(session_id)
+        if cached is not None and cached[0] == version:
+            self._rule_sets.move_to_end(session_id)
+            return cached[1]
+
+        rule_set = CompiledRuleSet(config.rules)
+        self._rule_sets[session_id] = (version, rule_set)
+        self._rule_sets.move_to_end(session_id)
+        if len(self._rule_sets) > self._max_rule_sets:
+            self._rule_sets.popitem(last=False)
+        self._logger.debug(f"🟢 Compiled {len(rule_set)} rules for session id {session_id}")
+
+        return rule_set
+
+
+    def evaluate(self, session: SessionState, metrics: Dict[str, float]) -> Optional[TriggerRule]:
+        """
+        Return the winning rule for metrics, None if no rule is triggered
+        """
+        return self.get_rule_set(session).resolve(metrics)
+
+
+    async def process_telemetry(self, payload: TelemetryPayload) -> Optional[str]:
+        transition = await self.process_transition(payload)
+        return transition.genre if transition else None
+
+
+    async def process_transition(self, payload: TelemetryPayload) -> Optional[Transition]:
         
         try:
             
             # 1) update or insert into cache
-            self._cache.set_telemetry(payload)
+            await self._cache.set_telemetry(payload)
 
             # 2) update or insert into db
-            self._db.set_telemetry(payload)
+            await self._db.set_telemetry(payload)
 
             self._logger.debug(f"🟢 Telemetry with session id {payload.session_id} correctly processed")
 
-            return True
-        
         except Exception as e:
             
-            self.log.error(f"🔴 Error while saving telemetry with session id {payload.session_id}: {e}")
-            return False
+            self._logger.error(f"🔴 Error while saving telemetry with session id {payload.session_id}: {e}")
+            return None
+
+        # 3) evaluate the compiled rules of the session
+        session = await self.get_session(payload.session_id)
+        if not session:
+            return None
+
+        # 4) edge-triggered: only a real transition is persisted and returned
+        transition = TransitionMachine.step(session, self.get_rule_set(session), payload.metrics, payload.timestamp)
+        if transition is None:
+            return None
+
+        self._logger.info(
+            f"🟡 Session {payload.session_id} -> {transition.state.current_status} "
+            f"(rule on {transition.state.active_rule_metric})"
+        )
+        if await self._save_session(transition.state) and self._events:
+            self._events.publish(transition.state, transition.genre)
+
+        return transition
+
 
+    async def process_batch(self, payloads: List[TelemetryPayload]) -> List[Optional[Transition]]:
+        """
+        Telemetry of many sessions: bulk writes, one session lookup for the whole batch,
+        one rule pass. Return the transition caused by each payload, in input order.
+        """
 
-    def process_session(self, payload: SessionState) -> bool:
+        try:
+
+            # 1) bulk write into cache and db
+            await self._cache.set_telemetry_many(payloads)
+            await self._db.set_telemetry_many(payloads)
+
+        except Exception as e:
+
+            self._logger.error(f"🔴 Error while saving a batch of {len(payloads)} telemetry payloads: {e}")
+            return [None] * len(payloads)
+
+        # 2) session states of the batch, one cache round-trip
+        sessions = await self.get_sessions_many(list(dict.fromkeys(p.session_id for p in payloads)))
+
+        # 3) payloads of the same session run in timestamp order on the evolving state
+        transitions: List[Optional[Transition]] = [None] * len(payloads)
+        changed: Dict[str, Transition] = {}
+
+        for i in sorted(range(len(payloads)), key=lambda i: payloads[i].timestamp):
+
+            payload = payloads[i]
+            session = sessions.get(payload.session_id)
+            if session is None:
+                continue
+
+            transition = TransitionMachine.step(session, self.get_rule_set(session), payload.metrics, payload.timestamp)
+            if transition is not None:
+                transitions[i] = transition
+                sessions[payload.session_id] = transition.state
+                changed[payload.session_id] = transition
+
+        # 4) only the final state of each session is persisted
+        if changed:
+            self._logger.info(f"🟡 Batch of {len(payloads)} payloads: {len(changed)} sessions changed state")
+            saved = await asyncio.gather(*(self._save_session(t.state) for t in changed.values()))
+
+            if self._events:
+                for transition, ok in zip(changed.values(), saved):
+                    if ok:
+                        self._events.publish(transition.state, transition.genre)
+
+        return transitions
+
+
+    async def process_session(self, payload: SessionState) -> bool:
+
+        # config may have changed: drop the compiled rules and stamp the new version
+        self._rule_sets.pop(payload.config.session_id, None)
+        config = payload.config.model_copy(update={"rules_version": rules_fingerprint(payload.config.rules)})
+        payload = payload.model_copy(update={"config": config})
+
+        saved = await self._save_session(payload)
+        if saved and self._events:
+            self._events.publish(payload)
+
+        return saved
+
+
+    async def _save_session(self, payload: SessionState) -> bool:
 
         try:
         
             # 1) update or insert into cache
-            self._cache.set_session(payload)
+            await self._cache.set_session(payload)
 
             # 2) update or insert into db
-            self._db.set_session(payload)
+            await self._db.set_session(payload)
 
             self._logger.debug(f"🟢 Session state with session id {payload.config.session_id} correctly processed")
 
@@ -56,24 +210,24 @@ class Orchestrator(IOrchestrator):
         
         except Exception as e:
             
-            self.log.error(f"🔴 Error while saving session with session id {payload.config.session_id}: {e}")
+            self._logger.error(f"🔴 Error while saving session with session id {payload.config.session_id}: {e}")
             return False
 
 
-    def get_telemetry(self, session_id) -> Optional[TelemetryPayload]:
+    async def get_telemetry(self, session_id) -> Optional[TelemetryPayload]:
         
         # check if present into cache
-        data_cache = self._cache.get_telemetry(session_id)
+        data_cache = await self._cache.get_telemetry(session_id)
         if data_cache:
             self._logger.debug(f"🟢 Telemetry data present with session id {session_id} present in cache")
             return data_cache
         
         # session_id not in cache, searching db
-        data_db = self._db.get_telemetry(session_id)
+        data_db = await self._db.get_telemetry(session_id)
         if data_db:
             self._logger.debug(f"🟢 Telemetry data present with session id {session_id} present in db")
             # data present into db, save it in cache
-            self._cache.set_telemetry(data_db)
+            await self._cache.set_telemetry(data_db)
             return data_db
         
         # not present into db or cache, return None
@@ -81,22 +235,40 @@ class Orchestrator(IOrchestrator):
         return None
 
 
-    def get_session(self, session_id) -> Optional[SessionState]:
+    async def get_session(self, session_id) -> Optional[SessionState]:
         
         # check if present into cache
-        data_cache = self._cache.get_session(session_id)
+        data_cache = await self._cache.get_session(session_id)
         if data_cache:
             self._logger.debug(f"🟢 Session data present with session id {session_id} present in cache")
             return data_cache
         
         # session_id not in cache, searching db
-        data_db = self._db.get_session(session_id)
+        data_db = await self._db.get_session(session_id)
         if data_db:
             self._logger.debug(f"🟢 Session data present with session id {session_id} present in db")
             # data present into db, save it in cache
-            self._cache.set_session(data_db)
+            await self._cache.set_session(data_db)
             return data_db
         
         # not present into db or cache, return None
         self._logger.error(f"🔴 Session data with session id {session_id} present neither in cache nor db")
         return None
+
+
+    async def get_sessions_many(self, session_ids: List[str]) -> Dict[str, Optional[SessionState]]:
+        """
+        Session states of many sessions: one cache round-trip, db only for the misses
+        """
+
+        sessions = await self._cache.get_sessions_many(session_ids)
+
+        for session_id, state in sessions.items():
+            if state is None:
+                state = await self._db.get_session(session_id)
+                if state:
+                    # data present into db, save it in cache
+                    await self._cache.set_session(state)
+                sessions[session_id] = state
+
+        return sessions
@@ -1,6 +1,11 @@
-from typing import Callable, Dict
+import hashlib
+import json
+from bisect import bisect_left, bisect_right
+from typing import Callable, Dict, List, Mapping, Optional, Sequence, Tuple
 import operator
 
+from schemas.session import TriggerRule
+
 OPERATORS: Dict[str, Callable[[float, float], bool]] = {
     "lt": operator.lt,
     "le": operator.le,
@@ -20,5 +25,144 @@ class RuleEvaluator(object):
         op_func = OPERATORS.get(operator_str)
         if not op_func:
             return False
-        
+
         return op_func(current_value, threshold)
+
+
+def operator_value(rule: TriggerRule) -> str:
+    """Operator of a rule as plain string (enum or already unwrapped value)"""
+    return getattr(rule.operator, "value", rule.operator)
+
+
+def priority_order(rules: Sequence[TriggerRule]) -> List[int]:
+    """
+    Indexes of rules from the weakest to the strongest one.
+    Higher priority wins, ties go to the rule declared first.
+    """
+    return sorted(range(len(rules)), key=lambda i: (rules[i].priority, -i))
+
+
+def rules_fingerprint(rules: Sequence[TriggerRule]) -> str:
+    """Short digest of a rule list: equal rules, equal fingerprint"""
+    encoded = json.dumps([rule.model_dump(mode="json") for rule in rules], sort_keys=True).encode()
+    return hashlib.blake2b(encoded, digest_size=8).hexdigest()
+
+
+class CompiledRuleSet(object):
+    """
+    The rules of a SessionConfig compiled once into a per-metric index.
+
+    Every (metric, operator) pair keeps its thresholds sorted together with the
+    best rank of each prefix/suffix, so the winning rule of a bucket is found
+    with one bisect. Ranks follow the priority order of the whole config:
+    higher priority wins, ties go to the rule declared first.
+    """
+
+    __slots__ = ("rules", "_order", "_rank_of", "_index", "_top_rank")
+
+    def __init__(self, rules: Sequence[TriggerRule]):
+
+        self.rules: Tuple[TriggerRule, ...] = tuple(rules)
+
+        # 1) global priority order, computed once
+        self._order: List[int] = priority_order(self.rules)
+        self._rank_of: List[int] = [0] * len(self.rules)
+        for rank, rule_idx in enumerate(self._order):
+            self._rank_of[rule_idx] = rank
+        self._top_rank = len(self._order) - 1
+        rank_of = self._rank_of
+
+        # 2) group (threshold, rank) by metric and operator
+        grouped: Dict[str, Dict[str, List[Tuple[float, int]]]] = {}
+        for i, rule in enumerate(self.rules):
+            op = operator_value(rule)
+            if op not in OPERATORS:
+                continue
+            grouped.setdefault(rule.metric_name, {}).setdefault(op, []).append((rule.threshold, rank_of[i]))
+
+        # 3) sorted thresholds + best rank per prefix/suffix
+        self._index: Dict[str, List[tuple]] = {
+            metric: [self._build_bucket(op, entries) for op, entries in by_op.items()]
+            for metric, by_op in grouped.items()
+        }
+
+
+    @staticmethod
+    def _build_bucket(op: str, entries: List[Tuple[float, int]]) -> tuple:
+
+        if op == "eq":
+            best: Dict[float, int] = {}
+            for threshold, rank in entries:
+                if rank > best.get(threshold, -1):
+                    best[threshold] = rank
+            return (op, None, best)
+
+        entries.sort(key=lambda e: e[0])
+        thresholds = [e[0] for e in entries]
+        best_ranks = [-1] * (len(entries) + 1)
+
+        if op in ("lt", "le"):
+            # triggered rules are a suffix: best_ranks[i] = best of entries[i:]
+            for i in range(len(entries) - 1, -1, -1):
+                best_ranks[i] = max(best_ranks[i + 1], entries[i][1])
+        else:
+            # "gt"/"ge": triggered rules are a prefix: best_ranks[i] = best of entries[:i]
+            for i in range(len(entries)):
+                best_ranks[i + 1] = max(best_ranks[i], entries[i][1])
+
+        return (op, thresholds, best_ranks)
+
+
+    def __len__(self) -> int:
+        return len(self.rules)
+
+
+    def rank(self, rule_idx: int) -> int:
+        """Position of a rule in the priority order (higher wins)"""
+        return self._rank_of[rule_idx]
+
+
+    def resolve(self, metrics: Mapping[str, float]) -> Optional[TriggerRule]:
+        """
+        Return the highest priority rule triggered by metrics, None otherwise
+        """
+        rule_idx = self.resolve_index(metrics)
+        return self.rules[rule_idx] if rule_idx >= 0 else None
+
+
+    def resolve_index(self, metrics: Mapping[str, float]) -> int:
+        """
+        Index (in config order) of the highest priority rule triggered by metrics, -1 otherwise
+        """
+
+        index = self._index
+        best = -1
+
+        # walk the smaller of the two maps
+        if len(metrics) <= len(index):
+            pairs = ((index.get(name), value) for name, value in metrics.items())
+        else:
+            pairs = ((buckets, metrics.get(name)) for name, buckets in index.items())
+
+        for buckets, value in pairs:
+            if buckets is None or value is None:
+                continue
+
+            for op, thresholds, ranks in buckets:
+                if op == "lt":
+                    rank = ranks[bisect_right(thresholds, value)]
+                elif op == "gt":
+                    rank = ranks[bisect_left(thresholds, value)]
+                elif op == "eq":
+                    rank = ranks.get(value, -1)
+                elif op == "le":
+                    rank = ranks[bisect_left(thresholds, value)]
+                else: # "ge"
+                    rank = ranks[bisect_right(thresholds, value)]
+
+                if rank > best:
+                    if rank == self._top_rank:
+                        return self._order[rank]
+                    best = rank
+
+        return self._order[best] if best >= 0 else -1
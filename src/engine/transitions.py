@@ -0,0 +1,123 @@
+from typing import Mapping, NamedTuple, Optional
+
+from schemas.session import SessionState, TriggerRule
+
+from .strategies import CompiledRuleSet, operator_value
+
+
+class Transition(NamedTuple):
+    """
+    Result of an accepted state change.
+    genre is None when the new state plays the same genre as the previous one.
+    """
+    state: SessionState
+    genre: Optional[str]
+
+
+class TransitionMachine(object):
+    """
+    Edge-triggered state machine over SessionState.
+
+    A session is NOMINAL (no active rule) or CRITICAL (one active rule).
+    The active rule is released only when its metric leaves the hysteresis band
+    and its min_dwell is elapsed; a stronger rule always preempts it.
+    Telemetry that does not change the state produces no Transition.
+    """
+
+    @staticmethod
+    def is_held(rule: TriggerRule, metrics: Mapping[str, float]) -> bool:
+        """
+        True while the metric is still inside the rule threshold widened by its hysteresis band
+        """
+
+        value = metrics.get(rule.metric_name)
+        if value is None:
+            # no news about the metric: keep the rule
+            return True
+
+        op = operator_value(rule)
+        band = rule.hysteresis
+
+        if op == "lt":
+            return value < rule.threshold + band
+        if op == "le":
+            return value <= rule.threshold + band
+        if op == "gt":
+            return value > rule.threshold - band
+        if op == "ge":
+            return value >= rule.threshold - band
+        if op == "eq":
+            return abs(value - rule.threshold) <= band
+
+        return False
+
+
+    @staticmethod
+    def _active_index(state: SessionState) -> int:
+
+        idx = state.active_rule_index
+        if state.current_status != "CRITICAL" or idx is None or not (0 <= idx < len(state.config.rules)):
+            return -1
+        return idx
+
+
+    @classmethod
+    def step(
+        cls,
+        state: SessionState,
+        rule_set: CompiledRuleSet,
+        metrics: Mapping[str, float],
+        now: float
+    ) -> Optional[Transition]:
+        """
+        Feed metrics received at time now. Return the Transition, None if the state does not change
+        """
+
+        rules = state.config.rules
+        active_idx = cls._active_index(state)
+        candidate_idx = rule_set.resolve_index(metrics)
+
+        if active_idx == candidate_idx:
+            return None
+
+        if active_idx >= 0:
+
+            active = rules[active_idx]
+            stronger = candidate_idx >= 0 and rule_set.rank(candidate_idx) > rule_set.rank(active_idx)
+
+            if not stronger:
+                # 1) minimum dwell time
+                since = state.active_since if state.active_since is not None else now
+                if now - since < active.min_dwell:
+                    return None
+
+                # 2) hysteresis band
+                if cls.is_held(active, metrics):
+                    return None
+
+            previous_genre = active.target_genre
+
+        else:
+            previous_genre = state.config.default_genre
+
+        if candidate_idx >= 0:
+            rule = rules[candidate_idx]
+            new_state = state.model_copy(update={
+                "current_status": "CRITICAL",
+                "active_rule_metric": rule.metric_name,
+                "active_rule_index": candidate_idx,
+                "active_since": now,
+                "metrics_at_transition": dict(metrics)
+            })
+            genre = rule.target_genre
+        else:
+            new_state = state.model_copy(update={
+                "current_status": "NOMINAL",
+                "active_rule_metric": None,
+                "active_rule_index": None,
+                "active_since": now,
+                "metrics_at_transition": dict(metrics)
+            })
+            genre = state.config.default_genre
+
+        return Transition(state=new_state, genre=genre if genre != previous_genre else None)
@@ -0,0 +1,134 @@
+import asyncio
+import time
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from shared.logger import get_logger
+
+
+class DeviceRegistry(object):
+    """
+    Playback device of one Spotify account, kept fresh off the hot path.
+
+    A background task refreshes the device list every interval seconds, and
+    earlier when a command reports a failure. current() only reads the cached
+    id: play/volume/stop never wait for a device lookup. The selection prefers
+    the active device, then the last device a command succeeded on (last good),
+    then the first available one. With no device listed the last good id is
+    kept, since Spotify often lists an idle device again on the next command.
+    """
+
+    def __init__(self, fetch: Callable[[], Awaitable[List[dict]]], interval: float = 30.0, min_interval: float = 2.0):
+        self._fetch = fetch
+        self._interval = interval
+        self._min_interval = min_interval
+        self._logger = get_logger("DEVICES")
+
+        self._device_id: Optional[str] = None
+        self._last_good: Optional[str] = None
+        self._devices: List[dict] = []
+        self._refreshed_at = 0.0
+
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+        self.refreshes = 0
+        self.refresh_errors = 0
+        self.failures_reported = 0
+
+
+    def current(self) -> Optional[str]:
+        return self._device_id
+
+
+    @property
+    def devices(self) -> List[dict]:
+        return list(self._devices)
+
+
+    async def start(self) -> None:
+
+        if self._task is not None: return
+
+        # created here so they bind to the running loop
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+
+    async def close(self) -> None:
+
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+
+    async def _run(self) -> None:
+
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self._interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+            # failures in a burst trigger one refresh, not one each
+            wait = self._refreshed_at + self._min_interval - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+
+            try:
+                await self.refresh()
+            except Exception as e:
+                self.refresh_errors += 1
+                self._logger.error(f"🔴 Device refresh failed, keeping {self._device_id}: {e}")
+
+
+    async def refresh(self) -> Optional[str]:
+
+        devices = await self._fetch()
+        self._devices = devices
+        self._refreshed_at = time.monotonic()
+        self.refreshes += 1
+
+        ids = [d["id"] for d in devices]
+        active = [d["id"] for d in devices if d.get("is_active")]
+
+        if active:
+            device_id = active[0]
+        elif self._last_good in ids:
+            device_id = self._last_good
+        elif ids:
+            device_id = ids[0]
+            self._logger.warning(f"🟡 No active device. Selected fallback: {devices[0].get('name', device_id)}")
+        else:
+            device_id = self._last_good
+            self._logger.error("🔴 No device found for spotify! Open Spotify on PC/Mobile.")
+
+        if device_id != self._device_id:
+            self._logger.info(f"🟢 Playback device: {device_id}")
+        self._device_id = device_id
+
+        return device_id
+
+
+    def mark_good(self, device_id: str) -> None:
+        """A command succeeded on device_id"""
+        self._last_good = device_id
+
+
+    def report_failure(self, device_id: Optional[str]) -> None:
+        """A command failed on device_id: refresh in background, never inline"""
+        self.failures_reported += 1
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "device": self._device_id,
+            "last_good": self._last_good,
+            "devices": len(self._devices),
+            "refreshes": self.refreshes,
+            "refresh_errors": self.refresh_errors,
+            "failures_reported": self.failures_reported
+        }
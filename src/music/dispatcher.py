@@ -0,0 +1,226 @@
+import asyncio
+import time
+from collections import OrderedDict, deque
+from typing import Dict, Optional, Tuple
+
+from .interface import IAsyncMusicProvider
+from .ramps import RampScheduler
+from shared.logger import get_logger
+
+
+class MusicDispatcher(object):
+    """
+    Queue of music commands between the telemetry path and the provider.
+
+    submit() only records the latest intended genre of the session: commands
+    arriving within debounce seconds of the first one collapse into it, and a
+    genre equal to the last one played is dropped. A bounded pool of workers
+    runs the provider calls, at most one in flight per session, so Spotify sees
+    one call per settled transition whatever the telemetry rate.
+    With a RampScheduler and crossfade > 0 a transition becomes a crossfade
+    instead of a direct play_genre; one behind a stronger crossfade runs when
+    that one ends.
+    The last played genre is recorded only once the provider accepted the play,
+    for at most max_sessions sessions (LRU): a failed play is retried by the
+    next transition, and ended sessions do not pin memory.
+    """
+
+    def __init__(
+        self,
+        provider: IAsyncMusicProvider,
+        debounce: float = 0.5,
+        workers: int = 4,
+        latency_window: int = 1000,
+        ramps: Optional[RampScheduler] = None,
+        crossfade: float = 0.0,
+        max_sessions: int = 10000
+    ):
+        self._provider = provider
+        self._debounce = debounce
+        self._n_workers = workers
+        self._ramps = ramps
+        self._crossfade = crossfade
+        self._logger = get_logger("MUSIC_DISPATCHER")
+
+        # session -> (genre, priority, first submit time)
+        self._pending: Dict[str, Tuple[str, int, float]] = {}
+        self._scheduled: Dict[str, asyncio.TimerHandle] = {}
+        self._in_flight: set = set()
+        self._last_played: "OrderedDict[str, str]" = OrderedDict()
+        self._max_sessions = max_sessions
+        # session -> genre of the crossfade whose play has not happened yet
+        self._fading: Dict[str, str] = {}
+        if ramps is not None:
+            ramps.add_play_listener(self._crossfade_played)
+
+        self._ready: Optional[asyncio.Queue] = None
+        self._workers: list = []
+
+        self._latencies = deque(maxlen=latency_window)
+        self.submitted = 0
+        self.coalesced = 0
+        self.duplicates = 0
+        self.played = 0
+        self.failed = 0
+
+
+    @property
+    def provider(self) -> IAsyncMusicProvider:
+        return self._provider
+
+
+    @property
+    def ramps(self) -> Optional[RampScheduler]:
+        return self._ramps
+
+
+    @property
+    def depth(self) -> int:
+        """Sessions with a command waiting (debouncing, ready or in flight)"""
+        return len(self._pending.keys() | self._in_flight)
+
+
+    async def start(self) -> None:
+
+        if self._workers: return
+
+        # created here so they bind to the running loop
+        self._ready = asyncio.Queue()
+        if self._ramps is not None:
+            await self._ramps.start()
+        self._workers = [asyncio.create_task(self._work()) for _ in range(self._n_workers)]
+        self._logger.info(f"🟢 Music dispatcher started ({self._n_workers} workers, debounce {self._debounce}s)")
+
+
+    async def close(self) -> None:
+
+        for handle in self._scheduled.values():
+            handle.cancel()
+        self._scheduled.clear()
+
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+        if self._ramps is not None:
+            await self._ramps.close()
+
+
+    def submit(self, session_id: str, genre: str, priority: int = 0) -> None:
+        """Non-blocking: called from the request path"""
+
+        self.submitted += 1
+
+        pending = self._pending.get(session_id)
+        if pending is not None:
+            # keep the first timestamp: latency is measured from the first request
+            self._pending[session_id] = (genre, priority, pending[2])
+            self.coalesced += 1
+            return
+
+        self._pending[session_id] = (genre, priority, time.monotonic())
+        if session_id not in self._in_flight:
+            self._schedule(session_id)
+
+
+    def _schedule(self, session_id: str) -> None:
+        loop = asyncio.get_running_loop()
+        self._scheduled[session_id] = loop.call_later(self._debounce, self._release, session_id)
+
+
+    def _release(self, session_id: str) -> None:
+        self._scheduled.pop(session_id, None)
+        self._ready.put_nowait(session_id)
+
+
+    async def _work(self) -> None:
+
+        while True:
+            session_id = await self._ready.get()
+
+            pending = self._pending.pop(session_id, None)
+            if pending is None:
+                continue
+            genre, priority, submitted_at = pending
+
+            if self._current_genre(session_id) == genre:
+                self.duplicates += 1
+                continue
+
+            if self._ramps is not None and self._crossfade > 0:
+                # the timer wheel runs the crossfade: nothing to await here, the play listener records it
+                if self._ramps.crossfade(session_id, genre, self._crossfade, priority=priority):
+                    self._fading[session_id] = genre
+                self._latencies.append(time.monotonic() - submitted_at)
+                continue
+
+            self._in_flight.add(session_id)
+            try:
+                if await self._provider.play_genre(genre):
+                    self._remember(session_id, genre)
+                    self.played += 1
+                else:
+                    self.failed += 1
+            except Exception as e:
+                self.failed += 1
+                self._logger.error(f"🔴 play_genre({genre}) failed for session {session_id}: {e}")
+            finally:
+                self._in_flight.discard(session_id)
+                self._latencies.append(time.monotonic() - submitted_at)
+
+            # a newer command arrived while playing: debounce it in turn
+            if session_id in self._pending and session_id not in self._scheduled:
+                self._schedule(session_id)
+
+
+    def _current_genre(self, session_id: str) -> Optional[str]:
+        """Genre the session is going to: the crossfade still running, else the last one played"""
+        if session_id in self._fading and self._ramps.active(session_id):
+            return self._fading[session_id]
+        self._fading.pop(session_id, None)
+        return self._last_played.get(session_id)
+
+
+    def _remember(self, session_id: str, genre: str) -> None:
+        self._last_played[session_id] = genre
+        self._last_played.move_to_end(session_id)
+        if len(self._last_played) > self._max_sessions:
+            self._last_played.popitem(last=False)
+
+
+    def _crossfade_played(self, session_id: str, genre: str, ok: bool) -> None:
+
+        if self._fading.get(session_id) == genre:
+            del self._fading[session_id]
+
+        if ok:
+            self._remember(session_id, genre)
+            self.played += 1
+        else:
+            self.failed += 1
+
+
+    def forget(self, session_id: str) -> None:
+        """Drop the session (e.g. on setup): the next genre is always played"""
+        self._last_played.pop(session_id, None)
+        self._fading.pop(session_id, None)
+        if self._ramps is not None:
+            self._ramps.forget(session_id)
+
+
+    def stats(self) -> Dict[str, float]:
+
+        latencies = sorted(self._latencies)
+        p95 = latencies[int(0.95 * (len(latencies) - 1))] if latencies else 0.0
+
+        return {
+            "queue_depth": self.depth,
+            "submitted": self.submitted,
+            "coalesced": self.coalesced,
+            "duplicates": self.duplicates,
+            "played": self.played,
+            "failed": self.failed,
+            "latency_avg_ms": 1000 * sum(latencies) / len(latencies) if latencies else 0.0,
+            "latency_p95_ms": 1000 * p95
+        }
@@ -1,5 +1,6 @@
-from .interface import IMusicProvider
+from .interface import IMusicProvider, IAsyncMusicProvider
 from .spotify import SpotifyMusicService
+from .spotify_async import AsyncSpotifyMusicService
 
 from enum import Enum
 
@@ -24,3 +25,18 @@ class MusicFactory(object):
         instance.connect()
 
         return instance
+
+
+    @staticmethod
+    async def get_async_music_provider(provider_type: ProviderEnum) -> IAsyncMusicProvider:
+
+        if provider_type == ProviderEnum.SPOTIFY:
+
+            instance = AsyncSpotifyMusicService()
+
+        else:
+            raise ValueError(f"Music provider {provider_type} not supported. Valid values are [spotify]")
+
+        await instance.connect()
+
+        return instance
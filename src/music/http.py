@@ -0,0 +1,249 @@
+import asyncio
+import itertools
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from enum import IntEnum
+from typing import Awaitable, Callable, Dict, Optional, Set
+
+import httpx
+
+
+class RequestPriority(IntEnum):
+    """Lower value goes first: a genre change never waits behind a device refresh"""
+    PLAYBACK = 0
+    VOLUME = 1
+    SEARCH = 2
+    DEVICES = 3
+
+
+def retry_after(value: Optional[str], default: float = 1.0) -> float:
+    """Seconds to wait from a Retry-After header: delta-seconds or HTTP-date, default if missing or invalid"""
+
+    if value is None:
+        return default
+
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+
+    try:
+        date = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return default
+
+    if date.tzinfo is None:
+        date = date.replace(tzinfo=timezone.utc)
+
+    return max(0.0, (date - datetime.now(timezone.utc)).total_seconds())
+
+
+class ClientClosedError(ConnectionError):
+    """The client was closed before the request got its response"""
+
+
+class TokenBucket(object):
+    """
+    rate tokens per second, up to burst. pause() empties the bucket until a
+    deadline (HTTP 429 Retry-After): every caller waits, not only the throttled one.
+    """
+
+    def __init__(self, rate: float, burst: float, clock: Callable[[], float] = time.monotonic):
+        self._rate = rate
+        self._burst = burst
+        self._clock = clock
+        self._tokens = burst
+        self._updated = clock()
+        self._paused_until = 0.0
+
+
+    def delay(self) -> float:
+        """Take a token and return 0, or return how long to wait before asking again"""
+
+        now = self._clock()
+
+        if now < self._paused_until:
+            return self._paused_until - now
+
+        self._tokens = min(self._burst, self._tokens + max(0.0, now - self._updated) * self._rate)
+        self._updated = now
+
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return 0.0
+
+        return (1 - self._tokens) / self._rate
+
+
+    def pause(self, seconds: float) -> None:
+        now = self._clock()
+        self._paused_until = max(self._paused_until, now + seconds)
+        # refill restarts when the pause ends
+        self._tokens = 0.0
+        self._updated = self._paused_until
+
+
+class SpotifyHttpClient(object):
+    """
+    HTTP layer of the Spotify provider.
+
+    One httpx.AsyncClient with a bounded keep-alive pool; requests wait in a
+    priority queue and leave it through a token bucket, at most max_connections
+    at a time. A 429 pauses the bucket for Retry-After seconds and puts the
+    request back in the queue with its original order. close() fails every
+    request still waiting with ClientClosedError.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        authorization: Callable[[], Awaitable[str]],
+        rate: float = 10.0,
+        burst: float = 20.0,
+        max_connections: int = 10,
+        max_retries: int = 3,
+        timeout: float = 5.0,
+        transport: Optional[httpx.AsyncBaseTransport] = None
+    ):
+        self._base_url = base_url
+        self._authorization = authorization
+        self._bucket = TokenBucket(rate, burst)
+        self._max_connections = max_connections
+        self._max_retries = max_retries
+        self._timeout = timeout
+        self._transport = transport
+
+        self._client: Optional[httpx.AsyncClient] = None
+        self._queue: Optional[asyncio.PriorityQueue] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._dispatcher: Optional[asyncio.Task] = None
+        # requests in flight: the loop keeps only weak references to tasks
+        self._in_flight: Set[asyncio.Task] = set()
+        self._order = itertools.count()
+
+        self.sent = 0
+        self.throttled = 0
+        self._latency: Dict[RequestPriority, list] = {p: [0, 0.0] for p in RequestPriority}
+
+
+    async def start(self) -> None:
+
+        if self._dispatcher is not None: return
+
+        self._client = httpx.AsyncClient(
+            base_url=self._base_url,
+            timeout=self._timeout,
+            limits=httpx.Limits(
+                max_connections=self._max_connections,
+                max_keepalive_connections=self._max_connections,
+                keepalive_expiry=30.0
+            ),
+            transport=self._transport
+        )
+        self._queue = asyncio.PriorityQueue()
+        self._slots = asyncio.Semaphore(self._max_connections)
+        self._dispatcher = asyncio.create_task(self._dispatch())
+
+
+    async def close(self) -> None:
+
+        if self._dispatcher is not None:
+            self._dispatcher.cancel()
+            await asyncio.gather(self._dispatcher, return_exceptions=True)
+            self._dispatcher = None
+
+        # 1) requests in flight: _send fails their futures on cancellation
+        tasks = list(self._in_flight)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+        # 2) requests still queued would wait forever
+        while self._queue is not None and not self._queue.empty():
+            future = self._queue.get_nowait()[-1]
+            if not future.done():
+                future.set_exception(ClientClosedError("Spotify HTTP client closed"))
+
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+    async def request(self, method: str, path: str, priority: RequestPriority = RequestPriority.SEARCH, **kwargs) -> httpx.Response:
+        """Queue the request and wait for its response (429 already retried)"""
+
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((priority, next(self._order), 0, time.monotonic(), method, path, kwargs, future))
+        return await future
+
+
+    async def _dispatch(self) -> None:
+
+        while True:
+            item = await self._queue.get()
+
+            try:
+                while (delay := self._bucket.delay()) > 0:
+                    await asyncio.sleep(delay)
+                await self._slots.acquire()
+            except asyncio.CancelledError:
+                # close(): back with the queued requests, failed there
+                self._queue.put_nowait(item)
+                raise
+
+            # meanwhile something more urgent may have arrived
+            self._queue.put_nowait(item)
+            item = self._queue.get_nowait()
+
+            task = asyncio.create_task(self._send(item))
+            self._in_flight.add(task)
+            task.add_done_callback(self._in_flight.discard)
+
+
+    async def _send(self, item) -> None:
+
+        priority, order, attempt, queued_at, method, path, kwargs, future = item
+
+        try:
+            headers = {"Authorization": await self._authorization()}
+            response = await self._client.request(method, path, headers=headers, **kwargs)
+            self.sent += 1
+
+            if response.status_code == 429 and attempt < self._max_retries:
+                self.throttled += 1
+                self._bucket.pause(retry_after(response.headers.get("Retry-After")))
+                self._queue.put_nowait((priority, order, attempt + 1, queued_at, method, path, kwargs, future))
+                return
+
+            latency = self._latency[priority]
+            latency[0] += 1
+            latency[1] += time.monotonic() - queued_at
+
+            if not future.done():
+                future.set_result(response)
+
+        except asyncio.CancelledError:
+            if not future.done():
+                future.set_exception(ClientClosedError("Spotify HTTP client closed"))
+            raise
+
+        except Exception as e:
+            if not future.done():
+                future.set_exception(e)
+
+        finally:
+            self._slots.release()
+
+
+    def stats(self) -> Dict[str, float]:
+
+        stats = {
+            "queued": self._queue.qsize() if self._queue else 0,
+            "sent": self.sent,
+            "throttled": self.throttled
+        }
+        for priority, (count, total) in self._latency.items():
+            stats[f"latency_{priority.name.lower()}_ms"] = 1000 * total / count if count else 0.0
+
+        return stats
@@ -1,4 +1,5 @@
 from abc import ABC, abstractmethod
+from typing import Iterable
 from pydantic import validate_call
 
 class IMusicProvider(ABC):
@@ -23,3 +24,33 @@ class IMusicProvider(ABC):
     def stop(self) -> None:
         """Silenzio immediato."""
         pass
+
+
+class IAsyncMusicProvider(ABC):
+    """Controparte asyncio di IMusicProvider."""
+
+    @abstractmethod
+    async def connect(self) -> None:
+        pass
+
+    @abstractmethod
+    async def close(self) -> None:
+        """Rilascia le connessioni HTTP."""
+        pass
+
+    @abstractmethod
+    @validate_call
+    async def play_genre(self, genre: str) -> bool:
+        pass
+
+    @abstractmethod
+    async def set_volume(self, level: int) -> None:
+        pass
+
+    @abstractmethod
+    async def stop(self) -> None:
+        pass
+
+    async def prefetch(self, genres: Iterable[str]) -> None:
+        """Prepara in anticipo i brani dei generi (default: niente)."""
+        pass
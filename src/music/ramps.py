@@ -0,0 +1,381 @@
+import asyncio
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, List, NamedTuple, Optional, Tuple
+
+from .interface import IAsyncMusicProvider
+from shared.logger import get_logger
+
+
+class Timer(object):
+    """Entry of a TimerWheel; cancel() is O(1), the slot skips it when it comes round"""
+
+    __slots__ = ("rounds", "callback", "args", "cancelled")
+
+    def __init__(self, rounds: int, callback: Callable, args: tuple):
+        self.rounds = rounds
+        self.callback = callback
+        self.args = args
+        self.cancelled = False
+
+
+    def cancel(self) -> None:
+        self.cancelled = True
+
+
+class TimerWheel(object):
+    """
+    Hashed timer wheel: slots buckets of tick seconds, one asyncio task for all the timers.
+
+    schedule() and cancel() are O(1) whatever the number of timers; a timer
+    further than one revolution waits its rounds in the slot. When the loop
+    lags the task catches up tick by tick, so timers always fire in order.
+    """
+
+    def __init__(self, tick: float = 0.05, slots: int = 256, clock: Callable[[], float] = time.monotonic):
+        self._tick = tick
+        self._slots: List[List[Timer]] = [[] for _ in range(slots)]
+        self._clock = clock
+        self._cursor = 0
+        self._started = 0.0
+        self._ticks = 0
+        self._pending = 0
+        self._task: Optional[asyncio.Task] = None
+        self._logger = get_logger("TIMER_WHEEL")
+
+
+    def __len__(self) -> int:
+        return self._pending
+
+
+    async def start(self) -> None:
+
+        if self._task is not None: return
+
+        self._started = self._clock()
+        self._ticks = 0
+        self._task = asyncio.create_task(self._run())
+
+
+    async def close(self) -> None:
+
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+
+    def schedule(self, delay: float, callback: Callable, *args) -> Timer:
+
+        # at least the next tick: a timer never fires inside schedule()
+        ticks = max(1, int(round(delay / self._tick)))
+        slots = len(self._slots)
+        timer = Timer((ticks - 1) // slots, callback, args)
+        self._slots[(self._cursor + ticks) % slots].append(timer)
+        self._pending += 1
+
+        return timer
+
+
+    async def _run(self) -> None:
+
+        while True:
+            target = self._started + (self._ticks + 1) * self._tick
+            wait = target - self._clock()
+            if wait > 0:
+                await asyncio.sleep(wait)
+
+            # catch up every elapsed tick
+            elapsed = int((self._clock() - self._started) / self._tick)
+            while self._ticks < elapsed:
+                self._ticks += 1
+                self._advance()
+
+
+    def _advance(self) -> None:
+
+        self._cursor = (self._cursor + 1) % len(self._slots)
+        slot = self._slots[self._cursor]
+        if not slot: return
+
+        waiting = []
+        for timer in slot:
+            if timer.cancelled:
+                self._pending -= 1
+            elif timer.rounds > 0:
+                timer.rounds -= 1
+                waiting.append(timer)
+            else:
+                self._pending -= 1
+                try:
+                    timer.callback(*timer.args)
+                except Exception as e:
+                    self._logger.error(f"🔴 Timer callback failed: {e}")
+        self._slots[self._cursor] = waiting
+
+
+class Command(NamedTuple):
+    """One step of a transition, at seconds from its start"""
+    at: float
+    kind: str       # "volume" | "play"
+    value: object
+
+
+class _Sequence(object):
+
+    __slots__ = ("priority", "timers", "remaining")
+
+    def __init__(self, priority: int):
+        self.priority = priority
+        self.timers: List[Timer] = []
+        self.remaining = 0
+
+
+class RampScheduler(object):
+    """
+    Volume ramps and crossfades as timed command sequences on a shared TimerWheel.
+
+    Each session has at most one sequence. A due command joins the session
+    queue, drained by one task at a time per session: while a call is in flight
+    the following volume steps collapse into the newest one, so a slow provider
+    gets fewer calls instead of a growing backlog. A play is never dropped.
+    A sequence with equal or higher priority cancels the running one; a lower
+    priority one is refused, except a crossfade: the latest refused genre waits
+    for the running sequence to end, so the session never stays on a stale track.
+    Play listeners hear the outcome of every play (session, genre, ok) once the
+    provider call returns: a scheduled play is not a played one.
+    """
+
+    def __init__(
+        self,
+        provider: IAsyncMusicProvider,
+        wheel: Optional[TimerWheel] = None,
+        step: float = 0.25,
+        default_level: int = 70
+    ):
+        self._provider = provider
+        self._wheel = wheel or TimerWheel()
+        self._step = step
+        self._default_level = default_level
+        self._logger = get_logger("RAMPS")
+
+        self._sequences: Dict[str, _Sequence] = {}
+        self._queues: Dict[str, Deque[Command]] = {}
+        self._draining: Dict[str, asyncio.Task] = {}
+        self._levels: Dict[str, int] = {}
+        # level the session rests at once its ramps are over
+        self._resting: Dict[str, int] = {}
+        # session -> (genre, duration, floor, priority) of the crossfade waiting for the running one
+        self._deferred: Dict[str, Tuple[str, float, int, int]] = {}
+        self._play_listeners: List[Callable[[str, str, bool], None]] = []
+
+        self.planned = 0
+        self.sent = 0
+        self.dropped = 0
+        self.cancelled = 0
+        self.refused = 0
+        self.deferred = 0
+        self.failed = 0
+
+
+    @property
+    def wheel(self) -> TimerWheel:
+        return self._wheel
+
+
+    async def start(self) -> None:
+        await self._wheel.start()
+
+
+    async def close(self) -> None:
+
+        await self._wheel.close()
+
+        tasks = list(self._draining.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._draining.clear()
+
+
+    def add_play_listener(self, callback: Callable[[str, str, bool], None]) -> None:
+        """callback(session_id, genre, ok) after each play command"""
+        self._play_listeners.append(callback)
+
+
+    def _played(self, session_id: str, genre: str, ok: bool) -> None:
+        for callback in self._play_listeners:
+            try:
+                callback(session_id, genre, ok)
+            except Exception as e:
+                self._logger.error(f"🔴 Play listener failed: {e}")
+
+
+    def level(self, session_id: str) -> int:
+        """Last volume sent for the session"""
+        return self._levels.get(session_id, self._default_level)
+
+
+    def active(self, session_id: str) -> bool:
+        return session_id in self._sequences
+
+
+    def plan_ramp(self, start: int, target: int, duration: float, offset: float = 0.0) -> List[Command]:
+
+        # no more steps than volume points: a small change still spans the whole duration
+        n = max(1, min(int(round(duration / self._step)), abs(target - start)))
+        commands = []
+        last = start
+
+        for i in range(1, n + 1):
+            level = int(round(start + (target - start) * i / n))
+            if level != last:
+                commands.append(Command(offset + duration * i / n, "volume", level))
+                last = level
+
+        return commands
+
+
+    def ramp(self, session_id: str, target: int, duration: float, priority: int = 0) -> bool:
+        target = max(0, min(100, target))
+        if not self.run(session_id, self.plan_ramp(self.level(session_id), target, duration), priority):
+            return False
+
+        self._resting[session_id] = target
+        return True
+
+
+    def crossfade(self, session_id: str, genre: str, duration: float, floor: int = 10, priority: int = 0) -> bool:
+        """
+        Fade out to floor, change genre, fade back in to the resting level.
+        Behind a stronger sequence it is deferred, not refused: always True
+        """
+
+        current = self._sequences.get(session_id)
+        if current is not None and priority < current.priority:
+            # the latest transition wins: it replaces any crossfade already waiting
+            self._deferred[session_id] = (genre, duration, floor, priority)
+            self.deferred += 1
+            return True
+
+        # a crossfade cancelled half way leaves the volume low: come back to where it rests
+        level = self.level(session_id)
+        resting = self._resting.setdefault(session_id, level)
+        low = min(floor, level)
+        half = duration / 2
+
+        commands = self.plan_ramp(level, low, half)
+        commands.append(Command(half, "play", genre))
+        commands.extend(self.plan_ramp(low, resting, half, offset=half))
+
+        self._deferred.pop(session_id, None)
+        return self.run(session_id, commands, priority)
+
+
+    def run(self, session_id: str, commands: List[Command], priority: int = 0) -> bool:
+        """Schedule commands for the session; False when a stronger sequence is running"""
+
+        current = self._sequences.get(session_id)
+        if current is not None:
+            if priority < current.priority:
+                self.refused += 1
+                return False
+            self.cancel(session_id)
+
+        sequence = _Sequence(priority)
+        sequence.remaining = len(commands)
+        for command in commands:
+            sequence.timers.append(self._wheel.schedule(command.at, self._due, session_id, sequence, command))
+
+        self.planned += len(commands)
+        if commands:
+            self._sequences[session_id] = sequence
+
+        return True
+
+
+    def cancel(self, session_id: str) -> None:
+        """Drop the timers and the queued steps of the session; a call in flight completes"""
+
+        sequence = self._sequences.pop(session_id, None)
+        if sequence is None: return
+
+        for timer in sequence.timers:
+            timer.cancel()
+
+        queue = self._queues.get(session_id)
+        self.cancelled += sequence.remaining + (len(queue) if queue else 0)
+        if queue:
+            queue.clear()
+
+
+    def forget(self, session_id: str) -> None:
+        self.cancel(session_id)
+        self._deferred.pop(session_id, None)
+        self._levels.pop(session_id, None)
+        self._resting.pop(session_id, None)
+
+
+    def _due(self, session_id: str, sequence: _Sequence, command: Command) -> None:
+
+        if self._sequences.get(session_id) is not sequence:
+            return
+
+        sequence.remaining -= 1
+        if sequence.remaining == 0:
+            del self._sequences[session_id]
+
+        queue = self._queues.setdefault(session_id, deque())
+        if command.kind == "volume" and queue and queue[-1].kind == "volume":
+            # a newer level makes the unsent one pointless
+            queue[-1] = command
+            self.dropped += 1
+        else:
+            queue.append(command)
+
+        if session_id not in self._draining:
+            self._draining[session_id] = asyncio.create_task(self._drain(session_id))
+
+        # the sequence is over: the crossfade waiting behind it starts now
+        if sequence.remaining == 0 and session_id in self._deferred:
+            genre, duration, floor, priority = self._deferred.pop(session_id)
+            self.crossfade(session_id, genre, duration, floor, priority)
+
+
+    async def _drain(self, session_id: str) -> None:
+
+        queue = self._queues[session_id]
+
+        try:
+            while queue:
+                command = queue.popleft()
+                try:
+                    if command.kind == "volume":
+                        await self._provider.set_volume(command.value)
+                        self._levels[session_id] = command.value
+                    else:
+                        self._played(session_id, command.value, bool(await self._provider.play_genre(command.value)))
+                    self.sent += 1
+                except Exception as e:
+                    self.failed += 1
+                    self._logger.error(f"🔴 {command.kind}({command.value}) failed for session {session_id}: {e}")
+                    if command.kind == "play":
+                        self._played(session_id, command.value, False)
+        finally:
+            del self._draining[session_id]
+            if not queue:
+                self._queues.pop(session_id, None)
+
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "active": len(self._sequences),
+            "timers": len(self._wheel),
+            "planned": self.planned,
+            "sent": self.sent,
+            "dropped": self.dropped,
+            "cancelled": self.cancelled,
+            "refused": self.refused,
+            "deferred": self.deferred,
+            "failed": self.failed
+        }
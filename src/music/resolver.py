@@ -0,0 +1,112 @@
+import asyncio
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+from cache.local import LRUTTLStore
+from shared.logger import get_logger
+
+
+# (energy, valence) bucket, None = solo genere
+Bucket = Optional[Tuple[int, int]]
+SearchFn = Callable[[str, Optional[Tuple[float, float]]], Awaitable[List[str]]]
+
+
+class TrackResolver(object):
+    """
+    Cache of playable track URIs per target_genre and per (energy, valence) bucket.
+
+    A miss calls search(genre, (energy, valence) or None) once: concurrent misses
+    of the same key share the same call. Lists live ttl seconds in an LRU of
+    max_entries keys, so a transition normally resolves without any API call;
+    prefetch() warms the genres of a session at setup time.
+    """
+
+    def __init__(self, search: SearchFn, ttl: float = 3600.0, max_entries: int = 512, bucket_size: float = 0.25):
+        self._search = search
+        self._ttl = ttl
+        self._bucket_size = bucket_size
+        self._store = LRUTTLStore(max_entries=max_entries)
+        self._inflight: Dict[Tuple[str, Bucket], asyncio.Future] = {}
+        self._logger = get_logger("TRACK_RESOLVER")
+
+        self.fetches = 0
+        self.shared_fetches = 0
+
+
+    def bucket(self, energy: Optional[float], valence: Optional[float]) -> Bucket:
+        """Quantize energy/valence (0..1) so close targets share one cached list"""
+
+        if energy is None or valence is None:
+            return None
+
+        steps = round(1 / self._bucket_size)
+        quantize = lambda value: min(steps, max(0, round(value / self._bucket_size)))
+        return quantize(energy), quantize(valence)
+
+
+    async def resolve(self, genre: str, energy: Optional[float] = None, valence: Optional[float] = None) -> List[str]:
+
+        key = (genre.lower(), self.bucket(energy, valence))
+
+        uris = self._store.get(key)
+        if uris is not None:
+            return uris
+
+        pending = self._inflight.get(key)
+        if pending is not None:
+            self.shared_fetches += 1
+            try:
+                return await asyncio.shield(pending)
+            except asyncio.CancelledError:
+                # cancellato il leader, non questo chiamante: si riparte come nuovo leader
+                if pending.cancelled() and not asyncio.current_task().cancelling():
+                    return await self.resolve(genre, energy, valence)
+                raise
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+
+        try:
+            bucket = key[1]
+            target = None if bucket is None else (bucket[0] * self._bucket_size, bucket[1] * self._bucket_size)
+            self.fetches += 1
+            uris = await self._search(genre, target)
+        except Exception as e:
+            future.set_exception(e)
+            # il chiamante riceve l'errore dal raise: segniamo l'eccezione come letta
+            future.exception()
+            raise
+        else:
+            if uris:
+                # una lista vuota non va in cache: il genere potrebbe essere solo un typo temporaneo
+                self._store.set(key, uris, self._ttl)
+            future.set_result(uris)
+            return uris
+        finally:
+            self._inflight.pop(key, None)
+            # leader cancellato: chi aspetta non deve restare appeso
+            if not future.done():
+                future.cancel()
+
+
+    async def prefetch(self, genres: Iterable[str]) -> int:
+        """Resolve every genre concurrently; return how many have tracks"""
+
+        genres = sorted({genre for genre in genres if genre})
+        results = await asyncio.gather(*(self.resolve(genre) for genre in genres), return_exceptions=True)
+
+        resolved = 0
+        for genre, result in zip(genres, results):
+            if isinstance(result, Exception):
+                self._logger.warning(f"⚠️ Prefetch of genre {genre} failed: {result}")
+            elif result:
+                resolved += 1
+
+        self._logger.debug(f"🟢 Prefetched {resolved}/{len(genres)} genres")
+        return resolved
+
+
+    def stats(self) -> Dict[str, int]:
+        stats = self._store.stats()
+        stats["fetches"] = self.fetches
+        stats["shared_fetches"] = self.shared_fetches
+        return stats
@@ -82,7 +82,7 @@ class SpotifyMusicService(IMusicProvider):
             raise
 
 
-    @retry_on_failure(max_retries=3, base_delay=1.0)
+    @retry_on_failure(max_retries=3, base_delay=1.0, breaker="spotify")
     def play_genre(self, genre) -> None:
         pass
 
@@ -0,0 +1,259 @@
+import time
+import asyncio
+from typing import Iterable, List, Optional, Tuple
+
+import httpx
+from spotipy.oauth2 import SpotifyOAuth
+
+from .interface import IAsyncMusicProvider
+from .resolver import TrackResolver
+from .devices import DeviceRegistry
+from .http import RequestPriority, SpotifyHttpClient
+
+from shared.logger import get_logger
+from shared.decorator import retry_on_failure
+from shared.config import settings
+
+
+class AsyncSpotifyMusicService(IAsyncMusicProvider):
+    """
+    Spotify Web API client on SpotifyHttpClient (pooled httpx, token bucket, priorities).
+    spotipy is only used at connect time to read the cached OAuth token;
+    token refresh and playback calls are plain awaited HTTP requests.
+    """
+
+    _instance = None
+
+    TOKEN_URL = "https://accounts.spotify.com/api/token"
+    SCOPE = "user-modify-playback-state user-read-playback-state user-read-currently-playing"
+
+    def __init__(self):
+        self._logger = get_logger("SPOTIFY")
+        self._client: Optional[SpotifyHttpClient] = None
+        self._token_lock = asyncio.Lock()
+
+        self._access_token = None
+        self._refresh_token = None
+        self._expires_at = 0.0
+
+        self._resolver = TrackResolver(
+            self.search_tracks, ttl=settings.TRACK_CACHE_TTL, max_entries=settings.TRACK_CACHE_SIZE
+        )
+        self._devices = DeviceRegistry(self.fetch_devices, interval=settings.SPOTIFY_DEVICE_REFRESH)
+
+    def __new__(cls):
+        if cls._instance:
+            return cls._instance
+
+        cls._instance = super(AsyncSpotifyMusicService, cls).__new__(cls)
+        return cls._instance
+
+
+    async def connect(self) -> None:
+
+        try:
+
+            auth_manager = SpotifyOAuth(
+                client_id=settings.SPOTIFY_ID,
+                client_secret=settings.SPOTIFY_SECRET,
+                scope=self.SCOPE,
+                cache_path=".spotify_cache",
+                open_browser=False
+            )
+
+            token_info = auth_manager.get_cached_token()
+            if not token_info:
+                raise RuntimeError("No cached Spotify token: run the OAuth flow once to create .spotify_cache")
+
+            self._set_token(token_info)
+
+            self._client = SpotifyHttpClient(
+                settings.SPOTIFY_API_URL,
+                self._authorization,
+                rate=settings.SPOTIFY_RATE,
+                burst=settings.SPOTIFY_BURST,
+                max_connections=settings.SPOTIFY_MAX_CONNECTIONS
+            )
+            await self._client.start()
+
+            # prima lettura bloccante solo qui, poi refresh in background
+            await self._devices.refresh()
+            await self._devices.start()
+            self._logger.info("🟢 Async Spotify Service Connected.")
+
+        except Exception as e:
+
+            self._logger.critical(f"🔴 Errore critico inizializzazione Spotify: {e}")
+            raise
+
+
+    async def close(self) -> None:
+
+        await self._devices.close()
+
+        if self._client is not None:
+            await self._client.close()
+            self._client = None
+
+
+    def _set_token(self, token_info: dict) -> None:
+        self._access_token = token_info["access_token"]
+        self._refresh_token = token_info.get("refresh_token", self._refresh_token)
+        self._expires_at = token_info.get("expires_at") or time.time() + token_info.get("expires_in", 3600)
+
+
+    async def _refresh_access_token(self) -> None:
+
+        async with httpx.AsyncClient(timeout=5.0) as client:
+            response = await client.post(
+                self.TOKEN_URL,
+                data={"grant_type": "refresh_token", "refresh_token": self._refresh_token},
+                auth=(settings.SPOTIFY_ID, settings.SPOTIFY_SECRET)
+            )
+            response.raise_for_status()
+
+        self._set_token(response.json())
+        self._logger.debug("🟢 Spotify access token refreshed")
+
+
+    async def _authorization(self) -> str:
+
+        # refresh one minute before expiration, once for all the requests waiting
+        async with self._token_lock:
+            if time.time() > self._expires_at - 60:
+                await self._refresh_access_token()
+
+        return f"Bearer {self._access_token}"
+
+
+    async def _request(self, method: str, path: str, priority: RequestPriority = RequestPriority.SEARCH, **kwargs) -> httpx.Response:
+
+        response = await self._client.request(method, path, priority=priority, **kwargs)
+        response.raise_for_status()
+
+        return response
+
+
+    async def fetch_devices(self) -> List[dict]:
+        response = await self._request("GET", "/me/player/devices", priority=RequestPriority.DEVICES)
+        return response.json()["devices"]
+
+
+    def _device_failed(self, device_id: Optional[str], error: Exception) -> None:
+
+        # 404 device not found / 403 restricted device / 5xx: the cached device may be gone
+        if isinstance(error, httpx.HTTPStatusError) and error.response.status_code in (403, 404, 502, 503):
+            self._devices.report_failure(device_id)
+
+
+    @property
+    def devices(self) -> DeviceRegistry:
+        return self._devices
+
+
+    @property
+    def resolver(self) -> TrackResolver:
+        return self._resolver
+
+
+    async def search_tracks(self, genre: str, target: Optional[Tuple[float, float]] = None) -> List[str]:
+        """
+        Track URIs for genre; with target = (energy, valence) the recommendations
+        endpoint picks tracks close to those audio features.
+        No retry here: it runs inside play_genre (through the resolver), whose
+        retry and "spotify" breaker cover the search too. Nested, one failure
+        would count twice and the search would be refused the half-open probe.
+        """
+
+        if target is None:
+            search = await self._request(
+                "GET", "/search", priority=RequestPriority.SEARCH, params={"q": f'genre:"{genre}"', "type": "track", "limit": 20}
+            )
+            return [track["uri"] for track in search.json()["tracks"]["items"]]
+
+        energy, valence = target
+        recommendations = await self._request(
+            "GET", "/recommendations", priority=RequestPriority.SEARCH,
+            params={"seed_genres": genre, "target_energy": energy, "target_valence": valence, "limit": 20}
+        )
+        return [track["uri"] for track in recommendations.json()["tracks"]]
+
+
+    async def prefetch(self, genres: Iterable[str]) -> None:
+        # best effort, no retry: a genre missed here is searched by play_genre
+        if self._client:
+            await self._resolver.prefetch(genres)
+
+
+    @retry_on_failure(max_retries=3, base_delay=1.0, breaker="spotify")
+    async def play_genre(self, genre: str) -> bool:
+
+        device_id = self._devices.current()
+
+        if not (self._client and device_id):
+            return False
+
+        # di solito già in cache (prefetch su /session/setup): nessuna search sul percorso della transizione
+        uris = await self._resolver.resolve(genre)
+
+        if not uris:
+            self._logger.warning(f"🟡 No track found for genre {genre}")
+            return False
+
+        try:
+            await self._request(
+                "PUT", "/me/player/play", priority=RequestPriority.PLAYBACK, params={"device_id": device_id}, json={"uris": uris}
+            )
+        except Exception as e:
+            self._device_failed(device_id, e)
+            raise
+
+        self._devices.mark_good(device_id)
+        self._logger.debug(f"🟢 Playing genre {genre} on active device {device_id}")
+
+        return True
+
+
+    async def set_volume(self, level: int) -> None:
+
+        device_id = self._devices.current()
+
+        if self._client and device_id:
+
+            try:
+
+                await self._request(
+                    "PUT", "/me/player/volume", priority=RequestPriority.VOLUME,
+                    params={"volume_percent": level, "device_id": device_id}
+                )
+                self._devices.mark_good(device_id)
+                self._logger.debug(f"🟢 Set volume to level {level} on active device {device_id}")
+
+            except Exception as e:
+
+                self._device_failed(device_id, e)
+                self._logger.error(f"🔴 Error setting volume to level {level} on active device {device_id}: {e}")
+
+
+    async def stop(self) -> None:
+
+        device_id = self._devices.current()
+
+        if self._client and device_id:
+
+            try:
+
+                await self._request("PUT", "/me/player/pause", priority=RequestPriority.PLAYBACK, params={"device_id": device_id})
+                self._devices.mark_good(device_id)
+                self._logger.debug(f"🟢 Stopped music on active device {device_id}")
+
+            except Exception as e:
+
+                self._device_failed(device_id, e)
+                self._logger.error(f"🔴 Error while stopping music on active device {device_id}: {e}")
+
+
+    def stats(self) -> dict:
+        stats = self._client.stats() if self._client else {}
+        stats.update({f"device_{k}": v for k, v in self._devices.stats().items()})
+        return stats
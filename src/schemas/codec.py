@@ -0,0 +1,189 @@
+import sys
+from abc import ABC, abstractmethod
+from array import array
+from typing import Dict, Tuple, Union
+
+import msgpack
+
+from .metrics import TelemetryPayload
+from .session import SessionConfig, SessionState, TriggerRule
+
+
+_SWAP = sys.byteorder != "little" # i float64 sono sempre salvati little-endian
+
+
+def _pack_floats(values) -> bytes:
+    packed = array("d", values)
+    if _SWAP:
+        packed.byteswap()
+    return packed.tobytes()
+
+
+def _unpack_floats(data: bytes) -> array:
+    unpacked = array("d", data)
+    if _SWAP:
+        unpacked.byteswap()
+    return unpacked
+
+
+# Ogni blob scritto dall'engine inizia con: MAGIC (2 byte) + codec id (1 byte) + schema version (1 byte)
+MAGIC = b"RE"
+SCHEMA_VERSION = 1
+HEADER_SIZE = 4
+
+
+class CodecError(ValueError):
+    """Blob illeggibile: header sconosciuto o versione di schema futura."""
+
+
+class Codec(ABC):
+    """
+    Serializzazione di TelemetryPayload / SessionState per cache e database.
+
+    trusted=True salta la validazione Pydantic (model_construct): si usa solo per
+    blob scritti dall'engine stesso con la versione di schema corrente.
+    """
+
+    codec_id: int
+    name: str
+
+    def _header(self) -> bytes:
+        return MAGIC + bytes((self.codec_id, SCHEMA_VERSION))
+
+    def encode_telemetry(self, payload: TelemetryPayload) -> bytes:
+        return self._header() + self._dump_telemetry(payload)
+
+    def encode_session(self, state: SessionState) -> bytes:
+        return self._header() + self._dump_session(state)
+
+    @abstractmethod
+    def _dump_telemetry(self, payload: TelemetryPayload) -> bytes:
+        pass
+
+    @abstractmethod
+    def _load_telemetry(self, body: bytes, trusted: bool) -> TelemetryPayload:
+        pass
+
+    @abstractmethod
+    def _dump_session(self, state: SessionState) -> bytes:
+        pass
+
+    @abstractmethod
+    def _load_session(self, body: bytes, trusted: bool) -> SessionState:
+        pass
+
+
+def _construct_session(data: dict) -> SessionState:
+    """SessionState senza validazione: model_construct non ricostruisce i modelli annidati da solo"""
+    config = dict(data["config"])
+    config["rules"] = [TriggerRule.model_construct(**rule) for rule in config.get("rules", [])]
+    state = dict(data)
+    state["config"] = SessionConfig.model_construct(**config)
+    # model_construct ignora validation_alias: stati salvati prima del rename
+    if "last_metrics" in state:
+        state.setdefault("metrics_at_transition", state.pop("last_metrics"))
+    return SessionState.model_construct(**state)
+
+
+class JsonCodec(Codec):
+    """Il formato storico (model_dump_json) con l'header davanti."""
+
+    codec_id = 1
+    name = "JSON"
+
+    def _dump_telemetry(self, payload: TelemetryPayload) -> bytes:
+        return payload.model_dump_json().encode()
+
+    def _load_telemetry(self, body: bytes, trusted: bool) -> TelemetryPayload:
+        return TelemetryPayload.model_validate_json(body)
+
+    def _dump_session(self, state: SessionState) -> bytes:
+        return state.model_dump_json().encode()
+
+    def _load_session(self, body: bytes, trusted: bool) -> SessionState:
+        return SessionState.model_validate_json(body)
+
+
+class MsgpackCodec(Codec):
+    """
+    msgpack envelope. Le metriche sono impacchettate come nomi + array di float64
+    (array('d') little-endian), decodificati in C senza passare dai singoli oggetti msgpack.
+    """
+
+    codec_id = 2
+    name = "MSGPACK"
+
+    def _dump_telemetry(self, payload: TelemetryPayload) -> bytes:
+        names = list(payload.metrics)
+        values = _pack_floats(payload.metrics.values())
+        return msgpack.packb([payload.session_id, payload.timestamp, names, values], use_bin_type=True)
+
+    def _load_telemetry(self, body: bytes, trusted: bool) -> TelemetryPayload:
+
+        session_id, timestamp, names, values = msgpack.unpackb(body, raw=False)
+        metrics = dict(zip(names, _unpack_floats(values)))
+
+        if trusted:
+            return TelemetryPayload.model_construct(session_id=session_id, timestamp=timestamp, metrics=metrics)
+
+        return TelemetryPayload(session_id=session_id, timestamp=timestamp, metrics=metrics)
+
+    def _dump_session(self, state: SessionState) -> bytes:
+        return msgpack.packb(state.model_dump(), use_bin_type=True)
+
+    def _load_session(self, body: bytes, trusted: bool) -> SessionState:
+
+        data = msgpack.unpackb(body, raw=False)
+
+        if trusted:
+            return _construct_session(data)
+
+        return SessionState.model_validate(data)
+
+
+_CODECS: Dict[int, Codec] = {codec.codec_id: codec for codec in (JsonCodec(), MsgpackCodec())}
+
+
+def get_codec(name: str) -> Codec:
+
+    for codec in _CODECS.values():
+        if codec.name == name.upper():
+            return codec
+
+    raise ValueError(f"Codec '{name}' not supported. Valid values are [{', '.join(c.name for c in _CODECS.values())}]")
+
+
+def _split(data: Union[bytes, str]) -> Tuple[Codec, bool, bytes]:
+    """
+    Return (codec, current_version, body). Blob senza header = JSON storico.
+    """
+
+    if isinstance(data, str):
+        data = data.encode()
+
+    if data[:2] != MAGIC:
+        return _CODECS[JsonCodec.codec_id], False, data
+
+    codec = _CODECS.get(data[2])
+    if codec is None:
+        raise CodecError(f"Unknown codec id {data[2]}")
+
+    version = data[3]
+    if version > SCHEMA_VERSION:
+        raise CodecError(f"Schema version {version} is newer than {SCHEMA_VERSION}")
+
+    return codec, version == SCHEMA_VERSION, data[HEADER_SIZE:]
+
+
+def decode_telemetry(data: Union[bytes, str], trusted: bool = False) -> TelemetryPayload:
+    """
+    Decodifica qualunque blob di telemetria (il codec è letto dall'header).
+    trusted vale solo se il blob ha la versione di schema corrente.
+    """
+    codec, current, body = _split(data)
+    return codec._load_telemetry(body, trusted and current)
+
+
+def decode_session(data: Union[bytes, str], trusted: bool = False) -> SessionState:
+    codec, current, body = _split(data)
+    return codec._load_session(body, trusted and current)
@@ -1,12 +1,47 @@
-from pydantic import BaseModel, Field, field_validator, StrictFloat
-from typing import Dict
+from pydantic import AllowInfNan, BaseModel, Field, PrivateAttr, Strict, field_validator, model_validator, StrictFloat
+from typing import Annotated, Dict, List, Mapping, Optional
 import time
 import math
 
+import numpy as np
+
+# numero JSON finito: niente stringhe ("12"), bool, NaN o infinito
+FiniteFloat = Annotated[float, Strict(), AllowInfNan(False)]
+
+
+def non_finite_metric(metrics: Mapping[str, float]) -> Optional[str]:
+    """
+    Nome della prima metrica NaN/infinita, None se sono tutte finite.
+    NaN e inf si propagano nella somma: una sola riduzione in C copre il caso comune,
+    il ciclo che cerca la metrica colpevole parte solo se la somma non è finita.
+    Un int JSON troppo grande per un float conta come non finito.
+    """
+    try:
+        if math.isfinite(sum(metrics.values())):
+            return None
+    except OverflowError:
+        pass
+
+    for key, value in metrics.items():
+        try:
+            if not math.isfinite(value):
+                return key
+        except OverflowError:
+            return key
+
+    # overflow della somma: valori finiti ma enormi
+    return None
+
+
 class TelemetryPayload(BaseModel):
+    """
+    Validata per intero solo al bordo (body delle API).
+    Dentro l'engine i payload costruiti da dati già validati (codec trusted, stream,
+    batch colonnare) passano da model_construct e non vengono rivalidati.
+    """
 
     session_id: str = Field(..., min_length=3, description="mandatory session ID")
-    timestamp: float = Field(default_factory=time.time)
+    timestamp: FiniteFloat = Field(default_factory=time.time)
     metrics: Dict[str, StrictFloat]
 
     @field_validator('metrics')
@@ -16,8 +51,66 @@ class TelemetryPayload(BaseModel):
             raise ValueError("Il payload delle metriche non può essere vuoto")
         
         # Impediamo valori infiniti o NaN (Not a Number) che rompono i JSON
-        for key, value in v.items():
-            if not math.isfinite(value):
-                raise ValueError(f"La metrica {key} ha un valore infinito non valido: {value}.")
+        key = non_finite_metric(v)
+        if key is not None:
+            raise ValueError(f"La metrica {key} ha un valore infinito non valido: {v[key]}.")
         
-        return v
\ No newline at end of file
+        return v
+
+
+class TelemetryBatch(BaseModel):
+    """
+    Forma colonnare di un batch di telemetria (gateway multi-tavolo):
+    una riga di values per sessione, una colonna per metrica, null = metrica non inviata.
+    Accetta e rifiuta gli stessi valori di TelemetryPayload: numeri finiti e stretti,
+    quindi nella matrice NaN può solo venire da null. I controlli di forma e le righe
+    vuote sono un solo passaggio vettoriale sulla matrice.
+    """
+
+    session_ids: List[str]
+    metric_names: List[str]
+    values: List[List[Optional[FiniteFloat]]]
+    timestamps: Optional[List[FiniteFloat]] = None
+
+    _matrix: np.ndarray = PrivateAttr()
+
+    @model_validator(mode="after")
+    def check_matrix(self):
+
+        n_sessions, n_metrics = len(self.session_ids), len(self.metric_names)
+        if not n_sessions or not n_metrics:
+            raise ValueError("Il batch deve contenere almeno una sessione e una metrica")
+
+        if any(len(session_id) < 3 for session_id in self.session_ids):
+            raise ValueError("Ogni session_id deve avere almeno 3 caratteri")
+        if len(set(self.metric_names)) != n_metrics:
+            raise ValueError("metric_names contiene nomi duplicati")
+        if self.timestamps is not None and len(self.timestamps) != n_sessions:
+            raise ValueError(f"timestamps ha {len(self.timestamps)} valori, attesi {n_sessions}")
+        if len(self.values) != n_sessions or any(len(row) != n_metrics for row in self.values):
+            raise ValueError(f"values deve essere una matrice {n_sessions} x {n_metrics}")
+
+        # None -> NaN: metrica assente (NaN e inf sono già rifiutati da FiniteFloat)
+        matrix = np.array(self.values, dtype=np.float64)
+
+        present = ~np.isnan(matrix)
+        empty = np.flatnonzero(~present.any(axis=1))
+        if len(empty):
+            raise ValueError(f"Il payload delle metriche della sessione {self.session_ids[empty[0]]} è vuoto")
+
+        self._matrix = matrix
+        return self
+
+    def to_payloads(self) -> List[TelemetryPayload]:
+        """Un TelemetryPayload per riga, già validato: nessun secondo passaggio Pydantic"""
+
+        now = time.time()
+        timestamps = self.timestamps or [now] * len(self.session_ids)
+        names = self.metric_names
+
+        payloads = []
+        for session_id, timestamp, row in zip(self.session_ids, timestamps, self._matrix.tolist()):
+            metrics = {name: value for name, value in zip(names, row) if value == value} # NaN != NaN
+            payloads.append(TelemetryPayload.model_construct(session_id=session_id, timestamp=timestamp, metrics=metrics))
+
+        return payloads
@@ -1,4 +1,4 @@
-from pydantic import BaseModel, Field, validator
+from pydantic import AliasChoices, BaseModel, Field, validator
 from typing import List, Literal, Optional, Dict
 from enum import Enum
 
@@ -19,6 +19,9 @@ class TriggerRule(BaseModel):
     target_genre: str      # Es: "metal" (se HP bassi), "dark-ambient" (se Sanity bassa)
     priority: int = 1      # Se scattano più regole, vince quella con priorità più alta!
 
+    hysteresis: float = Field(default=0.0, ge=0) # Banda oltre la soglia da superare prima di rilasciare la regola
+    min_dwell: float = Field(default=0.0, ge=0)  # Secondi minimi di permanenza prima di cedere a una regola più debole
+
     class Config:
         use_enum_values = True
 
@@ -32,11 +35,14 @@ class SessionConfig(BaseModel):
     # Qui risiede la potenza: una lista di N regole
     rules: List[TriggerRule] = []
 
+    # impronta delle regole, calcolata una volta dall'engine al setup (le regole compilate la usano come chiave)
+    rules_version: Optional[str] = None
+
     def get_highest_priority_rule(self, triggered_rules: List[TriggerRule]):
         """Helper per decidere chi vince in caso di conflitto"""
         if not triggered_rules: return None
-        # Ordina per priorità decrescente
-        return sorted(triggered_rules, key=lambda x: x.priority, reverse=True)[0]
+        # max() tiene la prima regola a parità di priorità, come il vecchio sort stabile
+        return max(triggered_rules, key=lambda x: x.priority)
 
 class SessionState(BaseModel):
     """
@@ -44,6 +50,12 @@ class SessionState(BaseModel):
     Unisce la Configurazione (Regole) con gli ultimi Dati (Metrics).
     """
     config: SessionConfig
-    last_metrics: Optional[Dict[str, float]] = None
+    # metriche che hanno causato l'ultima transizione (non aggiornate a ogni telemetria);
+    # gli stati salvati prima del rename le hanno ancora in last_metrics
+    metrics_at_transition: Optional[Dict[str, float]] = Field(
+        default=None, validation_alias=AliasChoices("metrics_at_transition", "last_metrics")
+    )
     current_status: Literal["NOMINAL", "CRITICAL"] = "NOMINAL"
     active_rule_metric: Optional[str] = None # Quale regola sta suonando ora?
+    active_rule_index: Optional[int] = None  # Indice della regola attiva in config.rules
+    active_since: Optional[float] = None     # Timestamp dell'ultima transizione
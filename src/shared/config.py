@@ -14,6 +14,61 @@ class Settings(BaseSettings):
     REDIS_HOST: str
     REDIS_PORT: int
 
+    WRITE_BEHIND: bool = True
+    WRITE_BEHIND_INTERVAL: float = 1.0 # seconds between two flushes
+    WRITE_BEHIND_BATCH_SIZE: int = 200 # pending sessions that trigger an early flush
+    WRITE_BEHIND_MAX_PENDING: int = 10000
+    WRITE_BEHIND_MAX_ATTEMPTS: int = 5 # failed flushes before a payload that fails alone is dropped
+
+    HISTORY: bool = True
+    HISTORY_RAW_POINTS: int = 3600     # raw points kept per session (1 hour at 1 Hz)
+    HISTORY_ROLLUP_INTERVAL: float = 60.0 # seconds per min/max/mean bucket
+    HISTORY_ROLLUPS: int = 1440        # buckets kept per session (24 hours of 1 minute)
+    HISTORY_MAX_SESSIONS: int = 1000
+    HISTORY_MAX_METRICS: int = 64      # distinct metrics recorded per session, the others are dropped
+
+    DISK_LOG_DIR: str = "data/telemetry"
+    DISK_LOG_MAX_RECORDS: int = 86400 # per session, then compacted to the latest half
+    DISK_LOG_FLUSH_EVERY: int = 100   # writes between two msync
+    DISK_LOG_MAX_OPEN: int = 256      # segments kept mapped (fd + mmap), least recently written closed first
+
+    FIRESTORE_FLUSH_INTERVAL: float = 1.0 # seconds, updates to the same document collapse within it
+
+    SQLITE_PATH: str = "data/resonance.db"
+
+    CACHE_CODEC: str = "MSGPACK" # JSON | MSGPACK
+    REDIS_HASH_DIFF_TTL: float = 30.0 # seconds, REDIS_HASH: after that a full write resyncs the hash
+
+    L1_CACHE: bool = True
+    L1_MAX_ENTRIES: int = 10000
+    L1_SESSION_TTL: float = 60.0  # seconds, cross-worker changes arrive through pub/sub
+    L1_TELEMETRY_TTL: float = 1.0 # seconds, telemetry is not broadcast
+    L1_INVALIDATION_CHANNEL: str = "resonance:invalidate"
+
+    SHARED_TABLE: bool = False # multi-worker mode: live session state in shared memory
+    SHARED_TABLE_NAME: str = "resonance_sessions"
+    SHARED_TABLE_SLOTS: int = 16384
+    SHARED_TABLE_METRICS: int = 16 # max metrics per session kept in the table
+
+    MUSIC_DEBOUNCE: float = 0.5 # seconds, genre changes of a session within it collapse
+    MUSIC_WORKERS: int = 4      # concurrent provider calls
+    MUSIC_CROSSFADE: float = 0.0 # seconds of fade out/in around a genre change, 0 plays directly
+    MUSIC_MAX_SESSIONS: int = 10000 # sessions whose last played genre is remembered (LRU)
+    MUSIC_RAMP_STEP: float = 0.25 # seconds between two volume steps of a ramp
+    MUSIC_RAMP_TICK: float = 0.05 # timer wheel resolution
+
+    EVENTS_QUEUE_SIZE: int = 64     # state events buffered per subscriber, the oldest are dropped
+    EVENTS_KEEPALIVE: float = 15.0  # seconds of silence before a keep-alive on the event stream
+
+    SPOTIFY_API_URL: str = "https://api.spotify.com/v1"
+    SPOTIFY_RATE: float = 10.0      # requests per second (token bucket)
+    SPOTIFY_BURST: float = 20.0
+    SPOTIFY_MAX_CONNECTIONS: int = 10 # keep-alive pool and max concurrent requests
+    SPOTIFY_DEVICE_REFRESH: float = 30.0 # seconds between background device list refreshes
+
+    TRACK_CACHE_TTL: float = 3600.0 # seconds a genre -> tracks list stays valid
+    TRACK_CACHE_SIZE: int = 512
+
     REDIS_COLLECTION = "sessions/{0}/{1}"
     FIRESTORE_COLLECTION = "sessions/{0}"
 
@@ -1,53 +1,265 @@
 import time
 import random
+import asyncio
 import functools
-from typing import Type, Tuple, Union
+import threading
+from typing import Dict, Optional, Type, Tuple, Union
 from .logger import get_logger
 
 # Logger specifico per il sistema di resilienza
 logger = get_logger("RESILIENCE")
 
+
+class CircuitOpenError(Exception):
+    """La dipendenza è considerata giù: la chiamata fallisce subito senza tentativi."""
+
+
+class CircuitBreaker(object):
+    """
+    Circuit breaker condiviso da tutte le chiamate verso una dipendenza (Redis, Firestore, Spotify).
+
+    CLOSED: le chiamate passano, failure_threshold errori consecutivi aprono il circuito.
+    OPEN: le chiamate falliscono subito per reset_timeout secondi.
+    HALF_OPEN: passa una sola chiamata di prova, se va bene il circuito si richiude.
+
+    Tiene anche un retry budget: ogni chiamata deposita retry_ratio token, ogni retry
+    ne consuma uno, così durante un degrado i retry non moltiplicano il carico.
+    """
+
+    CLOSED = "CLOSED"
+    OPEN = "OPEN"
+    HALF_OPEN = "HALF_OPEN"
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+        retry_ratio: float = 0.2,
+        max_retry_tokens: float = 20.0
+    ):
+        self.name = name
+        self._failure_threshold = failure_threshold
+        self._reset_timeout = reset_timeout
+        self._retry_ratio = retry_ratio
+        self._max_retry_tokens = max_retry_tokens
+
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._retry_tokens = max_retry_tokens
+
+        self.rejected = 0
+        self.budget_exhausted = 0
+
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state()
+
+
+    def _current_state(self) -> str:
+        if self._state == self.OPEN and time.monotonic() - self._opened_at >= self._reset_timeout:
+            self._state = self.HALF_OPEN
+            self._probe_in_flight = False
+        return self._state
+
+
+    def allow(self) -> bool:
+        """True se la chiamata può partire"""
+        with self._lock:
+            state = self._current_state()
+
+            if state == self.CLOSED:
+                self._retry_tokens = min(self._max_retry_tokens, self._retry_tokens + self._retry_ratio)
+                return True
+
+            if state == self.HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+
+            self.rejected += 1
+            return False
+
+
+    def try_retry(self) -> bool:
+        """Preleva un token dal retry budget, False se il budget è esaurito"""
+        with self._lock:
+            if self._retry_tokens >= 1.0:
+                self._retry_tokens -= 1.0
+                return True
+            self.budget_exhausted += 1
+            return False
+
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self._state != self.CLOSED:
+                logger.info(f"🟢 CIRCUIT {self.name} | CLOSED")
+            self._state = self.CLOSED
+            self._failures = 0
+            self._probe_in_flight = False
+
+
+    def release(self) -> None:
+        """
+        La chiamata è finita senza esito (cancellata o errore non gestito dal retry):
+        libera la prova di HALF_OPEN, altrimenti il circuito resterebbe bloccato
+        """
+        with self._lock:
+            self._probe_in_flight = False
+
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._state == self.HALF_OPEN or self._failures >= self._failure_threshold:
+                if self._state != self.OPEN:
+                    logger.error(f"🔴 CIRCUIT {self.name} | OPEN per {self._reset_timeout}s dopo {self._failures} errori")
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+                self._probe_in_flight = False
+
+
+    def stats(self) -> Dict[str, Union[str, float]]:
+        with self._lock:
+            return {
+                "state": self._current_state(),
+                "consecutive_failures": self._failures,
+                "retry_tokens": round(self._retry_tokens, 2),
+                "rejected": self.rejected,
+                "budget_exhausted": self.budget_exhausted
+            }
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(name: str) -> CircuitBreaker:
+    """Circuit breaker condiviso per la dipendenza name (creato al primo uso)"""
+    with _breakers_lock:
+        breaker = _breakers.get(name)
+        if breaker is None:
+            breaker = _breakers[name] = CircuitBreaker(name)
+        return breaker
+
+
+def breakers() -> Dict[str, CircuitBreaker]:
+    return dict(_breakers)
+
+
 def retry_on_failure(
-    max_retries: int = 5, 
-    base_delay: float = 1.0, 
+    max_retries: int = 5,
+    base_delay: float = 1.0,
     max_delay: float = 30.0,
-    exceptions: Union[Type[Exception], Tuple[Type[Exception], ...]] = Exception
+    exceptions: Union[Type[Exception], Tuple[Type[Exception], ...]] = Exception,
+    breaker: Optional[str] = None
 ):
     """
+    Funziona sia su funzioni normali (time.sleep) sia su coroutine (await asyncio.sleep,
+    l'event loop non si blocca mai).
+
     :param max_retries: Numero massimo di tentativi prima di arrendersi.
     :param base_delay: Attesa iniziale (secondi).
     :param max_delay: Tetto massimo di attesa (cap).
     :param exceptions: Quali errori fanno scattare il retry (default: tutti).
+    :param breaker: Nome della dipendenza (es. "redis"): condivide circuit breaker e retry budget.
     """
     def decorator(func):
+
+        def next_delay(attempt, current_delay, e):
+            """Registra il fallimento e ritorna l'attesa prima del prossimo tentativo"""
+
+            if circuit:
+                circuit.record_failure()
+
+            if attempt >= max_retries:
+                logger.critical(f"🔴 FAILURE | {func.__name__} fallita dopo {max_retries} tentativi. Err: {e}")
+                raise e # Rilancia l'errore al chiamante finale
+
+            if circuit and circuit.state == CircuitBreaker.OPEN:
+                # inutile aspettare: il circuito si è appena aperto
+                raise e
+
+            if circuit and not circuit.try_retry():
+                logger.error(f"🔴 RETRY BUDGET | {func.__name__} | budget di {circuit.name} esaurito. Err: {e}")
+                raise e
+
+            # Calcolo Jitter (Variazione casuale +/- 10%)
+            jitter = random.uniform(0.9, 1.1)
+            sleep_time = min(current_delay * jitter, max_delay)
+
+            logger.warning(
+                f"🟡 RETRY {attempt}/{max_retries} | {func.__name__} | "
+                f"Errore: {e}. Attendo {sleep_time:.2f}s..."
+            )
+
+            return sleep_time
+
+        def check_circuit():
+            if circuit and not circuit.allow():
+                raise CircuitOpenError(f"Circuit {circuit.name} open: {func.__name__} skipped")
+
+        circuit = get_breaker(breaker) if breaker else None
+
+        if asyncio.iscoroutinefunction(func):
+
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                attempt = 0
+                current_delay = base_delay
+
+                while attempt < max_retries:
+                    check_circuit()
+                    try:
+                        result = await func(*args, **kwargs)
+                    except exceptions as e:
+                        attempt += 1
+                        await asyncio.sleep(next_delay(attempt, current_delay, e))
+
+                        # Incremento esponenziale del ritardo per il prossimo giro
+                        current_delay *= 2
+                        continue
+                    except BaseException:
+                        # cancellazione o errore fuori da exceptions
+                        if circuit:
+                            circuit.release()
+                        raise
+
+                    if circuit:
+                        circuit.record_success()
+                    return result
+                return None
+            return async_wrapper
+
         @functools.wraps(func)
         def wrapper(*args, **kwargs):
             attempt = 0
             current_delay = base_delay
 
             while attempt < max_retries:
+                check_circuit()
                 try:
-                    return func(*args, **kwargs)
+                    result = func(*args, **kwargs)
                 except exceptions as e:
                     attempt += 1
-                    
-                    if attempt >= max_retries:
-                        logger.critical(f"🔴 FAILURE | {func.__name__} fallita dopo {max_retries} tentativi. Err: {e}")
-                        raise e # Rilancia l'errore al chiamante finale
-                    
-                    # Calcolo Jitter (Variazione casuale +/- 10%)
-                    jitter = random.uniform(0.9, 1.1)
-                    sleep_time = min(current_delay * jitter, max_delay)
-                    
-                    logger.warning(
-                        f"🟡 RETRY {attempt}/{max_retries} | {func.__name__} | "
-                        f"Errore: {e}. Attendo {sleep_time:.2f}s..."
-                    )
-                    
-                    time.sleep(sleep_time)
-                    
+                    time.sleep(next_delay(attempt, current_delay, e))
+
                     # Incremento esponenziale del ritardo per il prossimo giro
-                    current_delay *= 2 
+                    current_delay *= 2
+                    continue
+                except BaseException:
+                    if circuit:
+                        circuit.release()
+                    raise
+
+                if circuit:
+                    circuit.record_success()
+                return result
             return None
         return wrapper
-    return decorator
\ No newline at end of file
+    return decorator
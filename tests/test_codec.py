@@ -0,0 +1,81 @@
+import msgpack
+import pytest
+from pydantic import ValidationError
+
+from schemas.codec import (
+    CodecError, MAGIC, SCHEMA_VERSION, get_codec, decode_session, decode_telemetry
+)
+from schemas.metrics import TelemetryPayload
+from schemas.session import SessionConfig, SessionState, TriggerRule
+
+
+def make_state():
+    rules = [TriggerRule(metric_name="hp", operator="lt", threshold=10, target_genre="funeral", priority=3)]
+    config = SessionConfig(session_id="table_1", default_genre="tavern", rules=rules)
+    return SessionState(config=config, metrics_at_transition={"hp": 5.0}, current_status="CRITICAL", active_rule_index=0)
+
+
+class TestCodecs:
+
+    @pytest.mark.parametrize("name", ["JSON", "MSGPACK"])
+    @pytest.mark.parametrize("trusted", [True, False])
+    def test_round_trip(self, name, trusted):
+
+        codec = get_codec(name)
+        payload = TelemetryPayload(session_id="table_1", timestamp=12.5, metrics={"hp": 85.0, "sanity": -0.25})
+        state = make_state()
+
+        assert decode_telemetry(codec.encode_telemetry(payload), trusted=trusted) == payload
+
+        restored = decode_session(codec.encode_session(state), trusted=trusted)
+        assert restored.model_dump() == state.model_dump()
+        assert restored.config.rules[0].target_genre == "funeral"
+
+    @pytest.mark.parametrize("trusted", [True, False])
+    def test_states_stored_with_last_metrics(self, trusted):
+
+        codec = get_codec("MSGPACK")
+        blob = codec.encode_session(make_state())
+        data = msgpack.unpackb(blob[4:], raw=False)
+        data["last_metrics"] = data.pop("metrics_at_transition")
+        legacy = blob[:4] + msgpack.packb(data, use_bin_type=True)
+
+        assert decode_session(legacy, trusted=trusted).metrics_at_transition == {"hp": 5.0}
+        assert SessionState.model_validate_json(
+            make_state().model_dump_json().replace("metrics_at_transition", "last_metrics")
+        ).metrics_at_transition == {"hp": 5.0}
+
+    def test_header(self):
+
+        blob = get_codec("MSGPACK").encode_telemetry(TelemetryPayload(session_id="abc", metrics={"hp": 1.0}))
+
+        assert blob[:2] == MAGIC
+        assert blob[3] == SCHEMA_VERSION
+
+    def test_msgpack_is_smaller_than_json(self):
+
+        payload = TelemetryPayload(session_id="table_1", metrics={f"metric_{i}": i * 1.5 for i in range(30)})
+
+        assert len(get_codec("MSGPACK").encode_telemetry(payload)) < len(get_codec("JSON").encode_telemetry(payload))
+
+    def test_legacy_json_without_header(self):
+
+        payload = TelemetryPayload(session_id="table_1", metrics={"hp": 1.0})
+
+        assert decode_telemetry(payload.model_dump_json()) == payload
+
+    def test_future_schema_version_is_rejected(self):
+
+        blob = bytearray(get_codec("MSGPACK").encode_telemetry(TelemetryPayload(session_id="abc", metrics={"hp": 1.0})))
+        blob[3] = SCHEMA_VERSION + 1
+
+        with pytest.raises(CodecError):
+            decode_telemetry(bytes(blob))
+
+    def test_untrusted_path_validates(self):
+
+        payload = TelemetryPayload.model_construct(session_id="abc", timestamp=1.0, metrics={"hp": float("inf")})
+        blob = get_codec("MSGPACK").encode_telemetry(payload)
+
+        with pytest.raises(ValidationError):
+            decode_telemetry(blob, trusted=False)
@@ -0,0 +1,158 @@
+import asyncio
+import importlib
+
+import pytest
+
+from shared import logger
+
+
+@pytest.fixture
+def decorator(tmp_path, monkeypatch):
+    # the module creates its logger at import time
+    monkeypatch.setattr(logger._Logger, "_folder", str(tmp_path))
+    module = importlib.import_module("shared.decorator")
+    monkeypatch.setattr(module, "_breakers", {})
+    return module
+
+
+class Clock:
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr("time.monotonic", clock)
+    return clock
+
+
+class TestCircuitBreaker:
+
+    def test_opens_half_opens_and_closes(self, decorator, clock):
+
+        breaker = decorator.CircuitBreaker("redis", failure_threshold=2, reset_timeout=10)
+
+        breaker.record_failure()
+        assert breaker.state == "CLOSED"
+        breaker.record_failure()
+        assert breaker.state == "OPEN"
+        assert not breaker.allow()
+
+        clock.now += 10
+        assert breaker.state == "HALF_OPEN"
+        # a single probe at a time
+        assert breaker.allow()
+        assert not breaker.allow()
+
+        breaker.record_success()
+        assert breaker.state == "CLOSED"
+        assert breaker.allow()
+
+
+    def test_failed_probe_reopens(self, decorator, clock):
+
+        breaker = decorator.CircuitBreaker("redis", failure_threshold=1, reset_timeout=5)
+        breaker.record_failure()
+        clock.now += 5
+
+        assert breaker.allow()
+        breaker.record_failure()
+        assert breaker.state == "OPEN"
+
+
+    def test_retry_budget(self, decorator):
+
+        breaker = decorator.CircuitBreaker("redis", retry_ratio=0.5, max_retry_tokens=2)
+
+        assert breaker.try_retry() and breaker.try_retry()
+        assert not breaker.try_retry()
+        assert breaker.stats()["budget_exhausted"] == 1
+
+        # every allowed call refills retry_ratio tokens
+        breaker.allow(), breaker.allow()
+        assert breaker.try_retry()
+        assert not breaker.try_retry()
+
+
+class TestRetryOnFailure:
+
+    def test_async_retries_then_succeeds(self, decorator):
+
+        calls = []
+
+        @decorator.retry_on_failure(max_retries=3, base_delay=0.001, exceptions=ConnectionError, breaker="db")
+        async def flaky():
+            calls.append(1)
+            if len(calls) < 3:
+                raise ConnectionError("down")
+            return "ok"
+
+        assert asyncio.run(flaky()) == "ok"
+        assert len(calls) == 3
+        assert decorator.get_breaker("db").state == "CLOSED"
+
+
+    def test_async_gives_up_after_max_retries(self, decorator):
+
+        @decorator.retry_on_failure(max_retries=2, base_delay=0.001, exceptions=ConnectionError)
+        async def broken():
+            raise ConnectionError("down")
+
+        with pytest.raises(ConnectionError):
+            asyncio.run(broken())
+
+
+    def test_open_circuit_skips_the_call(self, decorator):
+
+        decorator.get_breaker("spotify")._failure_threshold = 1
+
+        @decorator.retry_on_failure(max_retries=3, base_delay=0.001, breaker="spotify")
+        async def broken():
+            raise ConnectionError("down")
+
+        with pytest.raises(ConnectionError):
+            asyncio.run(broken())
+        with pytest.raises(decorator.CircuitOpenError):
+            asyncio.run(broken())
+
+
+    def test_cancelled_probe_releases_half_open(self, decorator, clock):
+
+        breaker = decorator.get_breaker("spotify")
+        breaker._reset_timeout = 5
+        breaker._state, breaker._opened_at = "OPEN", clock.now
+        clock.now += 5
+
+        @decorator.retry_on_failure(max_retries=3, base_delay=0.001, breaker="spotify")
+        async def slow():
+            await asyncio.sleep(10)
+
+        async def scenario():
+            task = asyncio.create_task(slow())
+            await asyncio.sleep(0)
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+        asyncio.run(scenario())
+
+        assert breaker.state == "HALF_OPEN"
+        assert breaker.allow()
+
+
+    def test_unhandled_error_releases_probe(self, decorator, clock):
+
+        breaker = decorator.get_breaker("redis")
+        breaker._state, breaker._opened_at = "OPEN", clock.now - breaker._reset_timeout
+
+        @decorator.retry_on_failure(max_retries=3, base_delay=0.001, exceptions=ConnectionError, breaker="redis")
+        def bug():
+            raise KeyError("not a connection problem")
+
+        with pytest.raises(KeyError):
+            bug()
+        assert breaker.allow()
@@ -0,0 +1,130 @@
+import asyncio
+
+import httpx
+import pytest
+
+from shared import logger
+from music.devices import DeviceRegistry
+from music.http import RequestPriority, SpotifyHttpClient
+from benchmarks.fake_spotify import create_app
+
+
+@pytest.fixture(autouse=True)
+def log_folder(tmp_path, monkeypatch):
+    monkeypatch.setattr(logger._Logger, "_folder", str(tmp_path))
+
+
+class FakeDevices:
+
+    def __init__(self, devices):
+        self.devices = devices
+        self.calls = 0
+        self.fail = False
+
+    async def __call__(self):
+        self.calls += 1
+        if self.fail:
+            raise ConnectionError("devices")
+        return [dict(d) for d in self.devices]
+
+
+def device(id, active=False):
+    return {"id": id, "name": id, "is_active": active}
+
+
+class TestDeviceRegistry:
+
+    def test_prefers_active_then_last_good(self):
+
+        fetch = FakeDevices([device("pc"), device("phone", active=True)])
+        registry = DeviceRegistry(fetch)
+
+        async def scenario():
+            assert await registry.refresh() == "phone"
+            registry.mark_good("phone")
+
+            # nothing active: stay on the device that last worked
+            fetch.devices = [device("pc"), device("phone")]
+            assert await registry.refresh() == "phone"
+
+            # last good gone: first listed
+            fetch.devices = [device("pc")]
+            assert await registry.refresh() == "pc"
+
+            # empty list: keep the last good id instead of going silent
+            fetch.devices = []
+            assert await registry.refresh() == "phone"
+
+        asyncio.run(scenario())
+
+
+    def test_failure_triggers_background_refresh(self):
+
+        fetch = FakeDevices([device("pc", active=True)])
+        registry = DeviceRegistry(fetch, interval=60.0, min_interval=0.0)
+
+        async def scenario():
+            await registry.refresh()
+            await registry.start()
+
+            fetch.devices = [device("phone", active=True)]
+            registry.report_failure("pc")
+            # current() never waits for the lookup
+            assert registry.current() == "pc"
+
+            for _ in range(50):
+                await asyncio.sleep(0.01)
+                if registry.current() == "phone":
+                    break
+            await registry.close()
+
+        asyncio.run(scenario())
+
+        assert registry.current() == "phone"
+        assert fetch.calls == 2
+
+
+    def test_failed_refresh_keeps_cached_device(self):
+
+        fetch = FakeDevices([device("pc", active=True)])
+        registry = DeviceRegistry(fetch, interval=0.01, min_interval=0.0)
+
+        async def scenario():
+            await registry.refresh()
+            fetch.fail = True
+            await registry.start()
+            await asyncio.sleep(0.05)
+            await registry.close()
+
+        asyncio.run(scenario())
+
+        assert registry.current() == "pc"
+        assert registry.stats()["refresh_errors"] > 0
+
+
+    def test_refresh_from_spotify_api(self):
+
+        app = create_app()
+
+        async def authorization():
+            return "Bearer test"
+
+        async def scenario():
+            client = SpotifyHttpClient("http://spotify/v1", authorization, transport=httpx.ASGITransport(app=app))
+            await client.start()
+
+            async def fetch():
+                response = await client.request("GET", "/me/player/devices", priority=RequestPriority.DEVICES)
+                return response.json()["devices"]
+
+            registry = DeviceRegistry(fetch)
+            first = await registry.refresh()
+
+            app.state.devices[0]["is_active"] = False
+            app.state.devices[1]["is_active"] = True
+            second = await registry.refresh()
+
+            await client.close()
+            return first, second
+
+        assert asyncio.run(scenario()) == ("device_pc", "device_phone")
@@ -0,0 +1,114 @@
+import importlib
+import os
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+from shared import logger
+from schemas.metrics import TelemetryPayload
+from schemas.session import SessionConfig, SessionState
+
+
+@pytest.fixture
+def service(tmp_path, monkeypatch):
+    monkeypatch.setattr(logger._Logger, "_folder", str(tmp_path))
+
+    # only the settings the service reads, no .env needed
+    settings = SimpleNamespace(
+        DISK_LOG_DIR=str(tmp_path / "telemetry"),
+        DISK_LOG_MAX_RECORDS=8,
+        DISK_LOG_FLUSH_EVERY=1,
+        DISK_LOG_MAX_OPEN=2,
+        CACHE_CODEC="JSON"
+    )
+    monkeypatch.setitem(sys.modules, "shared.config", SimpleNamespace(settings=settings))
+    monkeypatch.delitem(sys.modules, "database.disk_log", raising=False)
+    disk_log = importlib.import_module("database.disk_log")
+
+    def restart():
+        # a new process: no singleton, everything comes back from the directory
+        monkeypatch.setattr(disk_log.DiskLogService, "_instance", None)
+        service = disk_log.DiskLogService()
+        service.connect()
+        return service
+
+    return restart
+
+
+class TestDiskLogService:
+
+    def test_replay_after_restart(self, service):
+
+        first = service()
+        for t in range(6):
+            first.set_telemetry(TelemetryPayload(session_id="table_1", timestamp=float(t), metrics={"hp": float(t)}))
+        # new metric: the segment is rewritten with the wider schema
+        first.set_telemetry(TelemetryPayload(session_id="table_1", timestamp=6.0, metrics={"hp": 6.0, "fear": 1.0}))
+        first.set_session(SessionState(config=SessionConfig(session_id="table_1", default_genre="calm"), current_status="CRITICAL"))
+        first.close()
+
+        second = service()
+
+        assert second.get_telemetry("table_1").metrics == {"hp": 6.0, "fear": 1.0}
+        assert second.get_session("table_1").current_status == "CRITICAL"
+        assert second.get_records("table_1")["timestamp"].tolist() == [float(t) for t in range(7)]
+        second.close()
+
+
+    def test_replay_after_compaction(self, service):
+
+        first = service()
+        for t in range(8):
+            first.set_telemetry(TelemetryPayload(session_id="table_1", timestamp=float(t), metrics={"hp": float(t)}))
+        assert first.stats()["compactions"] == 1
+        first.close()
+
+        second = service()
+
+        # compacted to the latest half of DISK_LOG_MAX_RECORDS
+        assert second.get_records("table_1")["timestamp"].tolist() == [4.0, 5.0, 6.0, 7.0]
+        assert second.get_telemetry("table_1").timestamp == 7.0
+        second.close()
+
+
+    def test_open_segments_are_bounded(self, service, monkeypatch):
+
+        from database.segment import TelemetrySegment
+
+        first = service()
+        flushed = []
+        flush = TelemetrySegment.flush
+        monkeypatch.setattr(TelemetrySegment, "flush", lambda self: flushed.append(self.path) or flush(self))
+
+        for t in range(3):
+            for i in range(3):
+                first.set_telemetry(TelemetryPayload(session_id=f"table_{i}", timestamp=float(t), metrics={"hp": float(t)}))
+
+        stats = first.stats()
+        assert (stats["segments"], stats["open_segments"], stats["segment_evictions"]) == (3, 2, 7)
+        # FLUSH_EVERY=1: each msync covers only the segment just written, not every open one
+        assert len(flushed) == stats["log_writes"] == 9
+
+        # a closed segment is reopened from disk
+        assert first.get_records("table_0")["timestamp"].tolist() == [0.0, 1.0, 2.0]
+        first.close()
+
+        second = service()
+        assert second.stats()["open_segments"] == 0
+        assert second.get_telemetry("table_2").timestamp == 2.0
+        second.close()
+
+
+    def test_state_is_synced_before_the_replace(self, service, monkeypatch):
+
+        first = service()
+        synced = []
+        fsync = os.fsync
+        monkeypatch.setattr(os, "fsync", lambda fd: synced.append(fd) or fsync(fd))
+
+        first.set_session(SessionState(config=SessionConfig(session_id="table_1", default_genre="calm")))
+
+        # the temp file, then the directory
+        assert len(synced) == 2
+        first.close()
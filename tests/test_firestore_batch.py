@@ -0,0 +1,123 @@
+import pytest
+
+from database.firestore_batch import FirestoreBatchWriter
+
+
+class FakeDocument:
+
+    def __init__(self, path):
+        self.path = path
+
+
+class FakeBatch:
+
+    def __init__(self, store, fail):
+        self._store = store
+        self._fail = fail
+        self._ops = []
+
+    def set(self, ref, fields, merge=False):
+        self._ops.append((ref.path, fields, merge))
+
+    def commit(self):
+        assert len(self._ops) <= 500
+        if self._fail:
+            raise ConnectionError("unavailable")
+        for path, fields, merge in self._ops:
+            base = self._store.get(path, {}) if merge else {}
+            self._store[path] = {**base, **fields}
+
+
+class FakeFirestore:
+    """In-process stand-in for firestore.Client: batch() + document(path)"""
+
+    def __init__(self):
+        self.documents = {}
+        self.commits = []
+        self.fail = False
+
+    def document(self, path):
+        return FakeDocument(path)
+
+    def batch(self):
+        batch = FakeBatch(self.documents, self.fail)
+        self.commits.append(batch)
+        return batch
+
+
+class TestFirestoreBatchWriter:
+
+    def test_coalesces_per_document(self):
+
+        client = FakeFirestore()
+        writer = FirestoreBatchWriter(client)
+
+        for hp in range(10):
+            writer.update("sessions/table_1", {"telemetry": {"hp": hp}})
+        writer.update("sessions/table_1", {"state": {"current_status": "CRITICAL"}})
+
+        assert writer.get("sessions/table_1")["telemetry"] == {"hp": 9}
+        assert writer.flush() == 1
+        assert len(client.commits) == 1
+        assert client.documents["sessions/table_1"] == {
+            "telemetry": {"hp": 9}, "state": {"current_status": "CRITICAL"}
+        }
+        assert writer.stats()["coalesced_updates"] == 10
+
+    def test_batches_of_max_ops(self):
+
+        client = FakeFirestore()
+        writer = FirestoreBatchWriter(client)
+
+        for i in range(1201):
+            writer.update(f"sessions/table_{i}", {"telemetry": {"hp": 1.0}})
+
+        assert writer.flush() == 1201
+        assert [len(batch._ops) for batch in client.commits] == [500, 500, 201]
+        assert len(writer) == 0
+
+    def test_failed_commit_is_restored(self):
+
+        client = FakeFirestore()
+        writer = FirestoreBatchWriter(client, max_ops=2)
+
+        writer.update("sessions/a", {"telemetry": {"hp": 1}})
+        writer.update("sessions/b", {"telemetry": {"hp": 1}})
+        writer.update("sessions/c", {"telemetry": {"hp": 1}})
+
+        client.fail = True
+        with pytest.raises(ConnectionError):
+            writer.flush()
+        assert len(writer) == 3
+
+        # a newer update is not overwritten by the restored one
+        writer.update("sessions/a", {"telemetry": {"hp": 2}})
+        client.fail = False
+        assert writer.flush() == 3
+        assert client.documents["sessions/a"]["telemetry"] == {"hp": 2}
+
+    def test_max_ops_limit(self):
+        with pytest.raises(ValueError):
+            FirestoreBatchWriter(FakeFirestore(), max_ops=501)
+
+    def test_commit_hook_sees_only_real_commits(self):
+
+        client = FakeFirestore()
+        chunks = []
+
+        def commit(chunk):
+            chunks.append([path for path, _ in chunk])
+            writer.commit_chunk(chunk)
+
+        writer = FirestoreBatchWriter(client, max_ops=2, commit=commit)
+
+        # flush a vuoto: nessun commit, nessun esito da registrare su un breaker
+        assert writer.flush() == 0
+        assert chunks == [] and client.commits == []
+
+        for name in "abc":
+            writer.update(f"sessions/{name}", {"telemetry": {"hp": 1}})
+
+        assert writer.flush() == 3
+        assert chunks == [["sessions/a", "sessions/b"], ["sessions/c"]]
+        assert client.documents["sessions/c"] == {"telemetry": {"hp": 1}}
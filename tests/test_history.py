@@ -0,0 +1,79 @@
+import numpy as np
+
+from schemas.metrics import TelemetryPayload
+from database.history import TelemetryHistory, TelemetrySeries
+
+
+class TestTelemetrySeries:
+
+    def test_raw_ring_keeps_latest_points(self):
+
+        series = TelemetrySeries(raw_capacity=4, rollup_interval=60, rollup_capacity=10)
+        for t in range(10):
+            series.append(float(t), {"hp": float(t)})
+
+        ts, metrics = series.points()
+        assert ts.tolist() == [6.0, 7.0, 8.0, 9.0]
+        assert metrics["hp"].tolist() == [6.0, 7.0, 8.0, 9.0]
+
+        ts, _ = series.points(start=7, end=8)
+        assert ts.tolist() == [7.0, 8.0]
+
+    def test_missing_metric_is_nan(self):
+
+        series = TelemetrySeries(raw_capacity=4)
+        series.append(0.0, {"hp": 1.0})
+        series.append(1.0, {"stress": 2.0})
+
+        _, metrics = series.points()
+        assert np.isnan(metrics["hp"][1])
+        assert np.isnan(metrics["stress"][0])
+
+    def test_rollups_survive_raw_overwrite(self):
+
+        series = TelemetrySeries(raw_capacity=10, rollup_interval=60, rollup_capacity=3)
+        # 5 minutes at 1 Hz, hp = second of the minute
+        for t in range(300):
+            series.append(float(t), {"hp": float(t % 60)})
+
+        frame = series.rollups()
+        # only the last 3 buckets are kept
+        assert frame.start.tolist() == [120.0, 180.0, 240.0]
+        assert frame.min["hp"].tolist() == [0.0, 0.0, 0.0]
+        assert frame.max["hp"].tolist() == [59.0, 59.0, 59.0]
+        assert frame.mean["hp"].tolist() == [29.5, 29.5, 29.5]
+        assert frame.count["hp"].tolist() == [60, 60, 60]
+
+        assert series.rollups(start=200, end=230).start.tolist() == [180.0]
+
+        # older than the rollup window
+        series.append(0.0, {"hp": 1.0})
+        assert series.late_dropped == 1
+
+    def test_metrics_per_session_are_capped(self):
+
+        series = TelemetrySeries(raw_capacity=4, rollup_interval=60, rollup_capacity=2, max_metrics=2)
+        series.append(0.0, {"hp": 1.0, "fear": 2.0, "junk_0": 3.0})
+        for i in range(1, 100):
+            series.append(float(i), {"hp": 1.0, f"junk_{i}": 3.0})
+
+        _, metrics = series.points()
+        assert sorted(metrics) == ["fear", "hp"]
+        assert sorted(series.rollups().count) == ["fear", "hp"]
+        assert series.rollups().count["hp"].tolist() == [60, 40]
+        assert series.metrics_dropped == 100
+
+
+class TestTelemetryHistory:
+
+    def test_sessions_bounded(self):
+
+        history = TelemetryHistory(raw_capacity=4, max_sessions=2)
+        for sid in ("table_1", "table_2", "table_1", "table_3"):
+            history.append(TelemetryPayload(session_id=sid, timestamp=0.0, metrics={"hp": 1.0}))
+
+        # table_2 is the least recently written
+        assert len(history) == 2
+        assert history.points("table_2") is None
+        assert history.points("table_1")[0].tolist() == [0.0, 0.0]
+        assert history.stats()["history_evicted"] == 1
@@ -0,0 +1,48 @@
+from cache.local import LRUTTLStore
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestLRUTTLStore:
+
+    def test_ttl_expiration(self):
+
+        clock = FakeClock()
+        store = LRUTTLStore(clock=clock)
+
+        store.set("state", "value", ttl=10)
+        assert store.get("state") == "value"
+
+        clock.now = 10
+        assert store.get("state") is None
+        assert store.stats() == {"size": 0, "hits": 1, "misses": 1, "evictions": 0, "expirations": 1}
+
+    def test_lru_eviction(self):
+
+        store = LRUTTLStore(max_entries=2)
+
+        store.set("a", 1, ttl=60)
+        store.set("b", 2, ttl=60)
+        store.get("a") # "b" is now the least recently used
+        store.set("c", 3, ttl=60)
+
+        assert store.get("b") is None
+        assert store.get("a") == 1
+        assert store.get("c") == 3
+        assert store.evictions == 1
+
+    def test_delete(self):
+
+        store = LRUTTLStore()
+        store.set("a", 1, ttl=60)
+
+        assert store.delete("a")
+        assert not store.delete("a")
+        assert store.get("a") is None
@@ -0,0 +1,125 @@
+import asyncio
+import threading
+
+import pytest
+
+from shared import logger
+from database.memory import MemoryService, StripedStore
+from database.memory_async import AsyncMemoryService
+from schemas.metrics import TelemetryPayload
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestStripedStore:
+
+    def test_get_set_delete(self):
+
+        store = StripedStore(stripes=4)
+        store.set("table_1", 1)
+        store.update("table_1", lambda value: value + 1)
+
+        assert store.get("table_1") == 2
+        assert store.delete("table_1")
+        assert store.get("table_1") is None
+        assert not store.delete("table_1")
+
+    def test_stripes_power_of_two(self):
+        with pytest.raises(ValueError):
+            StripedStore(stripes=3)
+
+    def test_reader_snapshot_is_stable(self):
+
+        store = StripedStore(stripes=1)
+        store.set("a", 1)
+        snapshot = store._stripes[0].data
+
+        store.set("b", 2)
+        # copy-on-write: a published snapshot never changes under a reader
+        assert snapshot == {"a": 1}
+
+    def test_lru_eviction_keeps_recent_sessions(self):
+
+        clock = FakeClock()
+        store = StripedStore(stripes=1, max_entries=10, clock=clock)
+
+        for i in range(10):
+            clock.now = i
+            store.set(i, i)
+
+        clock.now = 10
+        store.get(0) # 0 becomes the most recently used
+        clock.now = 11
+        store.set(10, 10)
+
+        assert store.get(0) == 0
+        assert store.get(1) is None
+        assert len(store) == 9
+        assert store.evictions == 2
+
+    def test_evict_idle(self):
+
+        clock = FakeClock()
+        store = StripedStore(stripes=4, clock=clock)
+        store.set("old", 1)
+        clock.now = 100
+        store.set("new", 2)
+
+        assert store.evict_idle(max_idle=50) == 1
+        assert store.get("old") is None and store.get("new") == 2
+
+    def test_concurrent_updates_are_not_lost(self):
+
+        store = StripedStore(stripes=8)
+
+        def work():
+            for i in range(1000):
+                store.update(i % 16, lambda value: (value or 0) + 1)
+
+        threads = [threading.Thread(target=work) for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        assert sum(store.get(k) for k in range(16)) == 4000
+
+
+class TestMemoryService:
+
+    @pytest.fixture(autouse=True)
+    def fresh(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(logger._Logger, "_folder", str(tmp_path))
+        monkeypatch.setattr(MemoryService, "_instance", None)
+        monkeypatch.setattr(AsyncMemoryService, "_instance", None)
+
+    def test_singleton_keeps_its_data(self):
+
+        service = MemoryService()
+        service.set_telemetry(TelemetryPayload(session_id="table_1", metrics={"hp": 1.0}))
+
+        assert MemoryService() is service
+        assert MemoryService().get_telemetry("table_1").metrics == {"hp": 1.0}
+
+    def test_async_service_runs_on_the_striped_store(self):
+
+        async def scenario():
+            service = AsyncMemoryService(stripes=8)
+            await service.connect()
+            await service.set_telemetry_many([
+                TelemetryPayload(session_id=f"table_{i}", metrics={"hp": float(i)}) for i in range(20)
+            ])
+            return await AsyncMemoryService().get_telemetry("table_7"), service.stats()
+
+        payload, stats = asyncio.run(scenario())
+
+        assert payload.metrics == {"hp": 7.0}
+        assert stats["size"] == 20 and stats["stripes"] == 8
+        assert AsyncMemoryService()._service is MemoryService()
@@ -0,0 +1,190 @@
+import asyncio
+
+import pytest
+
+from shared import logger
+from music.dispatcher import MusicDispatcher
+from music.ramps import RampScheduler, TimerWheel
+
+
+@pytest.fixture(autouse=True)
+def log_folder(tmp_path, monkeypatch):
+    monkeypatch.setattr(logger._Logger, "_folder", str(tmp_path))
+
+
+class FakeProvider:
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.calls = []
+
+    async def play_genre(self, genre):
+        self.calls.append(genre)
+        await asyncio.sleep(self.delay)
+        return True
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+class TestMusicDispatcher:
+
+    def test_burst_collapses_to_latest_genre(self):
+
+        async def scenario():
+            provider = FakeProvider()
+            dispatcher = MusicDispatcher(provider, debounce=0.05, workers=2)
+            await dispatcher.start()
+
+            for genre in ("metal", "horror", "battle"):
+                dispatcher.submit("table_1", genre)
+            dispatcher.submit("table_2", "calm")
+            assert dispatcher.depth == 2
+
+            await asyncio.sleep(0.1)
+            await dispatcher.close()
+            return provider, dispatcher
+
+        provider, dispatcher = run(scenario())
+        assert sorted(provider.calls) == ["battle", "calm"]
+        assert dispatcher.stats()["coalesced"] == 2
+        assert dispatcher.depth == 0
+
+    def test_same_genre_is_not_replayed(self):
+
+        async def scenario():
+            provider = FakeProvider()
+            dispatcher = MusicDispatcher(provider, debounce=0.01)
+            await dispatcher.start()
+
+            dispatcher.submit("table_1", "metal")
+            await asyncio.sleep(0.05)
+            dispatcher.submit("table_1", "metal")
+            await asyncio.sleep(0.05)
+            dispatcher.forget("table_1")
+            dispatcher.submit("table_1", "metal")
+            await asyncio.sleep(0.05)
+
+            await dispatcher.close()
+            return provider, dispatcher
+
+        provider, dispatcher = run(scenario())
+        assert provider.calls == ["metal", "metal"]
+        assert dispatcher.duplicates == 1
+
+    def test_one_call_in_flight_per_session(self):
+
+        async def scenario():
+            provider = FakeProvider(delay=0.1)
+            dispatcher = MusicDispatcher(provider, debounce=0.01, workers=4)
+            await dispatcher.start()
+
+            dispatcher.submit("table_1", "metal")
+            await asyncio.sleep(0.03)
+            # arrives while metal is playing: queued, not run concurrently
+            dispatcher.submit("table_1", "horror")
+            await asyncio.sleep(0.03)
+            assert provider.calls == ["metal"]
+
+            await asyncio.sleep(0.2)
+            await dispatcher.close()
+            return provider
+
+        assert run(scenario()).calls == ["metal", "horror"]
+
+    def test_crossfade_through_ramp_scheduler(self):
+
+        class VolumeProvider(FakeProvider):
+            async def set_volume(self, level):
+                self.calls.append(level)
+
+        async def scenario():
+            provider = VolumeProvider()
+            ramps = RampScheduler(provider, TimerWheel(tick=0.005), step=0.02, default_level=50)
+            dispatcher = MusicDispatcher(provider, debounce=0.01, ramps=ramps, crossfade=0.1)
+            await dispatcher.start()
+
+            dispatcher.submit("table_1", "battle")
+            await asyncio.sleep(0.2)
+            await dispatcher.close()
+            return provider, dispatcher
+
+        provider, dispatcher = run(scenario())
+        play = provider.calls.index("battle")
+        assert provider.calls[play - 1] == 10
+        assert provider.calls[-1] == 50
+        assert dispatcher.stats()["played"] == 1
+
+    def test_de_escalation_during_crossfade(self):
+
+        class VolumeProvider(FakeProvider):
+            async def set_volume(self, level):
+                pass
+
+        async def scenario():
+            provider = VolumeProvider()
+            ramps = RampScheduler(provider, TimerWheel(tick=0.005), step=0.02, default_level=50)
+            dispatcher = MusicDispatcher(provider, debounce=0.01, ramps=ramps, crossfade=0.1)
+            await dispatcher.start()
+
+            dispatcher.submit("table_1", "funeral", priority=9)
+            await asyncio.sleep(0.04)
+            # the state recovers while the critical crossfade is still running
+            dispatcher.submit("table_1", "exploration", priority=0)
+            await asyncio.sleep(0.3)
+            await dispatcher.close()
+            return provider
+
+        assert run(scenario()).calls == ["funeral", "exploration"]
+
+
+    def test_last_played_is_bounded(self):
+
+        async def scenario():
+            provider = FakeProvider()
+            dispatcher = MusicDispatcher(provider, debounce=0.01, max_sessions=2)
+            await dispatcher.start()
+
+            for session_id in ("table_1", "table_2", "table_3", "table_1"):
+                dispatcher.submit(session_id, "metal")
+                await asyncio.sleep(0.03)
+
+            await dispatcher.close()
+            return provider, dispatcher
+
+        provider, dispatcher = run(scenario())
+        # table_1 was the least recently played: forgotten, so played again
+        assert provider.calls == ["metal"] * 4
+        assert list(dispatcher._last_played) == ["table_3", "table_1"]
+
+    def test_failed_crossfade_play_is_not_recorded(self):
+
+        class FlakyProvider(FakeProvider):
+            async def play_genre(self, genre):
+                self.calls.append(genre)
+                if len(self.calls) == 1:
+                    raise ConnectionError("device gone")
+                return True
+
+            async def set_volume(self, level):
+                pass
+
+        async def scenario():
+            provider = FlakyProvider()
+            ramps = RampScheduler(provider, TimerWheel(tick=0.005), step=0.02, default_level=50)
+            dispatcher = MusicDispatcher(provider, debounce=0.01, ramps=ramps, crossfade=0.04)
+            await dispatcher.start()
+
+            dispatcher.submit("table_1", "battle")
+            await asyncio.sleep(0.1)
+            # the first play failed: the same genre is not a duplicate
+            dispatcher.submit("table_1", "battle")
+            await asyncio.sleep(0.1)
+            await dispatcher.close()
+            return provider, dispatcher
+
+        provider, dispatcher = run(scenario())
+        assert provider.calls == ["battle", "battle"]
+        stats = dispatcher.stats()
+        assert (stats["played"], stats["failed"], stats["duplicates"]) == (1, 1, 0)
@@ -0,0 +1,81 @@
+import asyncio
+
+import pytest
+
+from shared import logger
+from database.adapter import AsyncDatabaseAdapter
+from database.memory import MemoryService
+from engine.orchestrator import Orchestrator
+from schemas.metrics import TelemetryPayload
+from schemas.session import SessionConfig, SessionState, TriggerRule
+from tests.test_telemetry_api import MemoryCache
+
+
+@pytest.fixture(autouse=True)
+def log_folder(tmp_path, monkeypatch):
+    monkeypatch.setattr(logger._Logger, "_folder", str(tmp_path))
+
+
+def session(session_id, *rules):
+    return SessionState(config=SessionConfig(session_id=session_id, default_genre="calm", rules=list(rules)))
+
+
+HP = TriggerRule(metric_name="hp", operator="lt", threshold=20, target_genre="metal", priority=5)
+FEAR = TriggerRule(metric_name="fear", operator="gt", threshold=80, target_genre="horror", priority=2)
+
+
+class TestRuleSetCache:
+
+    def test_config_changed_by_another_worker(self):
+
+        cache, db = MemoryCache(), AsyncDatabaseAdapter(MemoryService())
+        this, other = Orchestrator(cache, db), Orchestrator(cache, db)
+
+        async def scenario():
+            await this.process_session(session("table_1", FEAR, HP))
+            await this.process_transition(TelemetryPayload(session_id="table_1", timestamp=1.0, metrics={"hp": 50.0}))
+
+            # the other worker drops the fear rule: indices of the old rule set are now wrong
+            await other.process_session(session("table_1", HP))
+            return await this.process_transition(TelemetryPayload(session_id="table_1", timestamp=2.0, metrics={"hp": 5.0}))
+
+        transition = asyncio.run(scenario())
+
+        assert transition.genre == "metal"
+        assert transition.state.active_rule_index == 0
+
+
+    def test_rules_hashed_once_at_setup(self, monkeypatch):
+
+        from engine import orchestrator as module
+
+        calls = []
+        fingerprint = module.rules_fingerprint
+        monkeypatch.setattr(module, "rules_fingerprint", lambda rules: calls.append(1) or fingerprint(rules))
+
+        cache = MemoryCache()
+        orchestrator = Orchestrator(cache, AsyncDatabaseAdapter(MemoryService()))
+
+        async def scenario():
+            await orchestrator.process_session(session("table_1", HP))
+            for t in range(5):
+                await orchestrator.process_transition(TelemetryPayload(session_id="table_1", timestamp=float(t), metrics={"hp": 50.0}))
+
+        asyncio.run(scenario())
+
+        assert cache.sessions["table_1"].config.rules_version == fingerprint([HP])
+        assert len(calls) == 1
+
+
+    def test_rule_sets_are_bounded(self):
+
+        orchestrator = Orchestrator(MemoryCache(), AsyncDatabaseAdapter(MemoryService()), max_rule_sets=2)
+
+        first, second, third = (session(f"table_{i}", HP) for i in range(3))
+        kept = orchestrator.get_rule_set(first)
+        orchestrator.get_rule_set(second)
+        # first is used again: second is the least recently used one
+        assert orchestrator.get_rule_set(first) is kept
+        orchestrator.get_rule_set(third)
+
+        assert list(orchestrator._rule_sets) == ["table_0", "table_2"]
@@ -0,0 +1,207 @@
+import asyncio
+
+import pytest
+
+from shared import logger
+from music.ramps import Command, RampScheduler, TimerWheel
+
+
+@pytest.fixture(autouse=True)
+def log_folder(tmp_path, monkeypatch):
+    monkeypatch.setattr(logger._Logger, "_folder", str(tmp_path))
+
+
+class FakeProvider:
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.calls = []
+
+    async def set_volume(self, level):
+        self.calls.append(("volume", level))
+        await asyncio.sleep(self.delay)
+
+    async def play_genre(self, genre):
+        self.calls.append(("play", genre))
+        await asyncio.sleep(self.delay)
+        return True
+
+
+class TestTimerWheel:
+
+    def test_fires_in_order_and_skips_cancelled(self):
+
+        fired = []
+
+        async def scenario():
+            # 4 slots: the 0.09s timer needs a second revolution
+            wheel = TimerWheel(tick=0.01, slots=4)
+            await wheel.start()
+            wheel.schedule(0.09, fired.append, "late")
+            wheel.schedule(0.02, fired.append, "early")
+            wheel.schedule(0.05, fired.append, "cancelled").cancel()
+            assert len(wheel) == 3
+
+            await asyncio.sleep(0.15)
+            await wheel.close()
+            return wheel
+
+        wheel = asyncio.run(scenario())
+        assert fired == ["early", "late"]
+        assert len(wheel) == 0
+
+
+class TestRampScheduler:
+
+    def test_plan_ramp_skips_repeated_levels(self):
+
+        scheduler = RampScheduler(FakeProvider(), step=0.1)
+        commands = scheduler.plan_ramp(50, 52, 1.0)
+
+        assert [c.value for c in commands] == [51, 52]
+        assert commands[-1].at == pytest.approx(1.0)
+
+
+    def test_ramp_reaches_target(self):
+
+        provider = FakeProvider()
+        scheduler = RampScheduler(provider, TimerWheel(tick=0.005), step=0.02, default_level=50)
+
+        async def scenario():
+            await scheduler.start()
+            assert scheduler.ramp("table_1", 30, 0.1)
+            await asyncio.sleep(0.2)
+            await scheduler.close()
+
+        asyncio.run(scenario())
+
+        levels = [value for _, value in provider.calls]
+        assert levels == sorted(levels, reverse=True)
+        assert levels[-1] == 30
+        assert scheduler.level("table_1") == 30
+        assert not scheduler.active("table_1")
+
+
+    def test_slow_provider_drops_intermediate_steps(self):
+
+        provider = FakeProvider(delay=0.05)
+        scheduler = RampScheduler(provider, TimerWheel(tick=0.005), step=0.01, default_level=100)
+
+        async def scenario():
+            await scheduler.start()
+            scheduler.ramp("table_1", 0, 0.1)
+            await asyncio.sleep(0.3)
+            await scheduler.close()
+
+        asyncio.run(scenario())
+
+        stats = scheduler.stats()
+        assert stats["dropped"] > 0
+        assert stats["sent"] + stats["dropped"] == stats["planned"]
+        assert provider.calls[-1] == ("volume", 0)
+
+
+    def test_crossfade_order(self):
+
+        provider = FakeProvider()
+        scheduler = RampScheduler(provider, TimerWheel(tick=0.005), step=0.02, default_level=60)
+
+        async def scenario():
+            await scheduler.start()
+            scheduler.crossfade("table_1", "battle", 0.1, floor=10)
+            await asyncio.sleep(0.2)
+            await scheduler.close()
+
+        asyncio.run(scenario())
+
+        play = provider.calls.index(("play", "battle"))
+        down = [value for _, value in provider.calls[:play]]
+        up = [value for _, value in provider.calls[play + 1:]]
+        assert down[-1] == 10 and down == sorted(down, reverse=True)
+        assert up[-1] == 60 and up == sorted(up)
+
+
+    def test_interrupted_crossfade_returns_to_resting_level(self):
+
+        provider = FakeProvider()
+        scheduler = RampScheduler(provider, TimerWheel(tick=0.005), step=0.02, default_level=60)
+
+        async def scenario():
+            await scheduler.start()
+            scheduler.crossfade("table_1", "calm", 0.2, floor=10)
+            # half way down the fade out
+            await asyncio.sleep(0.08)
+            scheduler.crossfade("table_1", "battle", 0.1, floor=10)
+            await asyncio.sleep(0.2)
+            await scheduler.close()
+
+        asyncio.run(scenario())
+
+        assert ("play", "calm") not in provider.calls
+        assert provider.calls[-1] == ("volume", 60)
+
+
+    def test_priority_preempts_and_refuses(self):
+
+        provider = FakeProvider()
+        scheduler = RampScheduler(provider, TimerWheel(tick=0.005), step=0.02, default_level=50)
+
+        async def scenario():
+            await scheduler.start()
+            scheduler.run("table_1", [Command(0.05, "play", "calm")], priority=1)
+            # weaker: refused
+            assert not scheduler.run("table_1", [Command(0.01, "play", "ambient")], priority=0)
+            # stronger: the calm sequence is cancelled before it fires
+            assert scheduler.run("table_1", [Command(0.01, "play", "battle")], priority=5)
+            await asyncio.sleep(0.1)
+            await scheduler.close()
+
+        asyncio.run(scenario())
+
+        assert provider.calls == [("play", "battle")]
+        assert scheduler.stats()["refused"] == 1
+        assert scheduler.stats()["cancelled"] == 1
+
+
+    def test_weaker_crossfade_waits_for_the_running_one(self):
+
+        provider = FakeProvider()
+        scheduler = RampScheduler(provider, TimerWheel(tick=0.005), step=0.02, default_level=60)
+
+        async def scenario():
+            await scheduler.start()
+            scheduler.crossfade("table_1", "funeral", 0.1, priority=9)
+            await asyncio.sleep(0.02)
+            # back to NOMINAL while the critical crossfade runs: superseded by a later one
+            assert scheduler.crossfade("table_1", "calm", 0.1, priority=0)
+            assert scheduler.crossfade("table_1", "exploration", 0.1, priority=0)
+            await asyncio.sleep(0.35)
+            await scheduler.close()
+
+        asyncio.run(scenario())
+
+        plays = [call for call in provider.calls if call[0] == "play"]
+        assert plays == [("play", "funeral"), ("play", "exploration")]
+        assert provider.calls[-1] == ("volume", 60)
+        assert scheduler.stats()["deferred"] == 2
+        assert not scheduler.active("table_1")
+
+
+    def test_many_sessions_share_one_wheel(self):
+
+        provider = FakeProvider(delay=0.001)
+        wheel = TimerWheel(tick=0.005)
+        scheduler = RampScheduler(provider, wheel, step=0.02, default_level=80)
+
+        async def scenario():
+            await scheduler.start()
+            for i in range(300):
+                scheduler.ramp(f"table_{i}", 20, 0.1)
+            assert scheduler.stats()["active"] == 300
+            await asyncio.sleep(0.3)
+            await scheduler.close()
+
+        asyncio.run(scenario())
+
+        assert all(scheduler.level(f"table_{i}") == 20 for i in range(300))
+        assert len(wheel) == 0
@@ -0,0 +1,148 @@
+import importlib
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+from shared import logger
+from schemas.metrics import TelemetryPayload
+
+
+def encode(value):
+    return value if isinstance(value, bytes) else str(value).encode()
+
+
+class FakeRedis:
+    """Hashes of one Redis server, replies as bytes (decode_responses=False)"""
+
+    def __init__(self):
+        self.hashes = {}
+        self.hset_calls = []
+
+    def hset(self, key, mapping):
+        self.hset_calls.append((key, dict(mapping)))
+        self.hashes.setdefault(key, {}).update({encode(k): encode(v) for k, v in mapping.items()})
+        return len(mapping)
+
+    def hget(self, key, field):
+        return self.hashes.get(key, {}).get(encode(field))
+
+    def hgetall(self, key):
+        return dict(self.hashes.get(key, {}))
+
+    def hmget(self, key, fields):
+        return [self.hashes.get(key, {}).get(encode(field)) for field in fields]
+
+    def expire(self, key, ttl):
+        return key in self.hashes
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+
+class FakePipeline:
+
+    def __init__(self, client):
+        self._client = client
+        self._commands = []
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self._commands.append((name, args, kwargs))
+
+    def execute(self):
+        return [getattr(self._client, name)(*args, **kwargs) for name, args, kwargs in self._commands]
+
+
+@pytest.fixture
+def worker(tmp_path, monkeypatch):
+    monkeypatch.setattr(logger._Logger, "_folder", str(tmp_path))
+
+    settings = SimpleNamespace(CACHE_CODEC="JSON", L1_MAX_ENTRIES=100, REDIS_HASH_DIFF_TTL=30.0)
+    monkeypatch.setitem(sys.modules, "shared.config", SimpleNamespace(settings=settings))
+    for name in ("cache.redis", "cache.redis_async", "cache.redis_hash"):
+        monkeypatch.delitem(sys.modules, name, raising=False)
+    redis_hash = importlib.import_module("cache.redis_hash")
+
+    server = FakeRedis()
+
+    def new_worker():
+        # one process each: the singleton is per process
+        monkeypatch.setattr(redis_hash.RedisHashCache, "_instance", None)
+        cache = redis_hash.RedisHashCache()
+        cache._client = server
+        return cache
+
+    return new_worker, server
+
+
+def payload(timestamp, **metrics):
+    return TelemetryPayload(session_id="table_1", timestamp=timestamp, metrics=metrics)
+
+
+class TestRedisHashCache:
+
+    def test_round_trip(self, worker):
+
+        new_worker, server = worker
+        cache = new_worker()
+
+        cache.set_telemetry(payload(1.0, hp=50.0, fear=10.0))
+        telemetry = cache.get_telemetry("table_1")
+
+        assert telemetry.timestamp == 1.0
+        assert telemetry.metrics == {"hp": 50.0, "fear": 10.0}
+        assert cache.get_telemetry("table_404") is None
+
+
+    def test_only_changed_fields_are_written(self, worker):
+
+        new_worker, server = worker
+        cache = new_worker()
+
+        cache.set_telemetry(payload(1.0, hp=50.0, fear=10.0))
+        cache.set_telemetry(payload(2.0, hp=50.0, fear=20.0))
+
+        _, fields = server.hset_calls[-1]
+        assert set(fields) == {"fear", cache.TIMESTAMP_FIELD, cache.WRITER_FIELD}
+        assert cache.get_telemetry("table_1").metrics == {"hp": 50.0, "fear": 20.0}
+        assert cache.stats()["hash_fields_skipped"] == 1
+
+
+    def test_partial_read(self, worker):
+
+        new_worker, _ = worker
+        cache = new_worker()
+        cache.set_telemetry(payload(1.0, hp=50.0, fear=10.0, stress=3.0))
+
+        assert cache.get_metrics("table_1", ["hp", "stress", "mana"]) == {"hp": 50.0, "stress": 3.0, "mana": None}
+
+
+    def test_diff_over_another_worker_write_is_resynced(self, worker):
+
+        new_worker, server = worker
+        first, second = new_worker(), new_worker()
+
+        first.set_telemetry(payload(1.0, hp=50.0, fear=10.0))
+        second.set_telemetry(payload(2.0, hp=5.0, fear=90.0))
+        # unchanged for first since its own last write: the diff alone would skip them
+        first.set_telemetry(payload(3.0, hp=50.0, fear=10.0))
+
+        assert first.get_telemetry("table_1").metrics == {"hp": 50.0, "fear": 10.0}
+        assert first.stats()["hash_resyncs"] == 1
+
+        # first is again the last writer: diffs are enough
+        first.set_telemetry(payload(4.0, hp=50.0, fear=11.0))
+        assert first.stats()["hash_resyncs"] == 1
+        assert first.get_telemetry("table_1").metrics == {"hp": 50.0, "fear": 11.0}
+
+
+    def test_diff_over_an_expired_hash_is_resynced(self, worker):
+
+        new_worker, server = worker
+        cache = new_worker()
+
+        cache.set_telemetry(payload(1.0, hp=50.0, fear=10.0))
+        server.hashes.clear()
+        cache.set_telemetry(payload(2.0, hp=50.0, fear=20.0))
+
+        assert cache.get_telemetry("table_1").metrics == {"hp": 50.0, "fear": 20.0}
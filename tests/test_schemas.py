@@ -1,6 +1,6 @@
 import pytest
 from pydantic import ValidationError
-from src.schemas.metrics import TelemetryPayload
+from src.schemas.metrics import TelemetryBatch, TelemetryPayload, non_finite_metric
 from src.schemas.session import SessionConfig, SessionState, TriggerRule
 
 
@@ -51,6 +51,20 @@ class TestTelemetrySchema:
             TelemetryPayload(metrics={"hp": 100.0})
 
 
+    def test_non_finite_metrics(self):
+
+        assert non_finite_metric({"hp": 1.0, "sanity": -3.5}) is None
+        assert non_finite_metric({"hp": 1.0, "fear": float("inf"), "stress": float("nan")}) == "fear"
+        # the sum overflows but every value is finite
+        assert non_finite_metric({"a": 1e308, "b": 1e308}) is None
+        # ints: too large for a float, or only their sum is
+        assert non_finite_metric({"hp": 1, "fear": 10 ** 400}) == "fear"
+        assert non_finite_metric({"a": 10 ** 308, "b": 10 ** 308}) is None
+
+        with pytest.raises(ValidationError, match="stress"):
+            TelemetryPayload(session_id="sess_nan", metrics={"hp": 1.0, "stress": float("nan")})
+
+
     def test_telemetry_serialization(self):
 
         """
@@ -71,6 +85,28 @@ class TestTelemetrySchema:
         assert original.metrics == restored.metrics
 
 
+    @pytest.mark.parametrize("value, timestamp", [
+        ("85", "1.0"), ("-0.25", "1.0"), ("1e308", "1.0"), ("85", "1700000000"),
+        ('"12"', "1.0"), ("true", "1.0"), ("NaN", "1.0"), ("Infinity", "1.0"), ("-Infinity", "1.0"), ("1e400", "1.0"),
+        ("85", '"1.0"'), ("85", "NaN"), ("85", "Infinity"), ("85", "true"),
+    ])
+    def test_row_and_columnar_forms_agree(self, value, timestamp):
+
+        """Same metric value and timestamp: both forms accept it or both reject it"""
+
+        def accepts(model, body):
+            try:
+                model.model_validate_json(body)
+                return True
+            except ValidationError:
+                return False
+
+        row = f'{{"session_id": "table_1", "timestamp": {timestamp}, "metrics": {{"hp": {value}}}}}'
+        columnar = f'{{"session_ids": ["table_1"], "metric_names": ["hp"], "values": [[{value}]], "timestamps": [{timestamp}]}}'
+
+        assert accepts(TelemetryPayload, row) == accepts(TelemetryBatch, columnar)
+
+
 
 # ========================== TEST SEZIONE SESSIONE E REGOLE (CONFIG) =========================
 
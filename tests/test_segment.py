@@ -0,0 +1,87 @@
+import numpy as np
+import pytest
+
+from database.segment import HEADER_SIZE, TelemetrySegment
+
+
+class TestTelemetrySegment:
+
+    def test_append_and_replay(self, tmp_path):
+
+        path = str(tmp_path / "table_1.tlog")
+        segment = TelemetrySegment(path, ["hp", "stress"], capacity=2)
+        for t in range(5):
+            segment.append(float(t), {"hp": float(t)})
+        segment.append(5.0, {"hp": 1.0, "stress": 0.5})
+        segment.close()
+
+        # reopen: records are read back from the mapping
+        segment = TelemetrySegment(path)
+        assert segment.count == 6
+        assert segment.capacity >= 6
+        assert segment.latest() == (5.0, {"hp": 1.0, "stress": 0.5})
+
+        records = segment.records()
+        assert records["timestamp"].tolist() == [0.0, 1.0, 2.0, 3.0, 4.0, 5.0]
+        assert np.isnan(records["values"][0, 1])
+        segment.close()
+
+    def test_uncommitted_record_is_ignored(self, tmp_path):
+
+        path = str(tmp_path / "table_1.tlog")
+        segment = TelemetrySegment(path, ["hp"])
+        segment.append(1.0, {"hp": 1.0})
+        segment.close()
+
+        # a crash after the record bytes, before the count bump
+        with open(path, "r+b") as f:
+            f.seek(HEADER_SIZE + 16)
+            f.write(np.array([2.0, 2.0]).tobytes())
+
+        segment = TelemetrySegment(path)
+        assert segment.latest() == (1.0, {"hp": 1.0})
+        segment.close()
+
+    def test_rewrite_extends_schema_and_compacts(self, tmp_path):
+
+        path = str(tmp_path / "table_1.tlog")
+        segment = TelemetrySegment(path, ["hp"])
+        for t in range(10):
+            segment.append(float(t), {"hp": float(t)})
+
+        assert not segment.accepts({"hp": 1.0, "stress": 1.0})
+        segment = segment.rewrite(["hp", "stress"], keep_last=3)
+        segment.append(10.0, {"stress": 0.5})
+
+        assert segment.names == ["hp", "stress"]
+        assert segment.records()["timestamp"].tolist() == [7.0, 8.0, 9.0, 10.0]
+        assert segment.latest() == (10.0, {"stress": 0.5})
+        segment.close()
+
+    def test_crash_during_rewrite_keeps_the_old_segment(self, tmp_path, monkeypatch):
+
+        path = str(tmp_path / "table_1.tlog")
+        segment = TelemetrySegment(path, ["hp"])
+        for t in range(5):
+            segment.append(float(t), {"hp": float(t)})
+
+        # a crash right before the new file is swapped in
+        def crash(src, dst):
+            raise OSError("power loss")
+        monkeypatch.setattr("os.replace", crash)
+
+        with pytest.raises(OSError):
+            segment.rewrite(["hp", "stress"], keep_last=2)
+        monkeypatch.undo()
+
+        # the old segment is still open and keeps logging
+        segment.append(5.0, {"hp": 5.0})
+        segment.close()
+
+        segment = TelemetrySegment(path)
+        assert segment.records()["timestamp"].tolist() == [0.0, 1.0, 2.0, 3.0, 4.0, 5.0]
+        segment.close()
+
+        # the temporary file is already complete: nothing is appended after the swap
+        with open(path + ".tmp", "rb") as f:
+            assert f.read(4) == b"RETL"
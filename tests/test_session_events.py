@@ -0,0 +1,78 @@
+import asyncio
+import json
+
+import pytest
+
+from shared import logger
+from engine.events import SessionBroadcaster
+from schemas.session import SessionConfig, SessionState
+
+
+@pytest.fixture(autouse=True)
+def log_folder(tmp_path, monkeypatch):
+    monkeypatch.setattr(logger._Logger, "_folder", str(tmp_path))
+
+
+def session(session_id="table_1", status="NOMINAL", metrics=None):
+    return SessionState(config=SessionConfig(session_id=session_id), current_status=status, metrics_at_transition=metrics)
+
+
+def decode(frame: bytes) -> dict:
+    event, data = frame.decode().strip().split("\n")
+    assert event == "event: state"
+    return json.loads(data[len("data: "):])
+
+
+class TestSessionBroadcaster:
+
+    def test_fan_out_serializes_once(self):
+
+        async def scenario():
+            events = SessionBroadcaster()
+            first, second = events.subscribe("table_1"), events.subscribe("table_1")
+            other = events.subscribe("table_2")
+
+            assert events.publish(session(status="CRITICAL"), genre="metal") == 2
+            return await first.get(timeout=1), await second.get(timeout=1), other, events
+
+        a, b, other, events = asyncio.run(scenario())
+
+        # the very same bytes object for every subscriber
+        assert a is b
+        assert decode(a)["status"] == "CRITICAL" and decode(a)["genre"] == "metal"
+        assert len(other) == 0
+        assert events.stats()["delivered"] == 2
+
+
+    def test_slow_subscriber_drops_oldest(self):
+
+        async def scenario():
+            events = SessionBroadcaster(queue_size=3)
+            subscription = events.subscribe("table_1")
+            for hp in range(10):
+                events.publish(session(metrics={"hp": float(hp)}))
+            return [decode(await subscription.get(timeout=1))["metrics_at_transition"]["hp"] for _ in range(3)], subscription, events
+
+        values, subscription, events = asyncio.run(scenario())
+
+        assert values == [7.0, 8.0, 9.0]
+        assert subscription.dropped == 7
+        events.unsubscribe(subscription)
+        assert events.stats() == {"sessions": 0, "subscribers": 0, "published": 10, "delivered": 10, "dropped": 7}
+
+
+    def test_no_subscribers_no_work(self):
+
+        events = SessionBroadcaster()
+        assert events.publish(session()) == 0
+        assert events.stats()["published"] == 0
+
+
+    def test_get_times_out_for_keepalive(self):
+
+        async def scenario():
+            subscription = SessionBroadcaster().subscribe("table_1")
+            await subscription.get(timeout=0.01)
+
+        with pytest.raises(asyncio.TimeoutError):
+            asyncio.run(scenario())
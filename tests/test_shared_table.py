@@ -0,0 +1,170 @@
+import asyncio
+import uuid
+import multiprocessing
+
+import pytest
+
+from shared import logger
+from cache import shared_table
+from cache.shared_table import MAX_PROBES, SharedSessionTable, SharedTableCache
+from schemas.metrics import TelemetryPayload
+from schemas.session import SessionConfig, SessionState
+from tests.test_telemetry_api import MemoryCache
+
+
+@pytest.fixture
+def table_name():
+    name = f"resonance_test_{uuid.uuid4().hex[:8]}"
+    yield name
+    SharedSessionTable.unlink(name)
+
+
+def writer(name, n):
+    table = SharedSessionTable.attach(name, slots=64, max_metrics=4)
+    for i in range(n):
+        table.put_metrics("table_1", float(i), {"hp": float(i), "stress": float(i)})
+    table.close()
+
+
+class TestSharedSessionTable:
+
+    def test_metrics_and_state(self, table_name):
+
+        table = SharedSessionTable.attach(table_name, slots=64, max_metrics=4)
+        assert table.created
+        assert table.get("table_1") is None
+
+        assert table.put_metrics("table_1", 10.0, {"hp": 50.0, "stress": 3.0})
+        assert table.put_state("table_1", "CRITICAL", 2, 9.0)
+
+        live = table.get("table_1")
+        assert live.metrics == {"hp": 50.0, "stress": 3.0}
+        assert (live.timestamp, live.status, live.active_rule_index, live.active_since) == (10.0, "CRITICAL", 2, 9.0)
+
+        # too many metrics for a slot: the previous ones are not served anymore
+        assert not table.put_metrics("table_1", 11.0, {f"m{i}": 1.0 for i in range(5)})
+        live = table.get("table_1")
+        assert live.metrics == {} and live.status == "CRITICAL"
+        table.close()
+
+    def test_second_worker_sees_writes(self, table_name):
+
+        first = SharedSessionTable.attach(table_name, slots=64, max_metrics=4)
+        second = SharedSessionTable.attach(table_name, slots=64, max_metrics=4)
+        assert not second.created
+
+        first.put_metrics("table_1", 1.0, {"hp": 1.0})
+        assert second.get("table_1").metrics == {"hp": 1.0}
+
+        first.close()
+        second.close()
+
+    def test_full_probe_window_recycles_oldest(self, table_name):
+
+        table = SharedSessionTable.attach(table_name, slots=MAX_PROBES, max_metrics=1)
+        for i in range(MAX_PROBES + 1):
+            table.put_metrics(f"table_{i}", float(i), {"hp": 1.0})
+
+        assert table.get("table_0") is None
+        assert table.get(f"table_{MAX_PROBES}") is not None
+        assert table.stats()["shared_evictions"] == 1
+        table.close()
+
+    def test_reads_are_consistent_across_processes(self, table_name):
+
+        table = SharedSessionTable.attach(table_name, slots=64, max_metrics=4)
+        table.put_metrics("table_1", 0.0, {"hp": 0.0, "stress": 0.0})
+
+        process = multiprocessing.get_context("fork").Process(target=writer, args=(table_name, 20000))
+        process.start()
+        while process.is_alive():
+            live = table.get("table_1")
+            if live is not None:
+                # never a torn slot: both metrics come from the same write
+                assert live.metrics["hp"] == live.metrics["stress"] == live.timestamp
+        process.join()
+
+        assert table.get("table_1").timestamp == 19999.0
+        table.close()
+
+    def test_slot_taken_before_the_lock_is_not_overwritten(self, table_name, monkeypatch):
+
+        table = SharedSessionTable.attach(table_name, slots=64, max_metrics=4)
+        lockf = shared_table.fcntl.lockf
+        raced = []
+
+        def racing_lockf(fd, cmd, length, start):
+            lockf(fd, cmd, length, start)
+            if cmd == shared_table.fcntl.LOCK_EX and not raced:
+                # un altro processo prende lo slot libero fra la scelta e il lock
+                table._session_id[start] = b"intruder"
+                raced.append(start)
+
+        monkeypatch.setattr(shared_table.fcntl, "lockf", racing_lockf)
+        assert table.put_metrics("table_1", 1.0, {"hp": 1.0})
+
+        assert table._session_id[raced[0]] == b"intruder"
+        assert table._find(b"table_1") != raced[0]
+        assert table.get("table_1").metrics == {"hp": 1.0}
+        assert table.stats()["shared_evictions"] == 0
+        table.close()
+
+
+class TestSharedTableCache:
+
+    def test_oversize_payload_falls_back_to_backend(self, table_name, tmp_path, monkeypatch):
+
+        monkeypatch.setattr(logger._Logger, "_folder", str(tmp_path))
+        cache = SharedTableCache(MemoryCache(), SharedSessionTable.attach(table_name, slots=64, max_metrics=2))
+
+        async def scenario():
+            await cache.set_telemetry(TelemetryPayload(session_id="table_1", timestamp=1.0, metrics={"hp": 1.0}))
+            await cache.set_telemetry(TelemetryPayload(session_id="table_1", timestamp=2.0, metrics={"hp": 2.0, "a": 0.0, "b": 0.0}))
+            return await cache.get_telemetry("table_1")
+
+        payload = asyncio.run(scenario())
+        cache.table.close()
+
+        assert payload.timestamp == 2.0
+
+
+    def test_session_served_from_table_until_another_worker_writes(self, table_name, tmp_path, monkeypatch):
+
+        monkeypatch.setattr(logger._Logger, "_folder", str(tmp_path))
+
+        class CountingCache(MemoryCache):
+            reads = 0
+
+            async def get_session(self, session_id):
+                CountingCache.reads += 1
+                return await super().get_session(session_id)
+
+        backend = CountingCache()
+        first = SharedTableCache(backend, SharedSessionTable.attach(table_name, slots=64, max_metrics=2))
+        second = SharedTableCache(backend, SharedSessionTable.attach(table_name, slots=64, max_metrics=2))
+        state = SessionState(config=SessionConfig(session_id="table_1", default_genre="ambient"))
+
+        async def scenario():
+            await first.set_session(state)
+            local = [await first.get_session("table_1") for _ in range(3)]
+            reads_after_local = CountingCache.reads
+
+            # il secondo worker carica dal backend una volta, poi legge dallo slot
+            assert await second.get_session("table_1") == state
+            assert await second.get_session("table_1") == state
+
+            await second.set_session(state.model_copy(update={"current_status": "CRITICAL"}))
+            changed = await first.get_session("table_1")
+            many = await first.get_sessions_many(["table_1", "missing"])
+            return local, reads_after_local, changed, many
+
+        local, reads_after_local, changed, many = asyncio.run(scenario())
+        first.table.close()
+        second.table.close()
+
+        assert local == [state] * 3 and reads_after_local == 0
+        # second: 1 miss, first: 1 miss after the remote write, get_sessions_many: only "missing"
+        assert CountingCache.reads == 3
+        assert changed.current_status == "CRITICAL"
+        assert many == {"table_1": changed, "missing": None}
+        assert first.stats()["shared_state_hits"] == 4
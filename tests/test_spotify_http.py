@@ -0,0 +1,126 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+
+import httpx
+
+from benchmarks.fake_spotify import create_app
+from music.http import ClientClosedError, RequestPriority, SpotifyHttpClient, TokenBucket, retry_after
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+async def bearer():
+    return "Bearer test"
+
+
+def client_for(app, **kwargs):
+    return SpotifyHttpClient("http://fake/v1", bearer, transport=httpx.ASGITransport(app=app), **kwargs)
+
+
+class TestTokenBucket:
+
+    def test_rate_and_burst(self):
+
+        clock = FakeClock()
+        bucket = TokenBucket(rate=2, burst=2, clock=clock)
+
+        assert bucket.delay() == 0 and bucket.delay() == 0
+        assert bucket.delay() == 0.5
+
+        clock.now = 0.5
+        assert bucket.delay() == 0
+
+    def test_pause_honours_retry_after(self):
+
+        clock = FakeClock()
+        bucket = TokenBucket(rate=100, burst=100, clock=clock)
+
+        bucket.pause(3)
+        assert bucket.delay() == 3
+        clock.now = 3
+        # the bucket restarts empty and refills at rate
+        assert bucket.delay() == 0.01
+
+
+class TestSpotifyHttpClient:
+
+    def test_playback_goes_before_device_refresh(self):
+
+        app = create_app(latency=0.02)
+
+        async def scenario():
+            client = client_for(app, max_connections=1)
+            await client.start()
+            await asyncio.gather(
+                client.request("GET", "/me/player/devices", priority=RequestPriority.DEVICES),
+                client.request("GET", "/me/player/devices", priority=RequestPriority.DEVICES),
+                client.request("GET", "/search", priority=RequestPriority.SEARCH, params={"q": 'genre:"metal"'}),
+                client.request("PUT", "/me/player/play", priority=RequestPriority.PLAYBACK),
+            )
+            await client.close()
+
+        asyncio.run(scenario())
+        paths = [path for _, path in app.state.calls]
+        # the first request may leave before the others are queued, the rest by priority
+        assert paths[-1] == "/v1/me/player/devices"
+        assert paths.index("/v1/me/player/play") < paths.index("/v1/search")
+
+    def test_429_is_retried_after_retry_after(self):
+
+        app = create_app(rate_limit=2)
+
+        async def scenario():
+            client = client_for(app, rate=100, burst=100)
+            await client.start()
+            responses = await asyncio.gather(*(
+                client.request("PUT", "/me/player/play", priority=RequestPriority.PLAYBACK) for _ in range(5)
+            ))
+            await client.close()
+            return client, responses
+
+        client, responses = asyncio.run(scenario())
+        assert [r.status_code for r in responses] == [204] * 5
+        assert client.throttled >= 1
+        assert app.state.throttled == client.throttled
+
+
+    def test_close_fails_pending_requests(self):
+
+        async def slow(request):
+            await asyncio.sleep(10)
+            return httpx.Response(204)
+
+        async def scenario():
+            client = SpotifyHttpClient("http://fake/v1", bearer, rate=1000, burst=1, max_connections=1, transport=httpx.MockTransport(slow))
+            await client.start()
+            # one in flight, one waiting for a connection, one still queued
+            requests = [asyncio.create_task(client.request("GET", "/me/player/devices")) for _ in range(3)]
+            await asyncio.sleep(0.05)
+            await client.close()
+            return await asyncio.wait_for(asyncio.gather(*requests, return_exceptions=True), timeout=1)
+
+        results = asyncio.run(scenario())
+        assert all(isinstance(result, ClientClosedError) for result in results)
+
+
+class TestRetryAfter:
+
+    def test_seconds_and_http_date(self):
+
+        assert retry_after("3") == 3.0
+        assert retry_after(None) == 1.0
+        assert retry_after("soon", default=2.0) == 2.0
+
+        later = format_datetime(datetime.now(timezone.utc) + timedelta(seconds=30), usegmt=True)
+        assert 25 < retry_after(later) <= 30
+        # a date in the past: no wait
+        assert retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
+
@@ -0,0 +1,82 @@
+import importlib
+import sqlite3
+import sys
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from shared import logger
+from schemas.metrics import TelemetryPayload
+from schemas.session import SessionConfig, SessionState
+
+
+@pytest.fixture
+def service(tmp_path, monkeypatch):
+    monkeypatch.setattr(logger._Logger, "_folder", str(tmp_path))
+
+    settings = SimpleNamespace(SQLITE_PATH=str(tmp_path / "db" / "resonance.db"), CACHE_CODEC="MSGPACK")
+    monkeypatch.setitem(sys.modules, "shared.config", SimpleNamespace(settings=settings))
+    monkeypatch.delitem(sys.modules, "database.sqlite", raising=False)
+    sqlite = importlib.import_module("database.sqlite")
+
+    monkeypatch.setattr(sqlite.SQLiteService, "_instance", None)
+    service = sqlite.SQLiteService()
+    service.connect()
+    yield service
+    service.close()
+
+
+def payload(session_id, timestamp, hp):
+    return TelemetryPayload(session_id=session_id, timestamp=timestamp, metrics={"hp": hp})
+
+
+class TestSQLiteService:
+
+    def test_wal_journal(self, service):
+
+        # persistent in the file: any new connection sees it
+        conn = sqlite3.connect(service._path)
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        conn.close()
+
+
+    def test_batch_is_one_transaction(self, service):
+
+        statements = []
+        service._connection().set_trace_callback(statements.append)
+
+        service.set_telemetry_many([payload(f"table_{i}", 1.0, float(i)) for i in range(3)])
+
+        assert sum(s.startswith("INSERT") for s in statements) == 3
+        assert [s for s in statements if not s.startswith("INSERT")] == ["BEGIN ", "COMMIT"]
+        assert service.get_telemetry("table_2").metrics == {"hp": 2.0}
+
+
+    def test_older_telemetry_does_not_overwrite(self, service):
+
+        service.set_telemetry(payload("table_1", 2.0, 20.0))
+        service.set_telemetry(payload("table_1", 1.0, 10.0))
+        assert service.get_telemetry("table_1").timestamp == 2.0
+
+        # same within a batch: the newest row wins whatever the order
+        service.set_telemetry_many([payload("table_2", 5.0, 50.0), payload("table_2", 4.0, 40.0)])
+        assert service.get_telemetry("table_2").metrics == {"hp": 50.0}
+
+        service.set_telemetry(payload("table_1", 3.0, 30.0))
+        assert service.get_telemetry("table_1").metrics == {"hp": 30.0}
+
+
+    def test_session_round_trip_from_another_thread(self, service):
+
+        state = SessionState(config=SessionConfig(session_id="table_1", default_genre="calm"), current_status="CRITICAL")
+        service.set_session(state)
+
+        found = []
+        reader = threading.Thread(target=lambda: found.append(service.get_session("table_1")))
+        reader.start()
+        reader.join()
+
+        assert found[0].current_status == "CRITICAL"
+        assert service.get_session("table_404") is None
+        assert service.stats()["sqlite_connections"] == 2
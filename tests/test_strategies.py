@@ -0,0 +1,71 @@
+from hypothesis import given, strategies as st
+
+from schemas.session import SessionConfig, TriggerRule
+from engine.strategies import RuleEvaluator, CompiledRuleSet
+
+
+def naive_winner(rules, metrics):
+    """Reference path: one RuleEvaluator call per rule + get_highest_priority_rule"""
+    triggered = [
+        r for r in rules
+        if r.metric_name in metrics and RuleEvaluator.is_triggered(metrics[r.metric_name], r.operator, r.threshold)
+    ]
+    return SessionConfig(session_id="ref").get_highest_priority_rule(triggered)
+
+
+small_floats = st.sampled_from([-10.0, 0.0, 5.0, 10.0, 20.0, 50.0, 99.5, 100.0])
+
+rules_strategy = st.lists(
+    st.builds(TriggerRule,
+              metric_name=st.sampled_from(["hp", "sanity", "stress"]),
+              operator=st.sampled_from(["lt", "gt", "eq"]),
+              threshold=small_floats,
+              target_genre=st.sampled_from(["metal", "horror", "battle", "calm"]),
+              priority=st.integers(min_value=0, max_value=5)),
+    min_size=0, max_size=40
+)
+
+metrics_strategy = st.dictionaries(
+    keys=st.sampled_from(["hp", "sanity", "stress", "xp"]),
+    values=st.one_of(small_floats, st.floats(min_value=-20, max_value=120)),
+    min_size=1
+)
+
+
+class TestCompiledRuleSet:
+
+    def test_lowest_threshold_rules(self):
+
+        rules = [
+            TriggerRule(metric_name="hp", operator="lt", threshold=50, target_genre="tense", priority=1),
+            TriggerRule(metric_name="hp", operator="lt", threshold=10, target_genre="funeral", priority=5),
+            TriggerRule(metric_name="stress", operator="gt", threshold=80, target_genre="battle", priority=3),
+        ]
+        compiled = CompiledRuleSet(rules)
+
+        assert compiled.resolve({"hp": 100.0}) is None
+        assert compiled.resolve({"hp": 40.0}).target_genre == "tense"
+        assert compiled.resolve({"hp": 5.0}).target_genre == "funeral"
+        assert compiled.resolve({"hp": 40.0, "stress": 90.0}).target_genre == "battle"
+        assert compiled.resolve({"hp": 5.0, "stress": 90.0}).target_genre == "funeral"
+
+    def test_equal_priority_keeps_config_order(self):
+
+        rules = [
+            TriggerRule(metric_name="hp", operator="eq", threshold=0, target_genre="first"),
+            TriggerRule(metric_name="sanity", operator="eq", threshold=0, target_genre="second"),
+        ]
+
+        assert CompiledRuleSet(rules).resolve({"sanity": 0.0, "hp": 0.0}).target_genre == "first"
+
+    def test_empty_rules(self):
+
+        assert CompiledRuleSet([]).resolve({"hp": 1.0}) is None
+
+    @given(rules=rules_strategy, metrics=metrics_strategy)
+    def test_matches_scalar_evaluator(self, rules, metrics):
+        """
+        Il motore compilato deve scegliere esattamente la stessa regola
+        del percorso scalare (RuleEvaluator + sort per priorità).
+        """
+        assert CompiledRuleSet(rules).resolve(metrics) is naive_winner(rules, metrics)
@@ -0,0 +1,350 @@
+import asyncio
+import importlib
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from pydantic import ValidationError
+
+from shared import logger
+from cache.interface import IAsyncCache
+from database.adapter import AsyncDatabaseAdapter
+from database.memory import MemoryService
+from engine.events import SessionBroadcaster
+from engine.orchestrator import Orchestrator
+from schemas.session import SessionConfig, SessionState, TriggerRule
+from benchmarks.ws_client import ASGIWebSocket, WebSocketClosed
+
+
+class MemoryCache(IAsyncCache):
+
+    def __init__(self):
+        self.telemetry = {}
+        self.sessions = {}
+
+    async def connect(self): pass
+
+    async def close(self): pass
+
+    async def set_telemetry(self, payload):
+        self.telemetry[payload.session_id] = payload
+
+    async def get_telemetry(self, session_id):
+        return self.telemetry.get(session_id)
+
+    async def set_session(self, payload):
+        self.sessions[payload.config.session_id] = payload
+
+    async def get_session(self, session_id):
+        return self.sessions.get(session_id)
+
+
+class FakeDispatcher:
+
+    provider = None
+    ramps = None
+
+    def __init__(self):
+        self.submitted = []
+
+    def stats(self):
+        return {"submitted": len(self.submitted)}
+
+    def submit(self, session_id, genre, priority=0):
+        self.submitted.append((session_id, genre, priority))
+
+
+@pytest.fixture
+def api(tmp_path, monkeypatch):
+    # routes log through src.shared.logger, the engine through shared.logger
+    src_logger = importlib.import_module("src.shared.logger")
+    monkeypatch.setattr(logger._Logger, "_folder", str(tmp_path))
+    monkeypatch.setattr(src_logger._Logger, "_folder", str(tmp_path))
+    routes = importlib.import_module("src.api.routes")
+
+    orchestrator = Orchestrator(cache=MemoryCache(), db=AsyncDatabaseAdapter(MemoryService()), events=SessionBroadcaster())
+    dispatcher = FakeDispatcher()
+    monkeypatch.setattr(routes.state, "orchestrator", orchestrator)
+    monkeypatch.setattr(routes.state, "music_dispatcher", dispatcher)
+
+    app = FastAPI()
+    app.include_router(routes.router)
+
+    config = SessionConfig(session_id="table_1", default_genre="calm", rules=[
+        TriggerRule(metric_name="hp", operator="lt", threshold=20, target_genre="metal", priority=5),
+        TriggerRule(metric_name="fear", operator="gt", threshold=80, target_genre="horror", priority=2),
+    ])
+    asyncio.run(orchestrator.process_session(SessionState(config=config)))
+
+    return app, dispatcher
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+class TestStreamTelemetry:
+
+    def test_deltas_push_transitions(self, api):
+
+        app, dispatcher = api
+
+        async def scenario():
+            async with ASGIWebSocket(app, "/v0.1/telemetry/stream") as ws:
+                await ws.send_json({"session_id": "table_1"})
+                assert (await ws.receive_json())["status"] == "bound"
+
+                await ws.send_json({"m": {"hp": 100, "fear": 10}, "t": 1.0})
+                # only fear changes: hp keeps its last value, no transition
+                await ws.send_json({"m": {"fear": 90.0}, "t": 2.0})
+                await ws.send_json({"m": {"hp": 5.0}, "t": 3.0})
+                return [await ws.receive_json(), await ws.receive_json()]
+
+        horror, metal = run(scenario())
+
+        assert horror == {"seq": 2, "status": "CRITICAL", "rule": "fear", "genre": "horror"}
+        assert metal == {"seq": 3, "status": "CRITICAL", "rule": "hp", "genre": "metal"}
+        assert dispatcher.submitted == [("table_1", "horror", 2), ("table_1", "metal", 5)]
+
+
+    def test_invalid_frames_do_not_close_the_stream(self, api):
+
+        app, _ = api
+
+        async def scenario():
+            async with ASGIWebSocket(app, "/v0.1/telemetry/stream") as ws:
+                await ws.send_json({"session_id": "table_1"})
+                await ws.receive_json()
+
+                await ws.send_text("not json")
+                await ws.send_json({"m": {"hp": float("nan")}})
+                await ws.send_json({"m": {"hp": "low"}})
+                # integers too large for a float
+                await ws.send_text('{"m": {"hp": 1' + "0" * 400 + '}}')
+                await ws.send_text('{"m": {"hp": 5.0}, "t": 1' + "0" * 400 + '}')
+                await ws.send_json({"m": {"hp": 5.0}})
+                return [await ws.receive_json() for _ in range(6)]
+
+        frames = run(scenario())
+        assert [frame["seq"] for frame in frames] == [1, 2, 3, 4, 5, 6]
+        assert all("error" in frame for frame in frames[:5])
+        assert frames[5]["genre"] == "metal"
+
+
+    def test_orchestrator_errors_do_not_close_the_stream(self, api, monkeypatch):
+
+        app, _ = api
+        orchestrator = importlib.import_module("src.api.routes").state.orchestrator
+        process_transition = orchestrator.process_transition
+        # backend down, then a stored state that no longer validates
+        with pytest.raises(ValidationError) as invalid:
+            SessionState.model_validate({"config": {}})
+        failures = [ConnectionError("cache down"), invalid.value]
+
+        async def flaky(payload):
+            if failures:
+                raise failures.pop(0)
+            return await process_transition(payload)
+
+        async def scenario():
+            async with ASGIWebSocket(app, "/v0.1/telemetry/stream") as ws:
+                await ws.send_json({"session_id": "table_1"})
+                await ws.receive_json()
+
+                monkeypatch.setattr(orchestrator, "process_transition", flaky)
+                for _ in range(3):
+                    await ws.send_json({"m": {"hp": 5.0}})
+                return [await ws.receive_json() for _ in range(3)]
+
+        frames = run(scenario())
+        assert [frame["seq"] for frame in frames] == [1, 2, 3]
+        assert "error" in frames[0] and "error" in frames[1]
+        assert frames[2]["genre"] == "metal"
+
+
+    def test_unknown_session_is_refused(self, api):
+
+        app, _ = api
+
+        async def scenario():
+            async with ASGIWebSocket(app, "/v0.1/telemetry/stream") as ws:
+                await ws.send_json({"session_id": "table_404"})
+                await ws.receive_json()
+
+        with pytest.raises(WebSocketClosed) as closed:
+            run(scenario())
+        assert closed.value.code == 1008
+
+
+    def test_post_path_passes_rule_priority(self, api):
+
+        app, dispatcher = api
+
+        async def scenario():
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+                response = await client.post("/v0.1/telemetry", json={"session_id": "table_1", "metrics": {"hp": 5.0}})
+                return response.json()
+
+        assert run(scenario())["triggered_genre"] == "metal"
+        assert dispatcher.submitted == [("table_1", "metal", 5)]
+
+
+def post(app, path, body):
+
+    async def scenario():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            return await client.post(path, json=body)
+
+    return run(scenario())
+
+
+class TestBatchTelemetry:
+
+    def test_array_form(self, api):
+
+        app, dispatcher = api
+        response = post(app, "/v0.1/telemetry/batch", [
+            {"session_id": "table_1", "timestamp": 2.0, "metrics": {"hp": 5.0}},
+            {"session_id": "table_404", "timestamp": 1.0, "metrics": {"hp": 5.0}},
+            # same session, earlier: evaluated first
+            {"session_id": "table_1", "timestamp": 1.0, "metrics": {"hp": 50.0, "fear": 90.0}},
+        ])
+
+        results = response.json()["results"]
+        assert [r["triggered_genre"] for r in results] == ["metal", None, "horror"]
+        assert results[0]["session_status"] == "CRITICAL"
+        # one submit per session, the latest transition by timestamp
+        assert dispatcher.submitted == [("table_1", "metal", 5)]
+
+
+    def test_columnar_form(self, api):
+
+        app, _ = api
+        response = post(app, "/v0.1/telemetry/batch", {
+            "session_ids": ["table_1"],
+            "metric_names": ["hp", "fear"],
+            "values": [[5.0, None]],
+            "timestamps": [1.0]
+        })
+
+        assert response.status_code == 200
+        assert response.json()["results"] == [{"session_id": "table_1", "triggered_genre": "metal", "session_status": "CRITICAL"}]
+
+
+    @pytest.mark.parametrize("body", [
+        [],
+        {"session_ids": ["table_1"], "metric_names": ["hp"], "values": [[1.0, 2.0]]},
+        {"session_ids": ["table_1"], "metric_names": ["hp"], "values": [[None]]},
+        [{"session_id": "table_1", "metrics": {}}],
+    ])
+    def test_invalid_batches_are_rejected(self, api, body):
+
+        app, dispatcher = api
+        assert post(app, "/v0.1/telemetry/batch", body).status_code == 422
+        assert dispatcher.submitted == []
+
+
+async def open_stream(app, path):
+    """GET on a streaming endpoint: (status, queue of body chunks, disconnect)"""
+
+    chunks = asyncio.Queue()
+    started = asyncio.get_running_loop().create_future()
+    gone = asyncio.Event()
+
+    async def receive():
+        await gone.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            started.set_result(message["status"])
+        elif message.get("body"):
+            chunks.put_nowait(message["body"])
+
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET", "scheme": "http",
+        "path": path, "raw_path": path.encode(), "root_path": "", "query_string": b"",
+        "headers": [(b"host", b"test")], "client": ("test", 1), "server": ("test", 80)
+    }
+    task = asyncio.create_task(app(scope, receive, send))
+
+    async def disconnect():
+        gone.set()
+        await task
+
+    return await started, chunks, disconnect
+
+
+class TestSessionEvents:
+
+    def test_snapshot_then_transitions(self, api):
+
+        app, _ = api
+
+        async def scenario():
+            status, chunks, disconnect = await open_stream(app, "/v0.1/session/table_1/events")
+            snapshot = await asyncio.wait_for(chunks.get(), 1)
+
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+                await client.post("/v0.1/telemetry", json={"session_id": "table_1", "metrics": {"hp": 5.0}})
+
+            transition = await asyncio.wait_for(chunks.get(), 1)
+            await disconnect()
+            # the client went away: its subscription is released
+            events = importlib.import_module("src.api.routes").state.orchestrator.events
+            assert events.subscribers("table_1") == 0
+            return status, snapshot, transition
+
+        status, snapshot, transition = run(scenario())
+
+        assert status == 200
+        assert b'"status": "NOMINAL"' in snapshot
+        assert transition.startswith(b"event: state\n")
+        assert b'"genre": "metal"' in transition and b'"active_rule_metric": "hp"' in transition
+
+
+    def test_unknown_session(self, api):
+
+        app, _ = api
+
+        async def scenario():
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+                return await client.get("/v0.1/session/table_404/events")
+
+        assert run(scenario()).status_code == 404
+
+
+    def test_failed_lookup_releases_the_subscription(self, api, monkeypatch):
+
+        app, _ = api
+        orchestrator = importlib.import_module("src.api.routes").state.orchestrator
+
+        async def unavailable(session_id):
+            raise ConnectionError("cache down")
+        monkeypatch.setattr(orchestrator, "get_session", unavailable)
+
+        async def scenario():
+            transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                return await client.get("/v0.1/session/table_1/events")
+
+        assert run(scenario()).status_code == 500
+        assert orchestrator.events.subscribers("table_1") == 0
+
+
+class TestStats:
+
+    def test_lists_backend_circuit_breakers(self, api):
+
+        app, _ = api
+        # same module path as the backends (cache.redis, database.firestore...)
+        decorator = importlib.import_module("shared.decorator")
+        decorator.get_breaker("redis").record_failure()
+
+        async def scenario():
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+                return (await client.get("/v0.1/stats")).json()
+
+        breakers = run(scenario())["circuit_breakers"]
+        assert breakers["redis"]["consecutive_failures"] >= 1
+
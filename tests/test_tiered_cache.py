@@ -0,0 +1,171 @@
+import asyncio
+import importlib
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+from shared import logger
+from schemas.session import SessionConfig, SessionState
+from tests.test_telemetry_api import MemoryCache
+
+
+class FakePubSub:
+
+    def __init__(self, broker):
+        self._broker = broker
+        self._messages = asyncio.Queue()
+
+    async def subscribe(self, channel):
+        self._broker.subscribers.setdefault(channel, []).append(self._messages)
+
+    async def listen(self):
+        while True:
+            yield await self._messages.get()
+
+    async def aclose(self):
+        for queues in self._broker.subscribers.values():
+            if self._messages in queues:
+                queues.remove(self._messages)
+
+
+class FakeRedisClient:
+    """Pub/sub of one Redis server, data delivered as str or bytes like decode_responses"""
+
+    def __init__(self, decode_responses):
+        self.decode_responses = decode_responses
+        self.subscribers = {}
+
+    def pubsub(self):
+        return FakePubSub(self)
+
+    async def publish(self, channel, message):
+        data = message if self.decode_responses else message.encode()
+        for queue in self.subscribers.get(channel, []):
+            queue.put_nowait({"type": "message", "channel": channel, "data": data})
+
+
+class SharedBackend(MemoryCache):
+    """The L2 both workers talk to"""
+
+    def __init__(self, client):
+        super().__init__()
+        self.client = client
+
+    async def connect(self): pass
+
+
+@pytest.fixture
+def tiered(tmp_path, monkeypatch):
+    monkeypatch.setattr(logger._Logger, "_folder", str(tmp_path))
+    # redis_async reads the settings only when connecting
+    monkeypatch.setitem(sys.modules, "shared.config", SimpleNamespace(settings=SimpleNamespace()))
+    monkeypatch.delitem(sys.modules, "cache.redis_async", raising=False)
+    monkeypatch.delitem(sys.modules, "cache.tiered", raising=False)
+    return importlib.import_module("cache.tiered")
+
+
+def session(status):
+    return SessionState(config=SessionConfig(session_id="table_1", default_genre="calm"), current_status=status)
+
+
+class TestTieredCache:
+
+    @pytest.mark.parametrize("decode_responses", [True, False])
+    def test_session_write_invalidates_other_workers(self, tiered, decode_responses):
+
+        async def scenario():
+            backend = SharedBackend(FakeRedisClient(decode_responses))
+            first, second = tiered.TieredCache(backend), tiered.TieredCache(backend)
+            await first.connect()
+            await second.connect()
+            await asyncio.sleep(0)
+
+            await first.set_session(session("NOMINAL"))
+            # second now holds NOMINAL in its L1
+            assert (await second.get_session("table_1")).current_status == "NOMINAL"
+
+            await first.set_session(session("CRITICAL"))
+            await asyncio.sleep(0.01)
+            state = await second.get_session("table_1")
+
+            stats = first.stats(), second.stats()
+            await first.close()
+            await second.close()
+            return state, stats
+
+        state, (first, second) = asyncio.run(scenario())
+
+        assert state.current_status == "CRITICAL"
+        assert second["invalidations"] == 2
+        # a worker ignores its own broadcasts
+        assert first["invalidations"] == 0
+
+
+    def test_slow_read_does_not_overwrite_a_newer_write(self, tiered):
+
+        class SlowBackend(SharedBackend):
+
+            async def get_session(self, session_id):
+                state = self.sessions.get(session_id)
+                self.reading.set()
+                await self.release.wait()
+                return state
+
+        async def scenario():
+            backend = SlowBackend(FakeRedisClient(True))
+            backend.reading, backend.release = asyncio.Event(), asyncio.Event()
+            await backend.set_session(session("NOMINAL"))
+            cache = tiered.TieredCache(backend)
+
+            read = asyncio.create_task(cache.get_session("table_1"))
+            await backend.reading.wait()
+            # the write lands while the read still holds NOMINAL
+            await cache.set_session(session("CRITICAL"))
+            backend.release.set()
+
+            return (await read).current_status, (await cache.get_session("table_1")).current_status, cache.stats()
+
+        read, cached, stats = asyncio.run(scenario())
+
+        assert read == "NOMINAL"
+        assert cached == "CRITICAL"
+        assert stats["skipped_fills"] == 1
+
+
+    def test_l1_matches_a_merging_backend(self, tiered):
+
+        from schemas.metrics import TelemetryPayload
+
+        class HashBackend(SharedBackend):
+            """Metrics missing from a payload keep their last value, like the Redis hash"""
+
+            MERGES_TELEMETRY = True
+
+            async def set_telemetry(self, payload):
+                last = self.telemetry.get(payload.session_id)
+                metrics = {**last.metrics, **payload.metrics} if last else dict(payload.metrics)
+                self.telemetry[payload.session_id] = payload.model_copy(update={"metrics": metrics})
+
+        def payload(timestamp, **metrics):
+            return TelemetryPayload(session_id="table_1", timestamp=timestamp, metrics=metrics)
+
+        async def scenario():
+            backend = HashBackend(FakeRedisClient(True))
+            cache = tiered.TieredCache(backend, telemetry_ttl=60.0)
+
+            await cache.set_telemetry(payload(1.0, hr=80.0, spo2=97.0))
+            await cache.set_telemetry(payload(2.0, hr=90.0))
+            # nothing to merge with in L1: read from L2
+            first = await cache.get_telemetry("table_1")
+
+            await cache.set_telemetry(payload(3.0, spo2=95.0))
+            # merged into the L1 entry
+            second = await cache.get_telemetry("table_1")
+            return first, second, backend.telemetry["table_1"]
+
+        first, second, stored = asyncio.run(scenario())
+
+        assert first.metrics == {"hr": 90.0, "spo2": 97.0}
+        assert (second.timestamp, second.metrics) == (3.0, {"hr": 90.0, "spo2": 95.0})
+        assert second.metrics == stored.metrics
@@ -0,0 +1,90 @@
+import asyncio
+
+import pytest
+
+from shared import logger
+from music.resolver import TrackResolver
+
+
+@pytest.fixture(autouse=True)
+def log_folder(tmp_path, monkeypatch):
+    monkeypatch.setattr(logger._Logger, "_folder", str(tmp_path))
+
+
+class FakeSearch:
+
+    def __init__(self, fail=()):
+        self.calls = []
+        self.fail = set(fail)
+
+    async def __call__(self, genre, target):
+        self.calls.append((genre, target))
+        await asyncio.sleep(0.01)
+        if genre in self.fail:
+            raise ConnectionError(genre)
+        return [f"spotify:track:{genre}:{target}"]
+
+
+class TestTrackResolver:
+
+    def test_cached_per_genre_and_bucket(self):
+
+        search = FakeSearch()
+        resolver = TrackResolver(search, bucket_size=0.25)
+
+        async def scenario():
+            await resolver.resolve("metal")
+            await resolver.resolve("Metal")
+            # 0.8 and 0.7 both quantize to 0.75
+            await resolver.resolve("metal", energy=0.8, valence=0.1)
+            await resolver.resolve("metal", energy=0.7, valence=0.0)
+
+        asyncio.run(scenario())
+        assert search.calls == [("metal", None), ("metal", (0.75, 0.0))]
+        assert resolver.stats()["hits"] == 2
+
+    def test_concurrent_misses_share_one_search(self):
+
+        search = FakeSearch()
+        resolver = TrackResolver(search)
+
+        async def scenario():
+            return await asyncio.gather(*(resolver.resolve("horror") for _ in range(5)))
+
+        results = asyncio.run(scenario())
+        assert len(search.calls) == 1
+        assert all(result == results[0] for result in results)
+        assert resolver.shared_fetches == 4
+
+    def test_prefetch_skips_failures(self):
+
+        search = FakeSearch(fail={"battle"})
+        resolver = TrackResolver(search)
+
+        resolved = asyncio.run(resolver.prefetch(["metal", "battle", "calm", None, "metal"]))
+        assert resolved == 2
+        assert sorted(genre for genre, _ in search.calls) == ["battle", "calm", "metal"]
+
+
+    def test_cancelled_leader_does_not_hang_waiters(self):
+
+        search = FakeSearch()
+        resolver = TrackResolver(search)
+
+        async def scenario():
+            leader = asyncio.create_task(resolver.resolve("metal"))
+            await asyncio.sleep(0)
+            waiter = asyncio.create_task(resolver.resolve("metal"))
+            await asyncio.sleep(0)
+
+            leader.cancel()
+            # the waiter takes over the search
+            uris = await asyncio.wait_for(waiter, timeout=1)
+            return leader, uris
+
+        leader, uris = asyncio.run(scenario())
+
+        assert leader.cancelled()
+        assert uris == ["spotify:track:metal:None"]
+        assert len(search.calls) == 2
+
@@ -0,0 +1,90 @@
+from schemas.session import SessionConfig, SessionState, TriggerRule
+from engine.strategies import CompiledRuleSet
+from engine.transitions import TransitionMachine
+
+
+def make_state(*rules, default_genre="exploration"):
+    return SessionState(config=SessionConfig(session_id="table_1", default_genre=default_genre, rules=list(rules)))
+
+
+def feed(state, ticks):
+    """Feed (timestamp, metrics) ticks, return the final state and the genres sent to the music provider"""
+    rule_set = CompiledRuleSet(state.config.rules)
+    genres = []
+    for now, metrics in ticks:
+        transition = TransitionMachine.step(state, rule_set, metrics, now)
+        if transition:
+            state = transition.state
+            if transition.genre:
+                genres.append(transition.genre)
+    return state, genres
+
+
+class TestTransitionMachine:
+
+    def test_unchanged_genre_is_not_repeated(self):
+
+        state = make_state(TriggerRule(metric_name="hp", operator="lt", threshold=10, target_genre="funeral"))
+
+        state, genres = feed(state, [(t, {"hp": 5.0}) for t in range(10)])
+
+        assert genres == ["funeral"]
+        assert state.current_status == "CRITICAL"
+        assert state.active_rule_metric == "hp"
+        assert state.active_since == 0
+
+    def test_release_goes_back_to_default_genre(self):
+
+        state = make_state(TriggerRule(metric_name="hp", operator="lt", threshold=10, target_genre="funeral"))
+
+        state, genres = feed(state, [(0, {"hp": 5.0}), (1, {"hp": 50.0})])
+
+        assert genres == ["funeral", "exploration"]
+        assert state.current_status == "NOMINAL"
+        assert state.active_rule_index is None
+
+    def test_hysteresis_band(self):
+        """
+        HP che oscilla attorno alla soglia non deve far rimbalzare la musica.
+        """
+        state = make_state(TriggerRule(metric_name="hp", operator="lt", threshold=10, target_genre="funeral", hysteresis=3))
+
+        state, genres = feed(state, [(0, {"hp": 9.0}), (1, {"hp": 11.0}), (2, {"hp": 9.5}), (3, {"hp": 12.9})])
+        assert genres == ["funeral"]
+
+        state, genres = feed(state, [(4, {"hp": 13.0})])
+        assert genres == ["exploration"]
+
+    def test_min_dwell(self):
+
+        state = make_state(TriggerRule(metric_name="stress", operator="gt", threshold=80, target_genre="battle", min_dwell=30))
+
+        state, genres = feed(state, [(0, {"stress": 90.0}), (10, {"stress": 10.0}), (29, {"stress": 10.0})])
+        assert genres == ["battle"]
+
+        state, genres = feed(state, [(30, {"stress": 10.0})])
+        assert genres == ["exploration"]
+
+    def test_stronger_rule_preempts_dwell(self):
+
+        state = make_state(
+            TriggerRule(metric_name="stress", operator="gt", threshold=80, target_genre="battle", min_dwell=60),
+            TriggerRule(metric_name="hp", operator="lt", threshold=5, target_genre="funeral", priority=9),
+        )
+
+        state, genres = feed(state, [(0, {"stress": 90.0, "hp": 50.0}), (1, {"stress": 90.0, "hp": 1.0})])
+
+        assert genres == ["battle", "funeral"]
+        assert state.active_rule_index == 1
+
+    def test_same_genre_rules_switch_silently(self):
+
+        state = make_state(
+            TriggerRule(metric_name="hp", operator="lt", threshold=10, target_genre="funeral"),
+            TriggerRule(metric_name="sanity", operator="lt", threshold=10, target_genre="funeral", priority=5),
+        )
+
+        state, genres = feed(state, [(0, {"hp": 5.0, "sanity": 50.0}), (1, {"hp": 5.0, "sanity": 5.0})])
+
+        assert genres == ["funeral"]
+        assert state.active_rule_metric == "sanity"
@@ -0,0 +1,187 @@
+import asyncio
+
+import pytest
+
+from shared import logger
+from schemas.metrics import TelemetryPayload
+from database.interface import IAsyncDatabase
+from database.write_behind import AsyncWriteBehindDatabase, CoalescingBuffer
+
+
+def payload(session_id, hp):
+    return TelemetryPayload(session_id=session_id, metrics={"hp": hp})
+
+
+class TestCoalescingBuffer:
+
+    def test_keeps_only_latest_per_session(self):
+
+        buffer = CoalescingBuffer(max_pending=10)
+
+        for hp in range(5):
+            buffer.put(payload("table_1", float(hp)))
+        buffer.put(payload("table_2", 1.0))
+
+        assert len(buffer) == 2
+        assert buffer.coalesced == 4
+        assert buffer.get("table_1").metrics["hp"] == 4.0
+
+        drained = buffer.drain()
+        assert [p.session_id for p in drained] == ["table_1", "table_2"]
+        assert len(buffer) == 0
+
+    def test_bounded(self):
+
+        buffer = CoalescingBuffer(max_pending=2)
+
+        assert buffer.put(payload("table_1", 1.0))
+        assert buffer.put(payload("table_2", 1.0))
+        assert not buffer.put(payload("table_3", 1.0))
+        # a pending session can always be updated
+        assert buffer.put(payload("table_1", 2.0))
+        assert buffer.rejected == 1
+
+    def test_restore_does_not_overwrite_newer(self):
+
+        buffer = CoalescingBuffer(max_pending=10)
+        buffer.put(payload("table_1", 1.0))
+        buffer.put(payload("table_2", 1.0))
+
+        batch = buffer.drain(limit=1)
+        buffer.put(payload("table_1", 9.0)) # newer write while the flush failed
+
+        assert buffer.restore(batch) == 0
+        assert buffer.get("table_1").metrics["hp"] == 9.0
+
+
+class FakeDatabase(IAsyncDatabase):
+    """Fails every write carrying a poisoned session, or all of them while down"""
+
+    def __init__(self, poisoned=(), delay=0.0):
+        self.poisoned = set(poisoned)
+        self.down = False
+        self.delay = delay
+        self.telemetry = {}
+        self.closed = False
+
+    async def connect(self): pass
+
+    async def close(self):
+        self.closed = True
+
+    async def set_telemetry(self, payload):
+        await self.set_telemetry_many([payload])
+
+    async def set_telemetry_many(self, payloads):
+        await asyncio.sleep(self.delay)
+        if self.down or any(p.session_id in self.poisoned for p in payloads):
+            raise ValueError("Too many metrics for a segment header")
+        for p in payloads:
+            self.telemetry[p.session_id] = p
+
+    async def set_session(self, payload): pass
+
+    async def get_telemetry(self, session_id):
+        return self.telemetry.get(session_id)
+
+    async def get_session(self, session_id):
+        return None
+
+
+@pytest.fixture
+def log_folder(tmp_path, monkeypatch):
+    monkeypatch.setattr(logger._Logger, "_folder", str(tmp_path))
+
+
+@pytest.mark.usefixtures("log_folder")
+class TestAsyncWriteBehindDatabase:
+
+    def test_bad_payload_does_not_block_the_others(self):
+
+        delegate = FakeDatabase(poisoned={"table_bad"})
+        db = AsyncWriteBehindDatabase(delegate, flush_interval=60, max_attempts=3)
+
+        async def scenario():
+            await db.set_telemetry(payload("table_bad", 1.0))
+            await db.set_telemetry(payload("table_1", 1.0))
+            await db.flush()
+            assert "table_1" in delegate.telemetry
+
+            for hp in (2.0, 3.0):
+                await db.set_telemetry(payload("table_2", hp))
+                await db.flush()
+
+        asyncio.run(scenario())
+
+        assert delegate.telemetry["table_2"].metrics["hp"] == 3.0
+        stats = db.stats()
+        assert stats["dead_lettered"] == 1 and stats["pending"] == 0
+
+
+    def test_outage_keeps_everything_pending(self):
+
+        delegate = FakeDatabase()
+        db = AsyncWriteBehindDatabase(delegate, flush_interval=60, max_attempts=2)
+
+        async def scenario():
+            await db.set_telemetry(payload("table_1", 1.0))
+            delegate.down = True
+            for _ in range(5):
+                assert await db.flush() == 0
+            delegate.down = False
+            return await db.flush()
+
+        assert asyncio.run(scenario()) == 1
+        assert db.stats()["dead_lettered"] == 0
+
+
+    def test_close_waits_for_the_running_flush(self):
+
+        delegate = FakeDatabase(delay=0.05)
+        db = AsyncWriteBehindDatabase(delegate, flush_interval=60, batch_size=1)
+
+        async def scenario():
+            await db.connect()
+            # batch_size reached: the flusher wakes up and is mid-write when close() runs
+            await db.set_telemetry(payload("table_1", 1.0))
+            await asyncio.sleep(0.01)
+            await db.set_telemetry(payload("table_2", 1.0))
+            await db.close()
+
+        asyncio.run(scenario())
+
+        assert sorted(delegate.telemetry) == ["table_1", "table_2"]
+        assert delegate.closed
+
+
+    def test_cancelled_flush_puts_the_batch_back(self):
+
+        delegate = FakeDatabase(delay=1.0)
+        db = AsyncWriteBehindDatabase(delegate, flush_interval=60)
+
+        async def scenario():
+            await db.set_telemetry(payload("table_1", 1.0))
+            flush = asyncio.create_task(db.flush())
+            await asyncio.sleep(0.01)
+            flush.cancel()
+            await asyncio.gather(flush, return_exceptions=True)
+
+        asyncio.run(scenario())
+        assert db.stats()["pending"] == 1
+
+
+    def test_full_buffer_flushes_inline(self):
+
+        delegate = FakeDatabase()
+        db = AsyncWriteBehindDatabase(delegate, flush_interval=60, max_pending=2)
+
+        async def scenario():
+            for i in range(3):
+                await db.set_telemetry(payload(f"table_{i}", 1.0))
+
+        asyncio.run(scenario())
+
+        assert db.stats()["backpressure"] == 1
+        # the first two went out with the inline flush, the third is pending
+        assert sorted(delegate.telemetry) == ["table_0", "table_1"]
+        assert db.stats()["pending"] == 1